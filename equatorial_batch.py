@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Execução em lote, sem interação: lê os clientes de um CSV ou JSONL e processa todos.
+
+Os clientes são lidos sob demanda (o arquivo não é carregado inteiro na memória) e
+distribuídos entre os workers do modo pool. Ao final grava resumo_lote.json, imprime o
+resumo em JSON e sai com:
+    0 - todos os clientes processados com sucesso
+    1 - algum cliente falhou (ou havia linhas inválidas)
+    2 - erro de entrada (arquivo ausente/ilegível ou nenhum cliente válido)
+
+Uso: python equatorial_batch.py clientes.csv --motor http --workers 3 --saida clientes_faturas
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import sys
+
+from equatorial_faturas_teste_Claude import MANUAL_POLICIES, MAX_UC_WORKERS, normalize_client
+from equatorial_pool import process_clients_pool
+
+
+logger = logging.getLogger(__name__)
+
+# Nomes de coluna aceitos para cada campo (comparação sem maiúsculas)
+COLUMN_ALIASES = {
+    "uc": ["uc", "unidade_consumidora", "unidade consumidora"],
+    "cpf_cnpj": ["cpf_cnpj", "cpf", "cnpj", "documento"],
+    "data_nascimento": ["data_nascimento", "nascimento", "data de nascimento"]
+}
+
+
+class ClientReader:
+    """Lê clientes de CSV (',' ou ';') ou JSONL linha a linha, guardando as linhas inválidas"""
+
+    def __init__(self, path, file_format=None):
+        self.path = path
+        self.format = file_format or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+        self.invalid = []
+
+    def _records(self):
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            if self.format == "jsonl":
+                for line_number, line in enumerate(f, 1):
+                    if line.strip():
+                        try:
+                            yield line_number, json.loads(line)
+                        except ValueError as e:
+                            yield line_number, {"_erro": f"JSON inválido: {e}"}
+                return
+
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            for line_number, row in enumerate(csv.DictReader(f, dialect=dialect), 2):
+                yield line_number, row
+
+    @staticmethod
+    def _map_columns(record):
+        lowered = {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+        mapped = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if lowered.get(alias) not in (None, ""):
+                    mapped[field] = lowered[alias]
+                    break
+        return mapped
+
+    def __iter__(self):
+        for line_number, record in self._records():
+            client = normalize_client(self._map_columns(record)) if "_erro" not in record else None
+            missing = [field for field in COLUMN_ALIASES if not client or not client[field]]
+            if missing:
+                error = record.get("_erro") or f"campos ausentes: {', '.join(missing)}"
+                logger.error(f"{self.path}:{line_number} ignorada ({error})")
+                self.invalid.append({"linha": line_number, "erro": error})
+                continue
+            yield client
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download de faturas Equatorial em lote (sem interação)")
+    parser.add_argument("entrada", help="Arquivo de clientes (.csv ou .jsonl)")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], help="Formato da entrada (padrão: pela extensão)")
+    parser.add_argument("--motor", "--engine", dest="motor", choices=["selenium", "http"], default="selenium")
+    parser.add_argument("--workers", type=int, default=2, help="Clientes processados ao mesmo tempo")
+    parser.add_argument("--navegadores-por-cliente", type=int, default=1,
+                        help=f"UCs do mesmo cliente em paralelo (máx. {MAX_UC_WORKERS})")
+    parser.add_argument("--visual", action="store_true", help="Abre o navegador (padrão: headless)")
+    parser.add_argument("--saida", default="clientes_faturas", help="Pasta raiz das pastas de clientes")
+    parser.add_argument("--sessoes", help="Pasta das sessões salvas (padrão: <saida>/sessoes)")
+    parser.add_argument("--cache-seletores", help="Cache de seletores (padrão: <saida>/selector_cache.json)")
+    parser.add_argument("--base-url", help="URL do portal (padrão: portal de produção)")
+    parser.add_argument("--resumo", help="Grava o resumo JSON também neste arquivo")
+    parser.add_argument("--retomar", action="store_true", help="Pula UCs já concluídas em relatorio.json")
+    parser.add_argument("--varredura", action="store_true", help="Só lê as faturas, sem baixar PDFs")
+    parser.add_argument("--intervencao", choices=[policy for policy in MANUAL_POLICIES if policy != "interativo"],
+                        default="falhar", help="Seletor não encontrado: falhar com snapshot ou repetir com espera crescente")
+    parser.add_argument("--tentativas", type=int, default=2, help="Tentativas extras da política 'repetir'")
+    parser.add_argument("--silencioso", action="store_true",
+                        help="Oculta a saída detalhada do bot (no console, só avisos e erros do log)")
+    return parser.parse_args(argv)
+
+
+def quiet_console_logging(level=logging.WARNING):
+    """Sobe o nível dos handlers de console; o arquivo de log continua completo"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+            handler.setLevel(level)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.silencioso:
+        quiet_console_logging()
+
+    if not os.path.isfile(args.entrada):
+        print(json.dumps({"erro": f"arquivo não encontrado: {args.entrada}"}, ensure_ascii=False))
+        return 2
+
+    reader = ClientReader(args.entrada, args.formato)
+    extra = {"base_url": args.base_url} if args.base_url else {}
+    output = contextlib.redirect_stdout(io.StringIO()) if args.silencioso else contextlib.nullcontext()
+    try:
+        with output:
+            summary = process_clients_pool(
+                reader,
+                workers=args.workers,
+                engine=args.motor,
+                headless=not args.visual,
+                output_root=args.saida,
+                uc_workers=max(1, min(args.navegadores_por_cliente, MAX_UC_WORKERS)),
+                resume=args.retomar,
+                scan_only=args.varredura,
+                manual_policy=args.intervencao,
+                manual_retries=args.tentativas,
+                session_dir=args.sessoes or os.path.join(args.saida, "sessoes"),
+                selector_cache_path=args.cache_seletores or os.path.join(args.saida, "selector_cache.json"),
+                # A lista é preenchida durante a leitura: já está completa quando o resumo é gravado
+                summary_extra={"entrada": args.entrada, "linhas_invalidas": reader.invalid},
+                **extra
+            )
+    except Exception as e:
+        logger.error(f"Erro ao processar o lote: {e}")
+        print(json.dumps({"erro": str(e)}, ensure_ascii=False))
+        return 2
+
+    if args.resumo:
+        with open(args.resumo, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+
+    result = {key: summary[key] for key in ("total_clientes", "sucesso", "falhas", "duracao_s")}
+    result["linhas_invalidas"] = len(reader.invalid)
+    result["resumo"] = args.resumo or os.path.join(args.saida, "resumo_lote.json")
+    print(json.dumps(result, ensure_ascii=False))
+
+    if summary["total_clientes"] == 0:
+        return 2
+    return 0 if summary["falhas"] == 0 and not reader.invalid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
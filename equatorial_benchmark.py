@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Benchmark ponta a ponta contra o portal simulado (mock_portal.py).
+
+Executa perform_full_login -> step5_extract_ucs_and_create_structure -> step6_process_each_uc
+para cada combinação de UCs, faturas por UC e latência do servidor, medindo o tempo de
+cada etapa e o número de comandos WebDriver (ou requisições HTTP no motor sem navegador).
+O resultado vai para um JSON que pode ser comparado com o de outro branch (--base).
+
+Uso: python equatorial_benchmark.py --motor http --ucs 1,5 --faturas 1,3 --latencia 0,0.1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from equatorial_faturas_teste_Claude import parse_segunda_via_page, run_client
+from mock_portal import MockPortal
+
+
+# Método do downloader -> etapa reportada
+STEP_METHODS = {
+    "open_login_page": "open_login_page",
+    "step1_fill_uc_cpf": "step1",
+    "step1_submit": "step1",
+    "step2_fill_birth_date": "step2",
+    "step2_submit": "step2",
+    "step4_navigate_to_invoices": "step4",
+    "step5_extract_ucs_and_create_structure": "step5",
+    "fast_emit": "uc_emit",
+    "select_uc_in_dropdown": "uc_select",
+    "set_emission_type": "uc_select",
+    "set_emission_reason": "uc_select",
+    "click_emit_button": "uc_emit",
+    "verify_invoices_page": "uc_verify",
+    "download_invoice": "invoice_download",
+    "navigate_back_to_second_copy": "uc_back",
+}
+
+
+class StepTimer:
+    """Instrumenta um downloader: tempo por etapa e comandos WebDriver/HTTP por etapa"""
+
+    def __init__(self):
+        self.spans = []
+        self.commands = {}
+        self.commands_by_step = {}
+        self._active = threading.local()
+
+    def _current_step(self):
+        stack = getattr(self._active, "stack", None)
+        return stack[-1] if stack else "fora_de_etapa"
+
+    def _wrap_step(self, method, step):
+        timer = self
+
+        def wrapper(*args, **kwargs):
+            stack = timer._active.__dict__.setdefault("stack", [])
+            stack.append(step)
+            started = time.perf_counter()
+            ok = False
+            try:
+                result = method(*args, **kwargs)
+                ok = bool(result)
+                return result
+            finally:
+                stack.pop()
+                timer.spans.append({
+                    "etapa": step,
+                    "metodo": method.__name__,
+                    "duracao_s": time.perf_counter() - started,
+                    "ok": ok
+                })
+        return wrapper
+
+    def _wrap_command(self, execute, name_from_args):
+        timer = self
+
+        def wrapper(*args, **kwargs):
+            name = name_from_args(args, kwargs)
+            timer.commands[name] = timer.commands.get(name, 0) + 1
+            step = timer._current_step()
+            timer.commands_by_step[step] = timer.commands_by_step.get(step, 0) + 1
+            return execute(*args, **kwargs)
+        return wrapper
+
+    def __call__(self, downloader):
+        """Gancho 'instrument' do run_client: chamado após setup_driver"""
+        for method_name, step in STEP_METHODS.items():
+            method = getattr(downloader, method_name, None)
+            if method is not None:
+                setattr(downloader, method_name, self._wrap_step(method, step))
+
+        if getattr(downloader, "driver", None) is not None:
+            # Todo comando WebDriver (inclusive de WebElement) passa por driver.execute
+            downloader.driver.execute = self._wrap_command(
+                downloader.driver.execute, lambda args, kwargs: str(args[0]))
+        elif getattr(downloader, "session", None) is not None:
+            downloader.session.request = self._wrap_command(
+                downloader.session.request, lambda args, kwargs: f"HTTP {args[0]}")
+
+    def summary(self):
+        """Tempo total, médio e máximo por etapa"""
+        steps = {}
+        for span in self.spans:
+            step = steps.setdefault(span["etapa"], {"chamadas": 0, "falhas": 0, "total_s": 0.0, "max_s": 0.0})
+            step["chamadas"] += 1
+            step["falhas"] += 0 if span["ok"] else 1
+            step["total_s"] += span["duracao_s"]
+            step["max_s"] = max(step["max_s"], span["duracao_s"])
+        for step in steps.values():
+            step["media_s"] = round(step["total_s"] / step["chamadas"], 4)
+            step["total_s"] = round(step["total_s"], 4)
+            step["max_s"] = round(step["max_s"], 4)
+        return steps
+
+
+def run_scenario(engine, ucs, invoices, latency, headless, workdir, verbose=False, repetition=1):
+    """Sobe o portal simulado, roda um cliente completo e devolve as medições
+
+    Cada rodada usa pastas próprias e desliga a sincronização incremental e a retomada:
+    nenhuma repetição reaproveita a sessão salva ou os PDFs de uma rodada anterior.
+    """
+    portal = MockPortal(clients=1, ucs_per_client=ucs, invoices_per_uc=invoices, latency=latency)
+    base_url = portal.start()
+    timer = StepTimer()
+    run_dir = os.path.join(workdir, f"{engine}_{ucs}_{invoices}_{latency}_rodada{repetition}")
+    output_root = os.path.join(run_dir, "saida")
+    started = time.time()
+    try:
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            result = run_client(
+                portal.credentials()[0],
+                engine=engine,
+                instrument=timer,
+                headless=headless,
+                base_url=base_url,
+                output_root=output_root,
+                selector_cache_path=os.path.join(workdir, "selector_cache.json"),
+                # Sessões salvas ficam na pasta da rodada: nunca reaproveitadas entre portais simulados
+                session_dir=os.path.join(run_dir, "sessoes"),
+                incremental=False,
+                resume=False
+            )
+    finally:
+        portal.stop()
+
+    # Só os PDFs gravados nesta rodada
+    downloaded = sum(1 for folder, _, files in os.walk(output_root) for name in files
+                     if name.endswith(".pdf") and os.path.getmtime(os.path.join(folder, name)) >= started)
+    return {
+        "ucs": ucs,
+        "faturas_por_uc": invoices,
+        "latencia_s": latency,
+        "status": result["status"],
+        "duracao_total_s": result["duracao_s"],
+        "pdfs_baixados": downloaded,
+        "requisicoes_servidor": portal.request_count,
+        "etapas": timer.summary(),
+        "comandos": {
+            "total": sum(timer.commands.values()),
+            "por_etapa": timer.commands_by_step,
+            "por_comando": dict(sorted(timer.commands.items(), key=lambda item: -item[1]))
+        }
+    }
+
+
+def benchmark_segunda_via_parser(ucs_counts, iterations=200):
+    """Microbenchmark do Step 5: parse_segunda_via_page sobre o HTML do portal simulado (sem navegador)"""
+    results = []
+    for ucs in ucs_counts:
+        portal = MockPortal(clients=1, ucs_per_client=ucs)
+        fixture = portal.render_segunda_via()
+        expected = portal.clients[0]
+
+        page = parse_segunda_via_page(fixture)
+        correct = page["nome_completo"] == expected["nome"] and page["ucs"] == expected["ucs"]
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parse_segunda_via_page(fixture)
+        elapsed = time.perf_counter() - started
+
+        results.append({
+            "ucs": ucs,
+            "bytes_html": len(fixture.encode("utf-8")),
+            "iteracoes": iterations,
+            "media_ms": round(elapsed / iterations * 1000, 4),
+            "correto": correct
+        })
+        print(f"⏱️ UCs={ucs}: {results[-1]['media_ms']} ms por página "
+              f"({results[-1]['bytes_html']} bytes) {'✅' if correct else '❌ resultado incorreto'}")
+    return results
+
+
+def git_revision():
+    """Commit atual (para comparar branches); None fora de um repositório git"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare_with_base(results, base_path, tolerance):
+    """Compara a duração de cada cenário com um resultado anterior; retorna os cenários que pioraram"""
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    key = lambda scenario: (scenario["ucs"], scenario["faturas_por_uc"], scenario["latencia_s"])
+    base_scenarios = {key(scenario): scenario for scenario in base.get("cenarios", [])}
+
+    regressions = []
+    print(f"\n📊 Comparação com {base_path} (commit {base.get('commit')})")
+    for scenario in results["cenarios"]:
+        previous = base_scenarios.get(key(scenario))
+        if not previous or not previous["duracao_total_s"]:
+            continue
+        change = scenario["duracao_total_s"] / previous["duracao_total_s"] - 1
+        flag = "❌" if change > tolerance else "✅"
+        print(f"   {flag} UCs={scenario['ucs']} faturas={scenario['faturas_por_uc']} latência={scenario['latencia_s']}s: "
+              f"{previous['duracao_total_s']}s -> {scenario['duracao_total_s']}s ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(scenario)
+    return regressions
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta contra o portal simulado")
+    parser.add_argument("--motor", "--engine", dest="motor", choices=["selenium", "http"], default="selenium")
+    parser.add_argument("--ucs", default="1,3", help="Lista de quantidades de UCs (ex: 1,3,10)")
+    parser.add_argument("--faturas", default="1,3", help="Lista de faturas por UC")
+    parser.add_argument("--latencia", default="0,0.1", help="Lista de latências do servidor (s)")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--visual", action="store_true", help="Abre o navegador (padrão: headless)")
+    parser.add_argument("--saida", default="benchmark_resultados.json")
+    parser.add_argument("--base", help="Resultado anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora máxima aceita sobre --base (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída do bot")
+    parser.add_argument("--parser-step5", action="store_true",
+                        help="Só o microbenchmark do parser da Segunda Via (usa --ucs e --repeticoes x 100 iterações)")
+    args = parser.parse_args()
+
+    if args.parser_step5:
+        results = {
+            "data": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            "commit": git_revision(),
+            "python": sys.version.split()[0],
+            "parser_step5": benchmark_segunda_via_parser(parse_list(args.ucs, int), iterations=args.repeticoes * 100)
+        }
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"\n📄 Resultados salvos em: {args.saida}")
+        if not all(result["correto"] for result in results["parser_step5"]):
+            sys.exit(1)
+        return
+
+    results = {
+        "data": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        "commit": git_revision(),
+        "motor": args.motor,
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cenarios": []
+    }
+
+    workdir = tempfile.mkdtemp(prefix="equatorial_bench_")
+    try:
+        for ucs in parse_list(args.ucs, int):
+            for invoices in parse_list(args.faturas, int):
+                for latency in parse_list(args.latencia, float):
+                    for repetition in range(1, args.repeticoes + 1):
+                        print(f"⏱️ UCs={ucs} faturas={invoices} latência={latency}s (rodada {repetition})...")
+                        scenario = run_scenario(args.motor, ucs, invoices, latency,
+                                                headless=not args.visual, workdir=workdir, verbose=args.verbose,
+                                                repetition=repetition)
+                        scenario["repeticao"] = repetition
+                        results["cenarios"].append(scenario)
+                        print(f"   {scenario['status']} em {scenario['duracao_total_s']}s | "
+                              f"{scenario['comandos']['total']} comandos | "
+                              f"{scenario['pdfs_baixados']} PDFs")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"\n📄 Resultados salvos em: {args.saida}")
+
+    failed = [scenario for scenario in results["cenarios"] if scenario["status"] != "sucesso"]
+    regressions = compare_with_base(results, args.base, args.tolerancia) if args.base else []
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,30 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
 from selenium.webdriver.support.ui import Select
 import time
 import os
 import logging
 from datetime import datetime
 import json
-import os
+import re
+import threading
+import queue
+import functools
+import hashlib
+import shutil
+import uuid
+import zlib
+import atexit
+import weakref
 import requests
+from lxml import html as lxml_html
+
+try:
+    import psutil  # Opcional: memória real do Chrome para reciclar o navegador aquecido
+except ImportError:
+    psutil = None
 
 
 
@@ -32,36 +47,1278 @@ logger = logging.getLogger(__name__)
 
 
 def load_credentials_from_json():
-        """Carrega as credenciais de um arquivo JSON"""
-        json_path = "dados.json"
-        if not os.path.exists(json_path):
+        """Carrega as credenciais de um arquivo JSON (primeiro cliente de dados.json)"""
+        clients = load_clients_from_json()
+        return clients[0] if clients else None
+
+
+def load_clients_from_json(json_path="dados.json"):
+    """Carrega a lista de clientes: objeto único, lista ou {"clientes": [...]} em dados.json"""
+    if not os.path.exists(json_path):
+        return []
+        
+    try:
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("clientes", [data])
+        return [normalize_client(item) for item in data]
+    except Exception as e:
+        logger.error(f"Erro ao ler lista de clientes em {json_path}: {e}")
+        return []
+
+
+def normalize_client(item):
+    """Credenciais de um cliente como texto: {uc, cpf_cnpj, data_nascimento}"""
+    return {
+        "uc": str(item.get("uc", "") or "").strip(),
+        "cpf_cnpj": str(item.get("cpf_cnpj", "") or "").strip(),
+        "data_nascimento": str(item.get("data_nascimento", "") or "").strip()
+    }
+
+
+def make_safe_folder_name(client_name):
+    """Sanitiza o nome do cliente para uso como nome de pasta (Title Case)"""
+    safe_client_name = re.sub(r'[<>:"/\\|?*]', '_', client_name)
+    safe_client_name = safe_client_name.strip()
+    
+    # Converte para Title Case (primeira letra de cada palavra maiúscula)
+    return safe_client_name.title()
+
+
+DATE_RE = re.compile(r"\b\d{2}/\d{2}/\d{4}\b")
+# Valor com ou sem separador de milhar ("1.099,00" ou "1099,00"), nunca um pedaço de número maior
+MONEY_RE = re.compile(r"(?<![\d.,])((?:\d{1,3}(?:\.\d{3})+|\d+),\d{2})")
+
+
+def parse_invoice_cells(cells):
+    """Mês de referência (1ª coluna), vencimento (data), valor (R$) e situação dos textos das colunas de uma fatura"""
+    fatura = {'mes': cells[0].strip() if cells else None, 'vencimento': None, 'valor': None, 'situacao': None}
+    for text in cells[1:]:
+        # Uma mesma coluna pode trazer data e valor: cada padrão é testado separadamente
+        date_match = DATE_RE.search(text)
+        money_match = MONEY_RE.search(text)
+        if fatura['vencimento'] is None and date_match:
+            fatura['vencimento'] = date_match.group(0)
+        if fatura['valor'] is None and money_match:
+            fatura['valor'] = money_match.group(1)
+        if (not date_match and not money_match and fatura['situacao'] is None
+                and text.strip() and text.strip().lower() != "download"):
+            fatura['situacao'] = text.strip()
+    return fatura
+
+
+# Alvo/argumento de __doPostBack('alvo','arg'), inclusive com aspas escapadas (setTimeout)
+DO_POSTBACK_RE = re.compile(
+    r"__doPostBack\(\s*\\?['\"]([^'\"\\]*)\\?['\"]\s*,\s*\\?['\"]([^'\"\\]*)\\?['\"]"
+)
+# Alvo de WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions("alvo", "arg", ...))
+POSTBACK_OPTIONS_RE = re.compile(
+    r"WebForm_PostBackOptions\(\s*['\"]([^'\"]*)['\"]\s*,\s*['\"]([^'\"]*)['\"]"
+)
+
+
+def extract_postback_target(script):
+    """Extrai (alvo, argumento) de um href/onclick de postback ASP.NET, ou None"""
+    if not script:
+        return None
+    match = DO_POSTBACK_RE.search(script) or POSTBACK_OPTIONS_RE.search(script)
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
+
+def parse_invoice_table(page):
+    """Faturas da tabela (linhas com link 'Download') a partir de um único HTML ou árvore lxml
+
+    Cada fatura traz mês, vencimento, valor, situação e o identificador estável do link
+    (alvo do postback, id e href), usado depois para disparar o download sem reler a página.
+    """
+    tree = page if hasattr(page, "xpath") else lxml_html.fromstring(page or "<html></html>")
+    faturas = []
+    for i, row in enumerate(tree.xpath("//tr[.//a[contains(text(), 'Download')]]")):
+        fatura = parse_invoice_cells([cell.text_content().strip() for cell in row.xpath("./td")])
+        link = row.xpath(".//a[contains(text(), 'Download')]")[0]
+        fatura.update({
+            'mes': fatura['mes'] or f"fatura_{i + 1}",
+            'alvo_postback': extract_postback_target(link.get("href") or link.get("onclick")),
+            'link_id': link.get("id"),
+            'href': link.get("href"),
+            'row_index': i
+        })
+        faturas.append(fatura)
+    return faturas
+
+
+# Nome no "Olá NOME, seja bem-vindo" e CPF/CNPJ mascarado (ex: 123.***.***-00)
+WELCOME_NAME_RE = re.compile(r'Olá\s+([A-ZÁÉÍÓÚÂÊÔÃÕÇ\s]+?)(?:,|\s+seja|\s+bem)', re.IGNORECASE)
+MASKED_DOCUMENT_RE = re.compile(r"[\d*]{3}\.[\d*]{3}\.[\d*]{3}-[\d*]{2}|[\d*]{2}\.[\d*]{3}\.[\d*]{3}/[\d*]{4}-[\d*]{2}")
+
+
+def looks_like_name(text):
+    """Texto com cara de nome de pessoa: mais de uma palavra, só letras"""
+    return len(text) > 5 and ' ' in text and text.replace(' ', '').isalpha()
+
+
+def parse_segunda_via_page(page):
+    """Nome do cliente, CPF/CNPJ mascarado e UCs da Segunda Via em uma única passada pelo HTML
+
+    Aceita o HTML (page_source) ou uma árvore lxml. 'ucs' é None quando o dropdown
+    de UCs não existe na página (diferente de um dropdown vazio).
+    """
+    tree = page if hasattr(page, "xpath") else lxml_html.fromstring(page or "<html></html>")
+    
+    # Nome: <strong> da mensagem de boas-vindas, "Olá <strong>", regex no texto e, por fim, qualquer <strong>
+    full_client_name = None
+    for element in tree.xpath(
+        "//span[@id='CONTENT_lblMensagemUsuarioGrupoB']//strong"
+        " | //span[contains(@id, 'lblMensagem') or contains(@id, 'MensagemUsuario')]//strong"
+        " | //span[contains(@class, 'mensagem-usuario')]//strong"
+    ):
+        text = element.text_content().strip()
+        if len(text) > 3:
+            full_client_name = text
+            break
+    
+    if not full_client_name:
+        for element in tree.xpath(
+            "//span[contains(text(), 'Olá') or contains(text(), 'bem vindo') or contains(text(), 'bem-vindo')]/strong"
+            " | //p[contains(text(), 'Olá')]//strong"
+        ):
+            text = element.text_content().strip()
+            if looks_like_name(text):
+                full_client_name = text
+                break
+    
+    page_text = tree.text_content()
+    if not full_client_name:
+        match = WELCOME_NAME_RE.search(page_text)
+        if match:
+            full_client_name = match.group(1).strip()
+    
+    if not full_client_name:
+        for element in tree.xpath("//strong"):
+            text = element.text_content().strip()
+            if looks_like_name(text):
+                full_client_name = text
+                break
+    
+    # Pasta: apenas primeiro e último nome
+    client_name = None
+    if full_client_name:
+        name_parts = full_client_name.split()
+        client_name = f"{name_parts[0]} {name_parts[-1]}" if len(name_parts) >= 2 else full_client_name
+    
+    masked_document = next((match.group(0) for match in MASKED_DOCUMENT_RE.finditer(page_text)
+                            if '*' in match.group(0)), None)
+    
+    # UCs: valores das opções do dropdown CONTENT_comboBoxUC
+    ucs = None
+    dropdowns = (tree.xpath("//select[contains(@id, 'comboBoxUC') or contains(@name, 'comboBoxUC')]")
+                 or tree.xpath("//select[contains(@class, 'DropDown') or contains(@name, 'UC')]"))
+    if dropdowns:
+        ucs = [value.strip() for value in dropdowns[0].xpath(".//option/@value") if value.strip()]
+    
+    return {
+        "nome_completo": full_client_name,
+        "nome_pasta": client_name,
+        "cpf_mascarado": masked_document,
+        "ucs": ucs
+    }
+
+
+def unnamed_client_id(masked_document=None):
+    """Identificador da pasta quando o nome do cliente não aparece na página"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if masked_document:
+        document = masked_document.replace('*', 'X').replace('.', '').replace('-', '').replace('/', '')
+        return f"Cliente_CPF_{document}_{timestamp}"
+    return f"Cliente_{timestamp}"
+
+
+def parse_brl(text):
+    """'1.234,56' -> 1234.56"""
+    return float(text.replace(".", "").replace(",", "."))
+
+
+def format_brl(value):
+    """1234.56 -> '1.234,56'"""
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def summarize_invoices(faturas):
+    """Campos do relatório de uma UC a partir das faturas lidas da tabela"""
+    return {
+        "faturas_em_aberto": len(faturas),
+        "meses_referencia": [fatura['mes'] for fatura in faturas],
+        "valor_total_devido": format_brl(sum(parse_brl(fatura['valor']) for fatura in faturas if fatura.get('valor'))),
+        "faturas": [{key: fatura.get(key) for key in ('mes', 'vencimento', 'valor', 'situacao')} for fatura in faturas]
+    }
+
+
+def build_invoice_filename(uc_number, mes):
+    """Nome do PDF da fatura: <uc>_<Mes>_<AA>.pdf a partir do mês de referência (ex: JAN/2024)"""
+    mes_ano = mes.replace('/', '_')
+    mes_parts = mes_ano.split('_')
+    if len(mes_parts) == 2:
+        mes_abrev = mes_parts[0][:3].capitalize()
+        ano_abrev = mes_parts[1][-2:]
+        return f"{uc_number}_{mes_abrev}_{ano_abrev}.pdf"
+    return f"{uc_number}_{mes_ano}.pdf"
+
+
+
+#-------------- Disparo do download (JS) ----------#
+
+# Recebe (alvo, argumento, id do link, posição da linha) lidos da tabela de faturas e aciona
+# o download: __doPostBack quando há alvo, senão clique no link pelo id ou pela posição.
+# Retorna o método usado, ou null se o link não existir mais
+TRIGGER_INVOICE_DOWNLOAD_JS = r"""
+var target = arguments[0], argument = arguments[1], linkId = arguments[2], rowIndex = arguments[3];
+if (target && typeof window.__doPostBack === 'function') {
+    window.__doPostBack(target, argument || '');
+    return 'postback';
+}
+var link = linkId ? document.getElementById(linkId) : null;
+if (!link) {
+    var rows = document.evaluate("//tr[.//a[contains(text(), 'Download')]]", document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var row = rowIndex < rows.snapshotLength ? rows.snapshotItem(rowIndex) : null;
+    link = row ? document.evaluate(".//a[contains(text(), 'Download')]", row, null,
+                                   XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue : null;
+}
+if (!link) {
+    return null;
+}
+link.scrollIntoView(true);
+link.click();
+return linkId && link.id === linkId ? 'id' : 'posicao';
+"""
+
+
+#-------------- Formulário de emissão (JS) ----------#
+
+# Recebe [[campo, valor], ...] e o botão de envio (sufixos dos ids/names ASP.NET, ex: comboBoxUC).
+# Preenche os campos em ordem; um campo com AutoPostBack (onchange com __doPostBack) que mudou de
+# valor dispara o postback real e o script para, devolvendo {status: 'postback'} para o Python
+# aguardar e chamar de novo. Com tudo preenchido clica no botão: {status: 'enviado'}.
+# Campo/opção inexistente: {status: 'ausente', campo}
+FAST_EMIT_JS = r"""
+var fields = arguments[0], submitKey = arguments[1];
+function byKey(key) {
+    return document.getElementById('CONTENT_' + key)
+        || document.querySelector("[name$='$" + key + "'], [id$='_" + key + "']");
+}
+for (var i = 0; i < fields.length; i++) {
+    var el = byKey(fields[i][0]), value = fields[i][1];
+    if (!el || !Array.prototype.some.call(el.options || [], function (o) { return o.value === value; })) {
+        return {status: 'ausente', campo: fields[i][0]};
+    }
+    if (el.value === value) {
+        continue;
+    }
+    el.value = value;
+    var handler = el.getAttribute('onchange') || '';
+    var autoPostBack = /__doPostBack|WebForm_DoPostBack/.test(handler);
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    if (autoPostBack) {
+        return {status: 'postback', campo: fields[i][0]};
+    }
+}
+var button = byKey(submitKey);
+if (!button || button.disabled) {
+    return {status: 'ausente', campo: submitKey};
+}
+button.click();
+return {status: 'enviado'};
+"""
+
+
+#-------------- Popup de confirmação (JS) ----------#
+
+# Botão OK do popup exibido após o link Download, em ordem de preferência
+POPUP_OK_SELECTORS = [
+    "input#CONTENT_btnModal.btn.btn-info.btnModal.ModalButton",
+    "input#CONTENT_btnModal",
+    "input.btnModal",
+    "button.ModalButton",
+    "input[value='OK']"
+]
+
+# Prefixo do disparo do download: marca como antigos (data-eq-stale) os botões OK já visíveis
+# antes do clique, para que o popup da fatura anterior não seja confirmado no lugar do novo.
+# Recebe os seletores em arguments[4]
+MARK_STALE_POPUP_JS = r"""
+(function (selectors) {
+    function visible(el) {
+        var rect = el.getBoundingClientRect(), style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && !el.disabled;
+    }
+    var candidates = Array.prototype.slice.call(document.querySelectorAll(selectors.join(',')))
+        .concat(Array.prototype.slice.call(document.getElementsByTagName('button')));
+    candidates.forEach(function (el) {
+        if (visible(el)) { el.setAttribute('data-eq-stale', '1'); }
+    });
+})(arguments[4]);
+"""
+
+# Script assíncrono: clica no OK assim que ele estiver visível e habilitado (MutationObserver,
+# sem polling) e devolve {status: 'clicado', seletor}; {status: 'timeout'} após arguments[1] ms.
+# Botões <button> com texto "OK" valem como último seletor. Botões marcados como antigos só
+# voltam a valer depois de sumirem (modal reaproveitado), e nada é clicado enquanto houver
+# postback assíncrono em andamento
+POPUP_CONFIRM_JS = r"""
+var selectors = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var finished = false, observer = null, timer = null;
+function visible(el) {
+    var rect = el.getBoundingClientRect(), style = window.getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && !el.disabled;
+}
+function fresh(el) {
+    if (!el.hasAttribute('data-eq-stale')) { return visible(el); }
+    if (!visible(el)) { el.removeAttribute('data-eq-stale'); }
+    return false;
+}
+function find() {
+    var state = window.__eqPostback;
+    if (state && state.begin > state.end) { return null; }
+    for (var i = 0; i < selectors.length; i++) {
+        var matches = document.querySelectorAll(selectors[i]);
+        for (var j = 0; j < matches.length; j++) {
+            if (fresh(matches[j])) { return [matches[j], selectors[i]]; }
+        }
+    }
+    var buttons = document.getElementsByTagName('button');
+    for (var k = 0; k < buttons.length; k++) {
+        if (buttons[k].textContent.trim() === 'OK' && fresh(buttons[k])) { return [buttons[k], 'button:OK']; }
+    }
+    return null;
+}
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(timer);
+    done(result);
+}
+function attempt() {
+    var found = find();
+    if (!found) { return false; }
+    found[0].click();
+    finish({status: 'clicado', seletor: found[1]});
+    return true;
+}
+if (!attempt()) {
+    observer = new MutationObserver(attempt);
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true,
+                                                 attributeFilter: ['style', 'class', 'hidden', 'disabled']});
+    timer = setTimeout(function () { finish({status: 'timeout'}); }, timeoutMs);
+}
+"""
+
+
+#-------------- Resolvedor de elementos (JS) ----------#
+
+# Recebe a lista ordenada [[by, seletor], ...] e devolve, em uma única chamada, o primeiro
+# elemento visível (e habilitado, se exigido) com o diagnóstico de cada seletor testado
+RESOLVE_ELEMENT_JS = """
+var candidates = arguments[0], requireEnabled = arguments[1];
+function isVisible(el) {
+    if (!el.isConnected) { return false; }
+    var style = window.getComputedStyle(el);
+    if (style.display === 'none' || style.visibility === 'hidden' ||
+        style.visibility === 'collapse' || parseFloat(style.opacity) === 0) { return false; }
+    var rects = el.getClientRects();
+    return rects.length > 0 && rects[0].width > 0 && rects[0].height > 0;
+}
+function isEnabled(el) {
+    return !el.disabled && !(el.closest && el.closest('fieldset[disabled]'));
+}
+function query(by, selector) {
+    if (by === 'xpath') {
+        var snapshot = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var nodes = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+        return nodes;
+    }
+    return Array.prototype.slice.call(document.querySelectorAll(selector));
+}
+var diagnostics = [];
+for (var c = 0; c < candidates.length; c++) {
+    var entry = {selector: candidates[c][1], found: 0, visible: 0, error: null};
+    diagnostics.push(entry);
+    var nodes;
+    try { nodes = query(candidates[c][0], candidates[c][1]); }
+    catch (e) { entry.error = String(e.message || e); continue; }
+    entry.found = nodes.length;
+    for (var n = 0; n < nodes.length; n++) {
+        if (isVisible(nodes[n])) {
+            entry.visible += 1;
+            if (!requireEnabled || isEnabled(nodes[n])) {
+                return {element: nodes[n], index: c, diagnostics: diagnostics};
+            }
+        }
+    }
+}
+return {element: null, index: -1, diagnostics: diagnostics};
+"""
+
+
+def resolve_first_element(driver, locators, require_enabled=False):
+    """Primeiro elemento visível (e habilitado) entre os localizadores, em uma ida ao navegador
+
+    Retorna (elemento, índice do localizador, diagnósticos). Se o script falhar, cai na
+    verificação elemento a elemento (uma chamada WebDriver por checagem).
+    """
+    try:
+        result = driver.execute_script(
+            RESOLVE_ELEMENT_JS, [[by, selector] for by, selector in locators], require_enabled
+        )
+        if result is not None:
+            return result["element"], result["index"], result["diagnostics"]
+    except WebDriverException as e:
+        logger.debug(f"Resolvedor JS indisponível, usando WebDriver: {e}")
+    
+    diagnostics = []
+    for index, (by, selector) in enumerate(locators):
+        entry = {"selector": selector, "found": 0, "visible": 0, "error": None}
+        diagnostics.append(entry)
+        try:
+            elements = driver.find_elements(by, selector)
+        except Exception as e:
+            entry["error"] = str(e)
+            continue
+        entry["found"] = len(elements)
+        for element in elements:
+            try:
+                if element.is_displayed():
+                    entry["visible"] += 1
+                    if not require_enabled or element.is_enabled():
+                        return element, index, diagnostics
+            except StaleElementReferenceException:
+                continue
+    return None, -1, diagnostics
+
+
+# Limite de navegadores simultâneos por cliente (evita bloqueio/limitação pelo portal)
+MAX_UC_WORKERS = 4
+
+# Quando um seletor falha no login/navegação:
+#   "interativo" - pede intervenção manual no navegador (input)
+#   "falhar"     - salva print + HTML da página e desiste do cliente na hora
+#   "repetir"    - repete a etapa com espera crescente e, esgotadas as tentativas, falha como acima
+MANUAL_POLICIES = ("interativo", "falhar", "repetir")
+
+
+#-------------- Bloqueio de recursos ----------#
+
+# Padrões no formato URLPattern absoluto exigido por Network.setBlockedURLs (urlPatterns):
+# protocolo://host:porta/caminho, com '*' em qualquer parte
+
+# Recursos que o bot não usa: imagens, fontes, mídia e rastreadores
+BLOCKED_RESOURCES = [
+    f"*://*:*/*.{extension}" for extension in (
+        "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp",
+        "woff", "woff2", "ttf", "otf", "eot",
+        "mp4", "webm", "mp3"
+    )
+] + [
+    f"*://*{host}:*/*" for host in (
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+        "connect.facebook.net", "hotjar.com", "clarity.ms"
+    )
+] + ["*://*:*/*/collect*"]
+
+# Nunca bloqueados: scripts/estilos do WebForms (ValidarCamposAreaLogada, __doPostBack, modais).
+# Os scripts do portal não casam com a lista de bloqueio; o CSS é mantido porque as esperas
+# dependem da visibilidade real dos elementos (ex: popup CONTENT_btnModal)
+ALLOWED_RESOURCES = ["*://*:*/*WebResource.axd*", "*://*:*/*ScriptResource.axd*", "*://*:*/*.css"]
+
+# Hosts do reCAPTCHA do login: imagens e fontes deles nunca são bloqueadas
+RECAPTCHA_HOSTS = ["*://*.google.com:*/*", "*://*.gstatic.com:*/*", "*://*.recaptcha.net:*/*"]
+
+# Listas por tipo de página ("bloquear" e "permitir"; permitir tem prioridade)
+RESOURCE_BLOCKING = {
+    "login": {
+        "bloquear": BLOCKED_RESOURCES,
+        "permitir": ALLOWED_RESOURCES + RECAPTCHA_HOSTS
+    },
+    "segunda_via": {"bloquear": BLOCKED_RESOURCES, "permitir": ALLOWED_RESOURCES},
+    "faturas": {"bloquear": BLOCKED_RESOURCES, "permitir": ALLOWED_RESOURCES}
+}
+
+
+def url_pattern_host(pattern):
+    """Host de um URLPattern absoluto ('*://*.gstatic.com:*/*' -> '*.gstatic.com')"""
+    return pattern.split("://", 1)[-1].split("/", 1)[0].rsplit(":", 1)[0]
+
+
+def url_pattern_to_glob(pattern):
+    """URLPattern absoluto -> curinga do formato antigo 'urls' ('*://*:*/*.png' -> '**/*.png')"""
+    return pattern.replace(":*/", "/").replace("://", "")
+
+
+#-------------- Esperas por condição ----------#
+
+# Timeout máximo (segundos) de cada condição de prontidão
+WAIT_TIMEOUTS = {
+    "page_ready": 15,
+    "element_present": 15,
+    "element_clickable": 15,
+    "url_changed": 20,
+    "postback_done": 20,
+    "download_appeared": 30,
+    "popup_visible": 10
+}
+
+
+class PortalWaiter:
+    """Esperas nomeadas: cada etapa avança assim que o portal estiver pronto, sem pausas fixas"""
+
+    # Se nenhum postback/navegação começar nesse intervalo, a ação não gerou postback
+    # (com os ganchos abaixo o início é visto na hora; o intervalo cobre só setTimeout/onchange)
+    POSTBACK_GRACE = 0.5
+
+    # Marca o documento atual e instala, uma vez por documento, os ganchos de detecção:
+    # submit de formulário (inclusive form.submit() do __doPostBack), beforeunload/pagehide e
+    # beginRequest/endRequest do Sys.WebForms.PageRequestManager (UpdatePanel), quando existir
+    ARM_POSTBACK_JS = r"""
+(function () {
+    var w = window;
+    w.__eqPostback = {armed: true, submitted: false, unloading: false, begin: 0, end: 0};
+    if (w.__eqHooks) {
+        return;
+    }
+    w.__eqHooks = true;
+    var mark = function (key) { return function () { w.__eqPostback[key] = true; }; };
+    w.addEventListener('beforeunload', mark('unloading'));
+    w.addEventListener('pagehide', mark('unloading'));
+    document.addEventListener('submit', mark('submitted'), true);
+    var nativeSubmit = HTMLFormElement.prototype.submit;
+    HTMLFormElement.prototype.submit = function () {
+        w.__eqPostback.submitted = true;
+        return nativeSubmit.apply(this, arguments);
+    };
+    try {
+        var prm = Sys.WebForms.PageRequestManager.getInstance();
+        prm.add_beginRequest(function () { w.__eqPostback.begin++; });
+        prm.add_endRequest(function () { w.__eqPostback.end++; });
+    } catch (e) {}
+})();
+"""
+
+    # Estado do postback no documento atual (armed=false: é um documento novo)
+    POSTBACK_STATE_JS = r"""
+var s = window.__eqPostback || {}, inAsync = false;
+try { inAsync = Sys.WebForms.PageRequestManager.getInstance().get_isInAsyncPostBack(); } catch (e) {}
+return {armed: !!s.armed, submitted: !!s.submitted, unloading: !!s.unloading,
+        begin: s.begin || 0, end: s.end || 0, async: inAsync, ready: document.readyState};
+"""
+
+    def __init__(self, driver, timeouts=None, poll_frequency=0.2):
+        self.driver = driver
+        self.timeouts = dict(WAIT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.poll_frequency = poll_frequency
+
+    def _until(self, condition_name, condition, timeout=None):
+        """Aguarda a condição; retorna o valor obtido ou None em caso de timeout"""
+        limit = self.timeouts[condition_name] if timeout is None else timeout
+        started = time.time()
+        try:
+            result = WebDriverWait(
+                self.driver, limit,
+                poll_frequency=self.poll_frequency,
+                ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+            ).until(condition)
+            logger.debug(f"Condição '{condition_name}' satisfeita em {time.time() - started:.2f}s")
+            return result
+        except TimeoutException:
+            logger.warning(f"Timeout de {limit}s aguardando condição '{condition_name}'")
             return None
-            
+
+    def _first_element(self, locators, require_enabled):
+        """Retorna o primeiro elemento visível (e habilitado, se exigido) entre os localizadores"""
+        element, _, _ = resolve_first_element(self.driver, locators, require_enabled)
+        return element or False
+
+    def page_ready(self, timeout=None):
+        """Aguarda document.readyState == 'complete'"""
+        return self._until(
+            "page_ready",
+            lambda d: d.execute_script("return document.readyState") == "complete",
+            timeout
+        )
+
+    def element_present(self, locators, timeout=None):
+        """Aguarda algum dos localizadores (By, seletor) existir e estar visível"""
+        return self._until(
+            "element_present",
+            lambda d: self._first_element(locators, require_enabled=False),
+            timeout
+        )
+
+    def element_clickable(self, locators, timeout=None, condition_name="element_clickable"):
+        """Aguarda algum dos localizadores estar visível e habilitado"""
+        return self._until(
+            condition_name,
+            lambda d: self._first_element(locators, require_enabled=True),
+            timeout
+        )
+
+    def url_changed(self, old_url, timeout=None, or_locators=None):
+        """Aguarda a URL mudar (ou, opcionalmente, um elemento esperado aparecer)"""
+        def condition(driver):
+            if driver.current_url != old_url:
+                return True
+            if or_locators:
+                return self._first_element(or_locators, require_enabled=False)
+            return False
+        return self._until("url_changed", condition, timeout)
+
+    def arm_postback(self):
+        """Marca o documento atual antes de uma ação que pode disparar postback"""
+        self.driver.execute_script(self.ARM_POSTBACK_JS)
+        self._armed_at = time.time()
+
+    def run_armed(self, script, *args):
+        """Arma a detecção de postback e executa o script na mesma ida ao navegador"""
+        self._armed_at = time.time()
+        return self.driver.execute_script(self.ARM_POSTBACK_JS + script, *args)
+
+    def postback_done(self, timeout=None):
+        """Aguarda o postback ASP.NET (completo ou assíncrono) terminar
+
+        Deve ser chamado após arm_postback()/run_armed(). Concluído quando:
+        - um novo documento terminou de carregar (postback completo / navegação);
+        - todo beginRequest do PageRequestManager teve o seu endRequest (UpdatePanel);
+        - nenhum submit, descarregamento ou requisição assíncrona começou em POSTBACK_GRACE segundos.
+        """
+        armed_at = getattr(self, "_armed_at", time.time())
+
+        def condition(driver):
+            try:
+                state = driver.execute_script(self.POSTBACK_STATE_JS)
+            except WebDriverException:
+                # Documento em transição durante a navegação
+                return False
+            if not state:
+                return False
+            if not state["armed"]:
+                return state["ready"] == "complete"
+            if state["async"] or state["end"] < state["begin"]:
+                return False
+            if state["begin"]:
+                return True
+            if state["submitted"] or state["unloading"]:
+                return False
+            return time.time() - armed_at > self.POSTBACK_GRACE
+
+        return self._until("postback_done", condition, timeout)
+
+    def postback(self, action, timeout=None):
+        """Arma a detecção, executa a ação (callable) e aguarda o postback que ela disparar"""
+        self.arm_postback()
+        result = action()
+        self.postback_done(timeout)
+        return result
+
+    def download_appeared(self, folder, since, timeout=None):
+        """Aguarda um PDF novo (criado após 'since') e sem .crdownload pendente na pasta"""
+        def condition(driver):
+            try:
+                names = os.listdir(folder)
+                if any(name.endswith('.crdownload') for name in names):
+                    return False
+                for name in names:
+                    if name.lower().endswith('.pdf'):
+                        path = os.path.join(folder, name)
+                        if os.path.getctime(path) > since and os.path.getsize(path) > 0:
+                            return path
+            except OSError:
+                return False
+            return False
+        return self._until("download_appeared", condition, timeout)
+
+
+#-------------- Métricas de execução ----------#
+
+_metrics_file_lock = threading.Lock()
+
+
+class _SkippedStep:
+    """Retorno de um passo que não se aplicou (ex: nenhuma sessão salva): falso, mas não é falha"""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "STEP_SKIPPED"
+
+
+STEP_SKIPPED = _SkippedStep()
+
+
+def timed_step(per_uc=False):
+    """Decorador: registra início, fim, duração e resultado do passo (ok/falha/erro/ignorado)
+
+    Um passo que retorna STEP_SKIPPED é registrado como "ignorado" (não conta como falha).
+
+    Com per_uc=True o primeiro argumento é o número da UC e o span vai para a UC
+    no relatorio.json; os demais vão para as métricas gerais do relatório. Todos
+    também são gravados em metricas_execucao.jsonl.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.time()
+            outcome = "erro"
+            try:
+                result = method(self, *args, **kwargs)
+                outcome = "ignorado" if result is STEP_SKIPPED else ("ok" if result else "falha")
+                return result
+            finally:
+                span = {
+                    "etapa": method.__name__,
+                    "inicio": datetime.fromtimestamp(started).isoformat(timespec="milliseconds"),
+                    "fim": datetime.now().isoformat(timespec="milliseconds"),
+                    "duracao_s": round(time.time() - started, 3),
+                    "resultado": outcome
+                }
+                if per_uc:
+                    span["uc"] = kwargs.get("uc_number", args[0] if args else None)
+                    fatura = args[1] if len(args) > 1 else None
+                    if isinstance(fatura, dict) and fatura.get("mes"):
+                        span["fatura"] = fatura["mes"]
+                elif self.current_uc:
+                    span["uc"] = self.current_uc  # Passo executado dentro do processamento de uma UC
+                self.record_span(span)
+        return wrapper
+    return decorator
+
+
+def append_run_metrics(path, records):
+    """Acrescenta registros (um JSON por linha) ao arquivo de métricas da execução"""
+    if not path or not records:
+        return
+    with _metrics_file_lock:
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+#-------------- Downloads via DevTools ----------#
+
+def write_pdf_atomically(filepath, chunks, check=None):
+    """Grava os blocos em arquivo temporário e só renomeia para o destino se for um PDF
+
+    check(conteúdo) -> bool, opcional, confere o PDF antes de substituir o destino.
+    """
+    temp_path = f"{filepath}.part"
+    try:
+        with open(temp_path, "wb") as f:
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+        if not pdf_file_passes(temp_path, check):
+            return False
+        os.replace(temp_path, filepath)
+        return True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def pdf_file_passes(filepath, check=None):
+    """Arquivo começa com %PDF e, se houver conferência, é aprovado por check(conteúdo)"""
+    with open(filepath, "rb") as f:
+        data = f.read() if check else f.read(4)
+    return data[:4] == b"%PDF" and (check is None or check(data))
+
+
+# Meses de referência no texto do PDF ('JAN/2024', 'Março/2026')
+REFERENCE_MONTH_RE = re.compile(r"\b(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)[a-zç]*/(\d{4})\b",
+                                re.IGNORECASE)
+PDF_STREAM_RE = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.DOTALL)
+
+
+def pdf_text(data):
+    """Texto do PDF para conferência: bytes brutos e streams FlateDecode descompactados"""
+    parts = [data]
+    for match in PDF_STREAM_RE.finditer(data):
         try:
-            with open(json_path, 'r') as f:
+            parts.append(zlib.decompress(match.group(1)))
+        except zlib.error:
+            pass
+    return b"\n".join(parts).decode("latin-1")
+
+
+def pdf_matches_invoice(data, uc_number, mes, client_ucs=()):
+    """Confere se o PDF é da UC e do mês pedidos
+
+    Só reprova o que o texto permite afirmar: cita outra UC do cliente e não a pedida, ou
+    cita meses de referência sem o pedido. PDF sem texto legível (fonte embutida) passa.
+    """
+    text = pdf_text(data)
+    found_ucs = {uc for uc in (uc_number, *client_ucs) if re.search(rf"(?<!\d){re.escape(uc)}(?!\d)", text)}
+    if found_ucs and uc_number not in found_ucs:
+        return False
+    months = {(match.group(1).upper(), match.group(2)) for match in REFERENCE_MONTH_RE.finditer(text)}
+    expected = {(match.group(1).upper(), match.group(2)) for match in REFERENCE_MONTH_RE.finditer(mes)}
+    return not months or not expected or bool(months & expected)
+
+
+def is_valid_pdf(filepath):
+    """PDF íntegro: começa com %PDF e termina com o marcador %%EOF (download não truncado)"""
+    try:
+        if not filepath or os.path.getsize(filepath) < 8:
+            return False
+        with open(filepath, "rb") as f:
+            if f.read(4) != b"%PDF":
+                return False
+            f.seek(max(0, os.path.getsize(filepath) - 1024))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+
+class DownloadTracker:
+    """Acompanha os downloads do Chrome pelos eventos do DevTools, sem varrer pastas
+
+    Os eventos downloadWillBegin/downloadProgress chegam pelo log de performance do
+    chromedriver. Cada download é identificado pelo GUID, com nome sugerido, bytes
+    recebidos e estado; com o comportamento 'allowAndName' o Chrome grava o arquivo
+    com o próprio GUID como nome, então não há como confundir downloads.
+    """
+
+    def __init__(self, driver, poll_frequency=0.1):
+        self.driver = driver
+        self.poll_frequency = poll_frequency
+        self.downloads = {}      # guid -> estado do download
+        self.order = []          # GUIDs na ordem em que começaram
+
+    def _download(self, guid):
+        if guid not in self.downloads:
+            self.downloads[guid] = {"guid": guid, "url": None, "arquivo_sugerido": None,
+                                    "recebidos": 0, "total": 0, "estado": "inProgress",
+                                    "caminho": None, "inicio": time.time(), "fim": None}
+            self.order.append(guid)
+        return self.downloads[guid]
+
+    def _handle_event(self, method, params):
+        if method in ("Browser.downloadWillBegin", "Page.downloadWillBegin"):
+            download = self._download(params["guid"])
+            download["url"] = params.get("url")
+            download["arquivo_sugerido"] = params.get("suggestedFilename")
+        elif method in ("Browser.downloadProgress", "Page.downloadProgress"):
+            download = self._download(params["guid"])
+            download["recebidos"] = params.get("receivedBytes", download["recebidos"])
+            download["total"] = params.get("totalBytes", download["total"])
+            download["estado"] = params.get("state", download["estado"])
+            if params.get("filePath"):
+                download["caminho"] = params["filePath"]
+            if download["estado"] in ("completed", "canceled"):
+                download["fim"] = time.time()
+
+    def pump(self):
+        """Processa os eventos acumulados no log de performance"""
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError, TypeError):
+                continue
+            method = message.get("method", "")
+            if ".download" in method:
+                self._handle_event(method, message.get("params", {}))
+
+    def mark(self):
+        """Ponto de referência antes de disparar um download"""
+        self.pump()
+        return {"downloads": len(self.order)}
+
+    def wait(self, mark, timeout=30):
+        """Aguarda o primeiro download iniciado após 'mark' terminar; retorna o registro ou None"""
+        end_time = time.time() + timeout
+        while time.time() < end_time:
+            self.pump()
+            for guid in self.order[mark["downloads"]:]:
+                download = self.downloads[guid]
+                if download["estado"] == "completed":
+                    logger.info(f"Download {guid} concluído: {download['recebidos']} bytes "
+                                f"em {download['fim'] - download['inicio']:.2f}s")
+                    return download
+                if download["estado"] == "canceled":
+                    logger.warning(f"Download {guid} cancelado ({download['arquivo_sugerido']})")
+                    return None
+            time.sleep(self.poll_frequency)
+        logger.warning(f"Timeout de {timeout}s aguardando download (eventos CDP)")
+        return None
+
+    def file_path(self, download, folder):
+        """Caminho do arquivo gravado pelo Chrome para o download"""
+        candidates = [
+            download.get("caminho"),
+            os.path.join(folder, download["guid"]),
+            os.path.join(folder, download["arquivo_sugerido"] or "")
+        ]
+        for path in candidates:
+            if path and os.path.isfile(path):
+                return path
+        return None
+
+
+#-------------- Relatório do cliente ----------#
+
+# Relatórios abertos: gravados na saída do processo se ainda tiverem alterações pendentes
+_open_reports = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_reports():
+    for report in list(_open_reports):
+        report.flush()
+
+
+class ClientReport:
+    """relatorio.json mantido em memória e gravado em lote, de forma atômica
+
+    A memória é a fonte da verdade. As gravações são limitadas (throttle) a uma a cada
+    'flush_interval' segundos: uma atualização dentro do intervalo agenda um timer que
+    grava o estado pendente ao fim dele, então nada fica mais que 'flush_interval' só em
+    memória. Também grava nas fronteiras de UC, no encerramento e na saída do processo.
+    Cada gravação usa arquivo temporário + fsync + rename, então um travamento deixa no
+    disco a versão anterior completa, nunca um JSON pela metade.
+    """
+
+    def __init__(self, path, data, flush_interval=2.0):
+        self.path = path
+        self.data = data
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.dirty = True
+        self.last_flush = 0.0
+        self.flush_count = 0
+        self._ucs = {uc_data["uc"]: uc_data for uc_data in data.get("ucs", [])}
+        self._timer = None
+        _open_reports.add(self)
+
+    @classmethod
+    def create(cls, path, client_name, ucs_list, flush_interval=2.0):
+        """Relatório inicial com todas as UCs pendentes"""
+        data = {
+            "cliente": client_name,  # Usa o nome completo no JSON
+            "data_busca": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            "total_ucs": len(ucs_list),
+            "ucs": []
+        }
+        
+        # Adiciona cada UC com estrutura inicial (simplificada)
+        for uc in ucs_list:
+            data["ucs"].append({
+                "uc": uc,                   # Apenas o número da UC
+                "faturas_em_aberto": None,  # Será preenchido posteriormente
+                "meses_referencia": [],     # Será preenchido posteriormente
+                "valor_total_devido": None, # Será preenchido posteriormente
+                "status_processamento": "pendente"
+            })
+        return cls(path, data, flush_interval)
+
+    @classmethod
+    def resume(cls, path, client_name, ucs_list, flush_interval=2.0):
+        """Reabre um relatório existente mantendo o status de cada UC; UCs novas entram pendentes
+
+        As métricas de tempo não são herdadas: como 'metricas_etapas', as 'metricas' de cada UC
+        descrevem só a execução atual (o histórico fica em metricas_execucao.jsonl).
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        report = cls.create(path, client_name, ucs_list, flush_interval)
+        previous_ucs = {uc_data.get("uc"): uc_data for uc_data in previous.get("ucs", [])}
+        for uc_data in report.data["ucs"]:
+            if uc_data["uc"] in previous_ucs:
+                uc_data.update({key: value for key, value in previous_ucs[uc_data["uc"]].items() if key != "metricas"})
+        report.data["data_busca"] = previous.get("data_busca", report.data["data_busca"])
+        report.data["data_retomada"] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        return report
+
+    def uc(self, uc_number):
+        """Dados atuais da UC (ou None)"""
+        return self._ucs.get(uc_number)
+
+    def add_spans(self, spans):
+        """Anexa spans de tempo: na UC correspondente ou em 'metricas_etapas' do relatório"""
+        with self.lock:
+            for span in spans:
+                uc_data = self._ucs.get(span.get("uc"))
+                if uc_data is not None:
+                    uc_data.setdefault("metricas", []).append(span)
+                else:
+                    self.data.setdefault("metricas_etapas", []).append(span)
+            self.dirty = True
+        self.flush(force=False)
+
+    def update_uc(self, uc_number, updates):
+        """Atualiza os dados de uma UC; retorna False se a UC não estiver no relatório"""
+        with self.lock:
+            uc_data = self._ucs.get(uc_number)
+            if uc_data is None:
+                return False
+            uc_data.update(updates)
+            self.dirty = True
+        self.flush(force=False)
+        return True
+
+    def update(self, updates):
+        """Atualiza campos gerais do relatório"""
+        with self.lock:
+            self.data.update(updates)
+            self.dirty = True
+        self.flush(force=False)
+
+    def flush(self, force=True):
+        """Grava o relatório se houver alterações (sem 'force', respeita o intervalo mínimo)"""
+        with self.lock:
+            if not self.dirty:
+                return True
+            elapsed = time.time() - self.last_flush
+            if not force and elapsed < self.flush_interval:
+                self._schedule_flush(self.flush_interval - elapsed)
+                return True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            temp_path = f"{self.path}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+                self._fsync_folder()
+            except Exception as e:
+                logger.error(f"Erro ao gravar {self.path}: {e}")
+                return False
+            self.dirty = False
+            self.last_flush = time.time()
+            self.flush_count += 1
+            return True
+
+    def _schedule_flush(self, delay):
+        """Agenda a gravação do estado pendente para o fim do intervalo (um timer por vez)"""
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._timer_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timer_flush(self):
+        with self.lock:
+            self._timer = None
+        self.flush()
+
+    def _fsync_folder(self):
+        """Garante que o rename chegou ao disco (não suportado no Windows)"""
+        if os.name != "posix":
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+#-------------- Manifesto de downloads ----------#
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InvoiceManifest:
+    """manifesto.json da pasta da UC: tamanho e sha256 de cada PDF baixado
+
+    Uma fatura só é considerada baixada se o arquivo existe com o mesmo tamanho e hash
+    registrados; arquivo ausente, truncado ou alterado volta a ser baixado.
+    """
+
+    def __init__(self, folder):
+        self.path = os.path.join(folder, "manifesto.json")
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("arquivos", {})
+            except Exception as e:
+                logger.warning(f"Manifesto ignorado ({self.path}): {e}")
+
+    def is_current(self, filename):
+        entry = self.entries.get(filename)
+        filepath = os.path.join(os.path.dirname(self.path), filename)
+        if not entry or not os.path.isfile(filepath):
+            return False
+        # Tamanho primeiro (barato); hash só se o tamanho confere
+        return os.path.getsize(filepath) == entry["tamanho"] and file_sha256(filepath) == entry["sha256"]
+
+    def record(self, filename, mes):
+        filepath = os.path.join(os.path.dirname(self.path), filename)
+        self.entries[filename] = {
+            "mes": mes,
+            "tamanho": os.path.getsize(filepath),
+            "sha256": file_sha256(filepath),
+            "baixado_em": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        }
+        self.dirty = True
+
+    def save(self):
+        """Grava o manifesto de forma atômica (arquivo temporário + rename)"""
+        if not self.dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"arquivos": self.entries}, f, indent=4, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+
+#-------------- Cache de seletores ----------#
+
+class SelectorCache:
+    """Cache persistente do seletor vencedor de cada campo, com estatísticas de acerto/erro
+
+    As chaves seguem o formato 'página:campo' (ex: 'login:uc'); o valor é o par
+    (By, seletor) que encontrou o elemento da última vez.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path):
+        """Instância única por arquivo (os workers do pool compartilham o mesmo cache)"""
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(path)
+            return cls._shared[path]
+
+    def __init__(self, path="selector_cache.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return {
-                    "uc": data.get("uc", ""),
-                    "cpf_cnpj": data.get("cpf_cnpj", ""),
-                    "data_nascimento": data.get("data_nascimento", "")
-                }
+            self.entries = {key: tuple(value) for key, value in data.get("seletores", {}).items()}
+            self.stats = data.get("estatisticas", {})
         except Exception as e:
-            logger.error(f"Erro ao ler arquivo JSON: {e}")
-            return None
+            logger.warning(f"Cache de seletores ignorado ({self.path}): {e}")
 
+    def ordered(self, key, candidates):
+        """Candidatos com o seletor vencedor anterior em primeiro lugar"""
+        cached = self.entries.get(key)
+        if cached in candidates:
+            return [cached] + [candidate for candidate in candidates if candidate != cached]
+        return list(candidates)
+
+    def record(self, key, winner):
+        """Registra o resultado da busca: acerto (seletor do cache), falta (precisou do fallback) ou nada encontrado"""
+        with self.lock:
+            stats = self.stats.setdefault(key, {"acertos": 0, "faltas": 0, "nao_encontrado": 0})
+            if winner is None:
+                stats["nao_encontrado"] += 1
+            elif self.entries.get(key) == winner:
+                stats["acertos"] += 1
+            else:
+                stats["faltas"] += 1
+                self.entries[key] = winner
+            self.dirty = True
+
+    def save(self):
+        """Grava o cache de forma atômica (arquivo temporário + rename)"""
+        if not self.path:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                "seletores": {key: list(value) for key, value in self.entries.items()},
+                "estatisticas": self.stats
+            }
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+                self.dirty = False
+            except Exception as e:
+                logger.warning(f"Erro ao salvar cache de seletores: {e}")
 
 
 class EquatorialDownloaderFixed:
+    ENGINE_NAME = "selenium"
 
 #-------------- Passo 0 ---------#
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, wait_timeouts=None, base_url="https://goias.equatorialenergia.com.br",
+                 output_root="clientes_faturas", download_dir=None,
+                 selector_cache_path="selector_cache.json", resume=False,
+                 metrics_path=None, resource_blocking=RESOURCE_BLOCKING,
+                 session_dir="sessoes", session_max_age=8 * 3600, uc_workers=1, scan_only=False,
+                 incremental=True, manual_policy=None, manual_retries=2, manual_backoff=2.0,
+                 fast_form=True):
+        # Argumentos de criação: usados para abrir navegadores extras no Step 6 em paralelo
+        self.init_kwargs = {name: value for name, value in locals().items() if name != "self"}
         self.driver = None
         self.wait = None
-        self.base_url = "https://goias.equatorialenergia.com.br"
+        self.waiter = None
+        self.download_tracker = None
+        self.wait_timeouts = wait_timeouts
+        self.base_url = base_url.rstrip("/")
         self.login_url = f"{self.base_url}/LoginGO.aspx"
+        self.segunda_via_url = f"{self.base_url}/AgenciaGO/Servi%C3%A7os/aberto/SegundaVia.aspx"
         self.headless = headless
         self.logged_in = False
         self.step = 1  # Controla qual etapa do login estamos
+        self.output_root = output_root    # Pasta raiz das pastas de clientes
+        self.download_dir = download_dir  # Pasta de download padrão do Chrome (isolada por worker)
+        self.selector_cache = SelectorCache.shared(selector_cache_path)
+        self.report = None                # ClientReport criado na etapa 5
+        self.resume = resume              # Retoma relatorio.json existente: pula UCs e faturas já concluídas
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.metrics_path = metrics_path or os.path.join(output_root, "metricas_execucao.jsonl")
+        self.spans = []                   # Spans de tempo da execução (timed_step)
+        self.current_uc = None            # UC em processamento no Step 6
+        self.resource_blocking = resource_blocking  # None/{} desativa o bloqueio de recursos
+        self._blocking_page_type = None
+        self.session_dir = session_dir          # Cookies da sessão autenticada por cliente (None desativa)
+        self.session_max_age = session_max_age  # Idade máxima (s) de uma sessão salva
+        self._pending_spans = []          # Spans anteriores à criação do relatório (login)
+        self.uc_workers = uc_workers      # Navegadores processando UCs do mesmo cliente ao mesmo tempo
+        self.scan_only = scan_only        # Varredura: lê a tabela de faturas e não baixa nenhum PDF
+        self.incremental = incremental    # Baixa só as faturas ausentes/corrompidas (manifesto.json por UC)
+        self._manifests = {}
+        # Sem política explícita: interativo só com o navegador visível
+        self.manual_policy = manual_policy or ("falhar" if headless else "interativo")
+        if self.manual_policy not in MANUAL_POLICIES:
+            raise ValueError(f"Política de intervenção inválida: {self.manual_policy} (use {', '.join(MANUAL_POLICIES)})")
+        self.manual_retries = manual_retries  # Tentativas extras da política "repetir"
+        self.manual_backoff = manual_backoff  # Espera (s) antes da 1ª tentativa; dobra a cada nova
+        self._manual_attempts = {}
+        self.manual_failure = None        # Etapa e snapshot da última desistência (política "falhar")
+        self.login_credentials = None     # (uc, cpf_cnpj, data_nascimento) do cliente atual, para os navegadores extras
+        self.fast_form = fast_form        # Step 6: formulário de emissão por script (passo a passo como fallback)
 
     def setup_driver(self):
         """Configura e inicializa o driver do Chrome - VERSÃO ATUALIZADA"""
@@ -85,7 +1342,7 @@ class EquatorialDownloaderFixed:
             
             # Configurações de download ATUALIZADAS
             # Nota: O diretório será alterado dinamicamente para cada cliente
-            self.download_base_dir = os.path.abspath("clientes_faturas")
+            self.download_base_dir = os.path.abspath(self.download_dir or self.output_root)
             os.makedirs(self.download_base_dir, exist_ok=True)
             
             prefs = {
@@ -104,20 +1361,30 @@ class EquatorialDownloaderFixed:
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-setuid-sandbox")
             
+            # Log de performance: traz os eventos de download do DevTools
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            
             # Inicializa o driver
             self.driver = webdriver.Chrome(options=chrome_options)
+            self._blocking_page_type = None
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            # Habilita download em modo headless se necessário
-            if self.headless:
-                params = {
-                    "behavior": "allow",
-                    "downloadPath": self.download_base_dir
-                }
-                self.driver.execute_cdp_cmd("Page.setDownloadBehavior", params)
+            # Acompanhamento de downloads por eventos (desativado se o log não estiver disponível)
+            try:
+                self.download_tracker = DownloadTracker(self.driver)
+                self.download_tracker.pump()
+            except Exception as e:
+                logger.warning(f"Eventos de download indisponíveis, usando varredura de pasta: {e}")
+                self.download_tracker = None
+            
+            # Habilita download (também necessário em modo headless)
+            self.set_download_behavior(self.download_base_dir)
             
             # Configura timeout
             self.wait = WebDriverWait(self.driver, 15)
+            self.waiter = PortalWaiter(self.driver, self.wait_timeouts)
+            # Scripts assíncronos (espera do popup) resolvem sozinhos antes desse limite
+            self.driver.set_script_timeout(self.waiter.timeouts["popup_visible"] + 5)
             logger.info("Driver do Chrome inicializado com sucesso")
             return True
             
@@ -130,30 +1397,81 @@ class EquatorialDownloaderFixed:
             print("3. Certifique-se que o Chrome está instalado")
             return False
 
+    def apply_resource_blocking(self, page_type):
+        """Ativa a lista de bloqueio do tipo de página antes de navegar (CDP Network.setBlockedURLs)"""
+        if page_type == self._blocking_page_type:
+            return
+        profile = (self.resource_blocking or {}).get(page_type)
+        if not profile:
+            # Página sem bloqueio: desfaz a lista da página anterior (navegador reaproveitado)
+            if self._blocking_page_type is not None:
+                try:
+                    self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+                except Exception as e:
+                    logger.warning(f"Não foi possível desativar o bloqueio de recursos: {e}")
+                self._blocking_page_type = None
+            return
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            # Formato com exceções (permitir antes de bloquear; vale o primeiro padrão que casar)
+            patterns = [{"urlPattern": url, "block": False} for url in profile.get("permitir", [])]
+            patterns += [{"urlPattern": url, "block": True} for url in profile.get("bloquear", [])]
+            try:
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urlPatterns": patterns})
+            except WebDriverException:
+                # Chrome sem urlPatterns: o formato antigo não tem exceções, então se a página
+                # permite hosts específicos (reCAPTCHA) só os rastreadores por host são bloqueados
+                allowed_hosts = [url for url in profile.get("permitir", []) if url_pattern_host(url) != "*"]
+                urls = [url_pattern_to_glob(url) for url in profile.get("bloquear", [])
+                        if url_pattern_host(url) != "*" or not allowed_hosts]
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+            self._blocking_page_type = page_type
+            logger.info(f"Bloqueio de recursos ativo para página '{page_type}'")
+        except Exception as e:
+            logger.warning(f"Não foi possível bloquear recursos ({page_type}): {e}")
+
+    def set_download_behavior(self, folder):
+        """Define a pasta de download; com eventos ativos, o Chrome nomeia cada arquivo pelo GUID"""
+        if self.download_tracker:
+            behavior = "allowAndName"
+        else:
+            behavior = "allow"
+        params = {
+            "behavior": behavior,
+            "downloadPath": os.path.abspath(folder),
+            "eventsEnabled": True
+        }
+        try:
+            self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", params)
+        except WebDriverException:
+            # Versões sem Browser.setDownloadBehavior: arquivo fica com o nome sugerido
+            self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": params["downloadPath"]
+            })
+
     def update_download_folder_for_client(self, client_folder):
         """Atualiza a pasta de download para o cliente específico"""
         try:
             # Atualiza as preferências de download para a pasta do cliente
-            params = {
-                "behavior": "allow",
-                "downloadPath": os.path.abspath(client_folder)
-            }
-            self.driver.execute_cdp_cmd("Page.setDownloadBehavior", params)
+            self.set_download_behavior(client_folder)
             print(f"📁 Pasta de download atualizada para: {client_folder}")
             return True
         except Exception as e:
             print(f"⚠️ Erro ao atualizar pasta de download: {e}")
             return False
 
+    @timed_step()
     def open_login_page(self):
         """Abre a página de login"""
         try:
             logger.info("Abrindo página de login...")
+            self.apply_resource_blocking("login")
             self.driver.get(self.login_url)
             
             # Aguarda a página carregar completamente
             self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
-            time.sleep(2)  # Aguarda elementos JavaScript carregarem
+            self.waiter.page_ready()  # Aguarda scripts da página terminarem de carregar
             
             print(f"\n🌐 Página aberta: {self.driver.current_url}")
             print("👀 Você pode acompanhar o processo no navegador que foi aberto")
@@ -167,14 +1485,42 @@ class EquatorialDownloaderFixed:
             return False
 
 
+    def find_element_cached(self, key, candidates, require_enabled=False):
+        """Primeiro elemento visível (e habilitado, se exigido) entre os candidatos (By, seletor)
+
+        Tenta antes o seletor que funcionou da última vez para a chave 'página:campo' e
+        só percorre a cadeia completa de fallback quando ele não encontra nada.
+        """
+        ordered = self.selector_cache.ordered(key, candidates)
+        element, index, diagnostics = resolve_first_element(self.driver, ordered, require_enabled)
+        
+        for entry in diagnostics:
+            if entry["error"]:
+                print(f"  Erro com seletor {entry['selector']}: {entry['error']}")
+            else:
+                print(f"  Testando seletor: {entry['selector']} - Encontrados: {entry['found']} (visíveis: {entry['visible']})")
+        
+        if element is None:
+            self.selector_cache.record(key, None)
+            return None
+        
+        self.selector_cache.record(key, ordered[index])
+        logger.info(f"[{key}] Elemento encontrado com seletor: {ordered[index][1]}")
+        return element
+
+
 #-------------- Passo 1 ----------#
+    @timed_step()
     def step1_fill_uc_cpf(self, uc, cpf_cnpj):
         """Etapa 1: Preenche UC e CPF/CNPJ"""
         try:
             print("\n📝 ETAPA 1: Preenchendo UC e CPF/CNPJ...")
             
-            # Aguarda um pouco para garantir que a página carregou
-            time.sleep(3)
+            # Aguarda o campo UC ficar disponível
+            self.waiter.element_present([
+                (By.CSS_SELECTOR, "input[name*='UC' i]"),
+                (By.CSS_SELECTOR, "input[id*='UC' i]")
+            ])
             
             # PRIMEIRO: Vamos fazer um debug completo da página
             print("\n🔍 ANALISANDO PÁGINA ATUAL...")
@@ -183,45 +1529,21 @@ class EquatorialDownloaderFixed:
             # Procura pelo campo UC - usando seletores do código original que funcionava
             print("\n🔍 Procurando campo UC...")
             uc_selectors = [
-                "input[name*='UC' i]",
-                "input[id*='UC' i]",
-                "input[name*='unidade' i]",
-                "input[id*='unidade' i]",
-                "input[placeholder*='unidade' i]",
-                "input[name*='txtUC']",
-                "input[id*='txtUC']"
+                (By.CSS_SELECTOR, "input[name*='UC' i]"),
+                (By.CSS_SELECTOR, "input[id*='UC' i]"),
+                (By.CSS_SELECTOR, "input[name*='unidade' i]"),
+                (By.CSS_SELECTOR, "input[id*='unidade' i]"),
+                (By.CSS_SELECTOR, "input[placeholder*='unidade' i]"),
+                (By.CSS_SELECTOR, "input[name*='txtUC']"),
+                (By.CSS_SELECTOR, "input[id*='txtUC']")
             ]
             
-            uc_field = None
-            for selector in uc_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    print(f"  Testando seletor: {selector} - Encontrados: {len(elements)}")
-                    for i, element in enumerate(elements):
-                        try:
-                            displayed = element.is_displayed()
-                            enabled = element.is_enabled()
-                            name = element.get_attribute('name') or 'sem nome'
-                            id_attr = element.get_attribute('id') or 'sem id'
-                            print(f"    Elemento {i+1}: name='{name}' id='{id_attr}' displayed={displayed} enabled={enabled}")
-                            
-                            if displayed and enabled:
-                                uc_field = element
-                                logger.info(f"Campo UC encontrado com seletor: {selector}")
-                                break
-                        except Exception as inner_e:
-                            print(f"    Erro ao verificar elemento {i+1}: {inner_e}")
-                    if uc_field:
-                        break
-                except Exception as e:
-                    print(f"  Erro com seletor {selector}: {e}")
-                    continue
+            uc_field = self.find_element_cached("login:uc", uc_selectors, require_enabled=True)
             
             if uc_field:
                 # Limpa e preenche UC
                 print("✅ Campo UC encontrado! Preenchendo...")
                 uc_field.clear()
-                time.sleep(0.5)
                 uc_field.send_keys(uc)
                 logger.info(f"UC preenchida: {uc}")
                 
@@ -238,46 +1560,22 @@ class EquatorialDownloaderFixed:
             # Procura pelo campo CPF/CNPJ - usando seletores do código original
             print("\n🔍 Procurando campo CPF/CNPJ...")
             cpf_selectors = [
-                "input[name*='CPF' i]",
-                "input[id*='CPF' i]",
-                "input[name*='cnpj' i]",
-                "input[id*='cnpj' i]",
-                "input[name*='documento' i]",
-                "input[placeholder*='cpf' i]",
-                "input[name*='txtCPF']",
-                "input[id*='txtCPF']"
+                (By.CSS_SELECTOR, "input[name*='CPF' i]"),
+                (By.CSS_SELECTOR, "input[id*='CPF' i]"),
+                (By.CSS_SELECTOR, "input[name*='cnpj' i]"),
+                (By.CSS_SELECTOR, "input[id*='cnpj' i]"),
+                (By.CSS_SELECTOR, "input[name*='documento' i]"),
+                (By.CSS_SELECTOR, "input[placeholder*='cpf' i]"),
+                (By.CSS_SELECTOR, "input[name*='txtCPF']"),
+                (By.CSS_SELECTOR, "input[id*='txtCPF']")
             ]
             
-            cpf_field = None
-            for selector in cpf_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    print(f"  Testando seletor: {selector} - Encontrados: {len(elements)}")
-                    for i, element in enumerate(elements):
-                        try:
-                            displayed = element.is_displayed()
-                            enabled = element.is_enabled()
-                            name = element.get_attribute('name') or 'sem nome'
-                            id_attr = element.get_attribute('id') or 'sem id'
-                            print(f"    Elemento {i+1}: name='{name}' id='{id_attr}' displayed={displayed} enabled={enabled}")
-                            
-                            if displayed and enabled:
-                                cpf_field = element
-                                logger.info(f"Campo CPF encontrado com seletor: {selector}")
-                                break
-                        except Exception as inner_e:
-                            print(f"    Erro ao verificar elemento {i+1}: {inner_e}")
-                    if cpf_field:
-                        break
-                except Exception as e:
-                    print(f"  Erro com seletor {selector}: {e}")
-                    continue
+            cpf_field = self.find_element_cached("login:cpf", cpf_selectors, require_enabled=True)
             
             if cpf_field:
                 # Limpa e preenche CPF/CNPJ
                 print("✅ Campo CPF/CNPJ encontrado! Preenchendo...")
                 cpf_field.clear()
-                time.sleep(0.5)
                 cpf_field.send_keys(cpf_cnpj)
                 logger.info(f"CPF/CNPJ preenchido: {cpf_cnpj}")
                 
@@ -289,12 +1587,12 @@ class EquatorialDownloaderFixed:
                 )
             else:
                 print("❌ Campo CPF/CNPJ não encontrado com nenhum seletor")
-                print("\n💡 SOLUÇÃO MANUAL:")
-                print("1. Veja o navegador aberto")
-                print("2. Preencha manualmente o campo CPF/CNPJ")
-                print("3. Pressione Enter para continuar")
-                input("Pressione Enter após preencher manualmente...")
-                return True  # Continua o processo
+                return self.manual_intervention(
+                    "step1_fill_uc_cpf",
+                    ["Veja o navegador aberto", "Preencha manualmente o campo CPF/CNPJ"],
+                    "Pressione Enter após preencher manualmente...",
+                    retry=lambda: self.step1_fill_uc_cpf(uc, cpf_cnpj)
+                )
             
             print("✅ UC e CPF/CNPJ preenchidos com sucesso!")
             return True
@@ -303,103 +1601,31 @@ class EquatorialDownloaderFixed:
             logger.error(f"Erro ao preencher UC e CPF: {e}")
             return False
         
+    @timed_step()
     def step1_submit(self):
         """Etapa 1: Clica no botão Entrar - VERSÃO CORRIGIDA"""
         try:
             print("\n🚀 ETAPA 1: Clicando no botão 'Entrar'...")
             
-            # Aguarda um pouco antes de procurar o botão
-            time.sleep(2)
-            
-            # SELETORES CORRIGIDOS baseados no HTML fornecido
+            # SELETORES CORRIGIDOS baseados no HTML fornecido (CSS primeiro, XPath como fallback)
             submit_selectors = [
                 # Seletor específico para o botão do HTML fornecido
-                "button.button[onclick*='ValidarCamposAreaLogada']",
-                "button.button",
-                # Seletores mais genéricos
-                "button:contains('Entrar')",
-                "button:contains('ENTRAR')",
-                "button[type='button']:contains('Entrar')",
+                (By.CSS_SELECTOR, "button.button[onclick*='ValidarCamposAreaLogada']"),
+                (By.CSS_SELECTOR, "button.button"),
+                # Por texto (equivalente a button:contains('Entrar'))
+                (By.XPATH, "//button[contains(text(), 'Entrar') or contains(text(), 'ENTRAR')]"),
                 # Backup para inputs (caso existam)
-                "input[value*='Entrar' i]",
-                "input[type='submit'][value*='Entrar' i]",
-                # Por texto usando XPath como fallback
+                (By.CSS_SELECTOR, "input[value*='Entrar' i]"),
+                (By.CSS_SELECTOR, "input[type='submit'][value*='Entrar' i]"),
+                # XPath direto
+                (By.XPATH, "//button[contains(@onclick, 'ValidarCamposAreaLogada')]"),
+                (By.XPATH, "//button[@class='button' and contains(text(), 'Entrar')]"),
+                (By.XPATH, "//button[@class='button']"),
+                (By.XPATH, "//button[text()='Entrar']"),
+                (By.XPATH, "//input[@value='Entrar']")
             ]
             
-            submit_button = None
-            
-            # Primeiro tenta com CSS selectors
-            for selector in submit_selectors:
-                try:
-                    if ":contains(" in selector:
-                        # Para seletores :contains, usar XPath
-                        xpath_selector = f"//button[contains(text(), 'Entrar') or contains(text(), 'ENTRAR')]"
-                        elements = self.driver.find_elements(By.XPATH, xpath_selector)
-                    else:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    print(f"  Testando seletor: {selector} - Encontrados: {len(elements)}")
-                    
-                    for i, element in enumerate(elements):
-                        try:
-                            displayed = element.is_displayed()
-                            enabled = element.is_enabled()
-                            text = element.text.strip() if hasattr(element, 'text') else ''
-                            onclick = element.get_attribute('onclick') or ''
-                            class_attr = element.get_attribute('class') or ''
-                            
-                            print(f"    Elemento {i+1}: text='{text}' class='{class_attr}' onclick='{onclick[:50]}...' displayed={displayed} enabled={enabled}")
-                            
-                            if displayed and enabled:
-                                submit_button = element
-                                logger.info(f"Botão Entrar encontrado com seletor: {selector}")
-                                break
-                        except Exception as inner_e:
-                            print(f"    Erro ao verificar elemento {i+1}: {inner_e}")
-                    
-                    if submit_button:
-                        break
-                        
-                except Exception as e:
-                    print(f"  Erro com seletor {selector}: {e}")
-                    continue
-            
-            # Se não encontrou com CSS, tenta XPath direto
-            if not submit_button:
-                print("\n🔍 Tentativa com XPath direto...")
-                xpath_selectors = [
-                    "//button[contains(@onclick, 'ValidarCamposAreaLogada')]",
-                    "//button[@class='button' and contains(text(), 'Entrar')]",
-                    "//button[@class='button']",
-                    "//button[text()='Entrar']",
-                    "//button[contains(text(), 'Entrar')]",
-                    "//input[@value='Entrar']"
-                ]
-                
-                for xpath in xpath_selectors:
-                    try:
-                        elements = self.driver.find_elements(By.XPATH, xpath)
-                        print(f"  Testando XPath: {xpath} - Encontrados: {len(elements)}")
-                        
-                        for i, element in enumerate(elements):
-                            try:
-                                displayed = element.is_displayed()
-                                enabled = element.is_enabled()
-                                text = element.text.strip() if hasattr(element, 'text') else ''
-                                print(f"    Elemento {i+1}: text='{text}' displayed={displayed} enabled={enabled}")
-                                
-                                if displayed and enabled:
-                                    submit_button = element
-                                    logger.info(f"Botão Entrar encontrado com XPath: {xpath}")
-                                    break
-                            except Exception as inner_e:
-                                print(f"    Erro ao verificar elemento {i+1}: {inner_e}")
-                        
-                        if submit_button:
-                            break
-                    except Exception as e:
-                        print(f"  Erro com XPath {xpath}: {e}")
-                        continue
+            submit_button = self.find_element_cached("login:entrar", submit_selectors, require_enabled=True)
             
             if submit_button:
                 # Destaca o botão
@@ -413,7 +1639,8 @@ class EquatorialDownloaderFixed:
                     pass  # Ignora erro de styling
                 
                 print("🎯 Botão 'Entrar' encontrado - clicando...")
-                time.sleep(1)
+                url_before_click = self.driver.current_url
+                self.waiter.arm_postback()
                 
                 # Tenta diferentes métodos de clique
                 click_success = False
@@ -448,8 +1675,13 @@ class EquatorialDownloaderFixed:
                 
                 if click_success:
                     print("✅ Clique no botão 'Entrar' realizado com sucesso!")
-                    # Aguarda navegação para próxima página
-                    time.sleep(5)  # Aumentei o tempo de espera
+                    # Aguarda o postback do login; sem navegação, o campo da etapa 2 aparece na mesma página
+                    self.waiter.postback_done()
+                    if self.driver.current_url == url_before_click:
+                        self.waiter.url_changed(url_before_click, or_locators=[
+                            (By.CSS_SELECTOR, "input[name*='txtData']"),
+                            (By.CSS_SELECTOR, "input[id*='txtData']")
+                        ])
                     return True
                 else:
                     print("❌ Todos os métodos de clique falharam")
@@ -460,12 +1692,12 @@ class EquatorialDownloaderFixed:
                 print("\n🔧 Executando debug completo...")
                 self.debug_page_elements()
                 
-                print("\n💡 SOLUÇÃO MANUAL:")
-                print("1. Veja o navegador aberto")
-                print("2. Clique manualmente no botão 'Entrar'")
-                print("3. Pressione Enter aqui para continuar")
-                input("Pressione Enter após clicar manualmente...")
-                return True
+                return self.manual_intervention(
+                    "step1_submit",
+                    ["Veja o navegador aberto", "Clique manualmente no botão 'Entrar'"],
+                    "Pressione Enter após clicar manualmente...",
+                    retry=self.step1_submit
+                )
                 
         except Exception as e:
             logger.error(f"Erro ao clicar em 'Entrar': {e}")
@@ -473,61 +1705,40 @@ class EquatorialDownloaderFixed:
 
 
 #-------------- Passo 2 ----------#
+    @timed_step()
     def step2_fill_birth_date(self, data_nascimento):
         """Etapa 2: Preenche data de nascimento - VERSÃO CORRIGIDA"""
         try:
             print(f"\n📝 ETAPA 2: Preenchendo data de nascimento ({data_nascimento})...")
             
-            # Aguarda a nova página carregar
-            time.sleep(3)
+            # Aguarda o campo de data ficar disponível
+            self.waiter.element_clickable([
+                (By.CSS_SELECTOR, "input[name*='txtData']"),
+                (By.CSS_SELECTOR, "input[id*='txtData']"),
+                (By.CSS_SELECTOR, "input[name*='DataNascimento']")
+            ])
             
             print(f"🔍 URL atual: {self.driver.current_url}")
             
             # SELETORES CORRIGIDOS baseados no HTML fornecido
             data_selectors = [
                 # Seletor específico do HTML fornecido
-                "input[name='ctl00$WEBDOOR$headercorporativogo$txtData']",
-                "input[id='WEBDOOR_headercorporativogo_txtData']",
+                (By.CSS_SELECTOR, "input[name='ctl00$WEBDOOR$headercorporativogo$txtData']"),
+                (By.CSS_SELECTOR, "input[id='WEBDOOR_headercorporativogo_txtData']"),
                 # Seletores de backup
-                "input[name*='txtData']",
-                "input[id*='txtData']",
-                "input[placeholder*='DD/MM/YYYY']",
-                "input[placeholder*='DD/MM/YY']",
-                "input[name*='DataNascimento']",
-                "input[id*='DataNascimento']",
-                "input[name*='data'][class*='numero-cliente']",
-                "input[placeholder*='nascimento' i]",
-                "input[placeholder*='data' i]",
-                "input[type='text'][maxlength='10']"
+                (By.CSS_SELECTOR, "input[name*='txtData']"),
+                (By.CSS_SELECTOR, "input[id*='txtData']"),
+                (By.CSS_SELECTOR, "input[placeholder*='DD/MM/YYYY']"),
+                (By.CSS_SELECTOR, "input[placeholder*='DD/MM/YY']"),
+                (By.CSS_SELECTOR, "input[name*='DataNascimento']"),
+                (By.CSS_SELECTOR, "input[id*='DataNascimento']"),
+                (By.CSS_SELECTOR, "input[name*='data'][class*='numero-cliente']"),
+                (By.CSS_SELECTOR, "input[placeholder*='nascimento' i]"),
+                (By.CSS_SELECTOR, "input[placeholder*='data' i]"),
+                (By.CSS_SELECTOR, "input[type='text'][maxlength='10']")
             ]
             
-            data_field = None
-            for selector in data_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    print(f"  Testando seletor: {selector} - Encontrados: {len(elements)}")
-                    
-                    for i, element in enumerate(elements):
-                        try:
-                            displayed = element.is_displayed()
-                            enabled = element.is_enabled()
-                            name = element.get_attribute('name') or 'sem nome'
-                            id_attr = element.get_attribute('id') or 'sem id'
-                            placeholder = element.get_attribute('placeholder') or 'sem placeholder'
-                            print(f"    Elemento {i+1}: name='{name}' id='{id_attr}' placeholder='{placeholder}' displayed={displayed} enabled={enabled}")
-                            
-                            if displayed and enabled:
-                                data_field = element
-                                logger.info(f"Campo data encontrado com seletor: {selector}")
-                                break
-                        except Exception as inner_e:
-                            print(f"    Erro ao verificar elemento {i+1}: {inner_e}")
-                    
-                    if data_field:
-                        break
-                except Exception as e:
-                    print(f"  Erro com seletor {selector}: {e}")
-                    continue
+            data_field = self.find_element_cached("login:data_nascimento", data_selectors, require_enabled=True)
             
             if data_field:
                 # Limpa o campo primeiro
@@ -538,8 +1749,6 @@ class EquatorialDownloaderFixed:
                     # Se clear() falhar, tenta com JavaScript
                     self.driver.execute_script("arguments[0].value = '';", data_field)
                 
-                time.sleep(0.5)
-                
                 # Preenche a data
                 data_field.send_keys(data_nascimento)
                 logger.info(f"Data de nascimento preenchida: {data_nascimento}")
@@ -560,73 +1769,40 @@ class EquatorialDownloaderFixed:
                 print("\n🔧 Executando debug para encontrar o campo...")
                 self.debug_page_elements()
                 
-                print("\n💡 SOLUÇÃO MANUAL:")
-                print("1. Veja o navegador aberto")
-                print("2. Preencha manualmente o campo de data de nascimento")
-                print("3. Pressione Enter aqui para continuar")
-                input("Pressione Enter após preencher manualmente...")
-                return True  # Continua o processo
+                return self.manual_intervention(
+                    "step2_fill_birth_date",
+                    ["Veja o navegador aberto", "Preencha manualmente o campo de data de nascimento"],
+                    "Pressione Enter após preencher manualmente...",
+                    retry=lambda: self.step2_fill_birth_date(data_nascimento)
+                )
                 
         except Exception as e:
             logger.error(f"Erro ao preencher data de nascimento: {e}")
             return False
 
+    @timed_step()
     def step2_submit(self):
         """Etapa 2: Clica no botão Validar - VERSÃO CORRIGIDA"""
         try:
             print("\n🚀 ETAPA 2: Clicando no botão 'Validar'...")
             
-            time.sleep(2)  # Aguarda um pouco antes de procurar o botão
-            
             # SELETORES CORRIGIDOS baseados no HTML fornecido
             validate_selectors = [
                 # Seletor específico do HTML fornecido
-                "input[name='ctl00$WEBDOOR$headercorporativogo$btnValidar']",
-                "input[id='WEBDOOR_headercorporativogo_btnValidar']",
+                (By.CSS_SELECTOR, "input[name='ctl00$WEBDOOR$headercorporativogo$btnValidar']"),
+                (By.CSS_SELECTOR, "input[id='WEBDOOR_headercorporativogo_btnValidar']"),
                 # Seletores de backup
-                "input[value='Validar']",
-                "input[name*='btnValidar']",
-                "input[id*='btnValidar']",
-                "input[type='submit'][value*='Validar' i]",
-                "input[class='button'][value*='Validar' i]",
-                "button:contains('Validar')",
-                "input[value*='Confirmar' i]",
-                "input[value*='OK' i]"
+                (By.CSS_SELECTOR, "input[value='Validar']"),
+                (By.CSS_SELECTOR, "input[name*='btnValidar']"),
+                (By.CSS_SELECTOR, "input[id*='btnValidar']"),
+                (By.CSS_SELECTOR, "input[type='submit'][value*='Validar' i]"),
+                (By.CSS_SELECTOR, "input[class='button'][value*='Validar' i]"),
+                (By.XPATH, "//button[contains(text(), 'Validar') or contains(text(), 'VALIDAR')]"),
+                (By.CSS_SELECTOR, "input[value*='Confirmar' i]"),
+                (By.CSS_SELECTOR, "input[value*='OK' i]")
             ]
             
-            validate_button = None
-            for selector in validate_selectors:
-                try:
-                    if ":contains(" in selector:
-                        # Para seletores :contains, usar XPath
-                        xpath_selector = "//button[contains(text(), 'Validar') or contains(text(), 'VALIDAR')]"
-                        elements = self.driver.find_elements(By.XPATH, xpath_selector)
-                    else:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    print(f"  Testando seletor: {selector} - Encontrados: {len(elements)}")
-                    
-                    for i, element in enumerate(elements):
-                        try:
-                            displayed = element.is_displayed()
-                            enabled = element.is_enabled()
-                            value = element.get_attribute('value') or ''
-                            name = element.get_attribute('name') or 'sem nome'
-                            id_attr = element.get_attribute('id') or 'sem id'
-                            print(f"    Elemento {i+1}: name='{name}' id='{id_attr}' value='{value}' displayed={displayed} enabled={enabled}")
-                            
-                            if displayed and enabled:
-                                validate_button = element
-                                logger.info(f"Botão Validar encontrado com seletor: {selector}")
-                                break
-                        except Exception as inner_e:
-                            print(f"    Erro ao verificar elemento {i+1}: {inner_e}")
-                    
-                    if validate_button:
-                        break
-                except Exception as e:
-                    print(f"  Erro com seletor {selector}: {e}")
-                    continue
+            validate_button = self.find_element_cached("login:validar", validate_selectors, require_enabled=True)
             
             if validate_button:
                 # Destaca o botão
@@ -640,7 +1816,7 @@ class EquatorialDownloaderFixed:
                     pass  # Ignora erro de styling
                 
                 print("🎯 Botão 'Validar' encontrado - clicando...")
-                time.sleep(1)
+                self.waiter.arm_postback()
                 
                 # Tenta diferentes métodos de clique
                 click_success = False
@@ -685,29 +1861,29 @@ class EquatorialDownloaderFixed:
                 
                 if click_success:
                     print("✅ Clique no botão 'Validar' realizado com sucesso!")
-                    # Aguarda processamento/navegação
-                    time.sleep(5)  # Aumentei o tempo de espera
+                    # Aguarda o postback de validação terminar
+                    self.waiter.postback_done()
                     return True
                 else:
                     print("❌ Todos os métodos de clique falharam")
-                    print("\n💡 SOLUÇÃO MANUAL:")
-                    print("1. Veja o navegador aberto")
-                    print("2. Clique manualmente no botão 'Validar'")
-                    print("3. Pressione Enter aqui para continuar")
-                    input("Pressione Enter após clicar manualmente...")
-                    return True
+                    return self.manual_intervention(
+                        "step2_submit",
+                        ["Veja o navegador aberto", "Clique manualmente no botão 'Validar'"],
+                        "Pressione Enter após clicar manualmente...",
+                        retry=self.step2_submit
+                    )
                     
             else:
                 print("❌ Botão 'Validar' não encontrado com nenhum seletor")
                 print("\n🔧 Executando debug completo...")
                 self.debug_page_elements()
                 
-                print("\n💡 SOLUÇÃO MANUAL:")
-                print("1. Veja o navegador aberto")
-                print("2. Clique manualmente no botão 'Validar'")
-                print("3. Pressione Enter aqui para continuar")
-                input("Pressione Enter após clicar manualmente...")
-                return True
+                return self.manual_intervention(
+                    "step2_submit",
+                    ["Veja o navegador aberto", "Clique manualmente no botão 'Validar'"],
+                    "Pressione Enter após clicar manualmente...",
+                    retry=self.step2_submit
+                )
                 
         except Exception as e:
             logger.error(f"Erro ao clicar em 'Validar': {e}")
@@ -718,23 +1894,23 @@ class EquatorialDownloaderFixed:
 #-------------- ELIMINIADO -------#
 
 #-------------- Passo 4 ----------#
+    @timed_step()
     def step4_navigate_to_invoices(self):
         """Etapa 4: Navega diretamente para Segunda Via após login"""
         try:
             print("\n🧭 ETAPA 4: Navegando diretamente para Segunda Via...")
             
-            # Aguarda um pouco para garantir que o login foi processado
-            time.sleep(3)
-            
             # URL direta da Segunda Via
-            segunda_via_url = "https://goias.equatorialenergia.com.br/AgenciaGO/Servi%C3%A7os/aberto/SegundaVia.aspx"
+            segunda_via_url = self.segunda_via_url
             
             # Navega diretamente para a URL
             print(f"🌐 Acessando diretamente: {segunda_via_url}")
+            self.apply_resource_blocking("segunda_via")
             self.driver.get(segunda_via_url)
             
-            # Aguarda a página carregar
-            time.sleep(3)
+            # Aguarda o dropdown de UCs (só faz sentido se não fomos redirecionados ao login)
+            if "SegundaVia.aspx" in self.driver.current_url:
+                self.waiter.element_present([(By.CSS_SELECTOR, "#CONTENT_comboBoxUC")])
             
             # Verifica se chegou na página correta
             current_url = self.driver.current_url
@@ -772,13 +1948,13 @@ class EquatorialDownloaderFixed:
                 print("🔧 Tentando análise da página atual...")
                 self.debug_page_elements()
                 
-                # Permite intervenção manual
-                print("\n💡 SOLUÇÃO MANUAL:")
-                print("1. Verifique se você está logado")
-                print("2. Navegue manualmente para Segunda Via se necessário")
-                print("3. Pressione Enter para continuar")
-                input("Pressione Enter após chegar na página de Segunda Via...")
-                return True
+                # Intervenção manual, nova tentativa ou falha com snapshot (conforme a política)
+                return self.manual_intervention(
+                    "step4_navigate_to_invoices",
+                    ["Verifique se você está logado", "Navegue manualmente para Segunda Via se necessário"],
+                    "Pressione Enter após chegar na página de Segunda Via...",
+                    retry=self.step4_navigate_to_invoices
+                )
                 
         except Exception as e:
             logger.error(f"Erro ao navegar para Segunda Via: {e}")
@@ -787,349 +1963,129 @@ class EquatorialDownloaderFixed:
         
 
 #-------------- Passo 5 ----------#
+    @timed_step()
     def step5_extract_ucs_and_create_structure(self):
         """Etapa 5: Extrai UCs, cria pasta do cliente e arquivo relatorio.json"""
         try:
             print("\n📁 ETAPA 5: Extraindo UCs e criando estrutura de relatório...")
             
-            # Aguarda carregamento da página
-            time.sleep(3)
+            # Aguarda o dropdown de UCs estar na página
+            self.waiter.element_present([(By.CSS_SELECTOR, "select[id*='comboBoxUC']")])
             
             current_url = self.driver.current_url
             print(f"🔍 URL atual: {current_url}")
             print(f"📄 Título da página: {self.driver.title}")
             
-            # 1. EXTRAIR NOME DO CLIENTE
-            print("\n👤 Extraindo nome do cliente...")
-            
-            client_name = None
-            full_client_name = None
-            
-            # Estratégia 1: Procurar especificamente no padrão da Enel
-            print("🔍 Procurando no padrão da Enel (Olá <strong>NOME</strong>)...")
-            
-            try:
-                # Procura pelo elemento específico da mensagem de boas-vindas
-                welcome_selectors = [
-                    "#CONTENT_lblMensagemUsuarioGrupoB",
-                    "span.mensagem-usuario",
-                    "span[id*='lblMensagem']",
-                    "span[id*='MensagemUsuario']"
-                ]
-                
-                for selector in welcome_selectors:
-                    try:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                        for element in elements:
-                            # Procura por elemento <strong> dentro do span
-                            strong_elements = element.find_elements(By.TAG_NAME, "strong")
-                            if strong_elements:
-                                full_name = strong_elements[0].text.strip()
-                                if full_name and len(full_name) > 3:
-                                    full_client_name = full_name
-                                    # Cria nome simplificado (apenas primeiro e último nome)
-                                    name_parts = full_name.split()
-                                    if len(name_parts) >= 2:
-                                        client_name = f"{name_parts[0]} {name_parts[-1]}"
-                                    else:
-                                        client_name = full_name
-                                    print(f"✅ Nome completo encontrado: '{full_client_name}'")
-                                    print(f"✅ Nome simplificado para pasta: '{client_name}'")
-                                    break
-                        if client_name:
-                            break
-                    except Exception as e:
-                        print(f"Erro ao buscar com seletor {selector}: {e}")
-                        continue
-                        
-            except Exception as e:
-                print(f"Erro na estratégia 1: {e}")
+            # 1. NOME DO CLIENTE, CPF MASCARADO E UCS (um único snapshot do HTML)
+            print("\n👤 Extraindo nome do cliente e UCs...")
+            page = parse_segunda_via_page(self.driver.page_source)
             
-            # Estratégia 2: Procurar por XPath mais específico
-            if not client_name:
-                print("🔍 Procurando por XPath específico...")
-                
-                xpath_patterns = [
-                    # Procura especificamente por "Olá" seguido de <strong>
-                    "//span[contains(text(), 'Olá')]/strong",
-                    "//span[contains(text(), 'bem vindo') or contains(text(), 'bem-vindo')]/strong",
-                    "//p[contains(text(), 'Olá')]//strong",
-                    # Procura por qualquer strong que tenha um nome completo
-                    "//strong[string-length(normalize-space(text())) > 10 and contains(normalize-space(text()), ' ')]"
-                ]
-                
-                for xpath in xpath_patterns:
-                    try:
-                        elements = self.driver.find_elements(By.XPATH, xpath)
-                        for element in elements:
-                            text = element.text.strip()
-                            if text and len(text) > 5 and ' ' in text:
-                                # Verifica se parece com um nome (não contém números ou símbolos estranhos)
-                                if not any(char.isdigit() for char in text) and text.replace(' ', '').isalpha():
-                                    full_client_name = text
-                                    # Cria nome simplificado
-                                    name_parts = text.split()
-                                    if len(name_parts) >= 2:
-                                        client_name = f"{name_parts[0]} {name_parts[-1]}"
-                                    else:
-                                        client_name = text
-                                    print(f"✅ Nome encontrado via XPath: '{full_client_name}'")
-                                    print(f"✅ Nome simplificado: '{client_name}'")
-                                    break
-                        if client_name:
-                            break
-                    except Exception as e:
-                        print(f"Erro com XPath {xpath}: {e}")
-                        continue
-            
-            # Estratégia 3: Procurar por padrão de mensagem de boas-vindas
-            if not client_name:
-                print("🔍 Procurando por padrão de mensagem de boas-vindas...")
-                
-                try:
-                    # Procura por elementos que contenham "Olá" ou "bem-vindo"
-                    welcome_elements = self.driver.find_elements(By.XPATH, 
-                        "//*[contains(text(), 'Olá') or contains(text(), 'bem vindo') or contains(text(), 'bem-vindo')]")
-                    
-                    for element in welcome_elements:
-                        try:
-                            # Pega o texto completo do elemento
-                            full_text = element.text.strip()
-                            print(f"🔍 Analisando texto: '{full_text[:100]}...'")
-                            
-                            # Procura por padrão "Olá NOME"
-                            import re
-                            pattern = r'Olá\s+([A-ZÁÊÇÕ\s]+?)(?:,|\s+seja|\s+bem)'
-                            match = re.search(pattern, full_text, re.IGNORECASE)
-                            
-                            if match:
-                                full_client_name = match.group(1).strip()
-                                # Cria nome simplificado
-                                name_parts = full_client_name.split()
-                                if len(name_parts) >= 2:
-                                    client_name = f"{name_parts[0]} {name_parts[-1]}"
-                                else:
-                                    client_name = full_client_name
-                                print(f"✅ Nome extraído via regex: '{full_client_name}'")
-                                print(f"✅ Nome simplificado: '{client_name}'")
-                                break
-                                
-                        except Exception as e:
-                            print(f"Erro ao processar elemento: {e}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"Erro na estratégia 3: {e}")
-            
-            # Estratégia 4: Debug - mostra todos os elementos strong da página
-            if not client_name:
-                print("🔍 Debug: Analisando todos os elementos <strong> da página...")
-                try:
-                    all_strong = self.driver.find_elements(By.TAG_NAME, "strong")
-                    print(f"Encontrados {len(all_strong)} elementos <strong>:")
-                    
-                    for i, strong in enumerate(all_strong):
-                        try:
-                            text = strong.text.strip()
-                            if text:
-                                print(f"   Strong {i+1}: '{text}'")
-                                # Se parece com um nome (tem espaços, não tem números, é alfabético)
-                                if (len(text) > 5 and ' ' in text and 
-                                    not any(char.isdigit() for char in text) and 
-                                    text.replace(' ', '').replace('Ç', 'C').replace('Ã', 'A').isalpha()):
-                                    full_client_name = text
-                                    name_parts = text.split()
-                                    if len(name_parts) >= 2:
-                                        client_name = f"{name_parts[0]} {name_parts[-1]}"
-                                    else:
-                                        client_name = text
-                                    print(f"✅ Nome identificado automaticamente: '{client_name}'")
-                                    break
-                        except:
-                            continue
-                            
-                except Exception as e:
-                    print(f"Erro no debug: {e}")
-            
-            # Nome padrão se não encontrar
-            if not client_name:
-                from datetime import datetime
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                
-                # Tenta pelo menos pegar o CPF para identificar
-                try:
-                    cpf_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '***') and contains(text(), '**')]")
-                    if cpf_elements:
-                        cpf_masked = cpf_elements[0].text.strip()
-                        client_name = f"Cliente_CPF_{cpf_masked.replace('*', 'X').replace('.', '').replace('-', '')}_{timestamp}"
-                        full_client_name = client_name
-                    else:
-                        client_name = f"Cliente_{timestamp}"
-                        full_client_name = client_name
-                except:
-                    client_name = f"Cliente_{timestamp}"
-                    full_client_name = client_name
-                    
+            full_client_name = page["nome_completo"]
+            client_name = page["nome_pasta"]
+            if client_name:
+                print(f"✅ Nome completo encontrado: '{full_client_name}'")
+                print(f"✅ Nome simplificado para pasta: '{client_name}'")
+            else:
+                client_name = full_client_name = unnamed_client_id(page["cpf_mascarado"])
                 print(f"⚠️ Nome do cliente não encontrado, usando identificador: '{client_name}'")
+            if page["cpf_mascarado"]:
+                print(f"🪪 CPF/CNPJ: {page['cpf_mascarado']}")
             
             # Sanitiza o nome para usar como nome de pasta
-            import re
-            safe_client_name = re.sub(r'[<>:"/\\|?*]', '_', client_name)
-            safe_client_name = safe_client_name.strip()
-            
-            # Converte para Title Case (primeira letra de cada palavra maiúscula)
-            safe_client_name = safe_client_name.title()
+            safe_client_name = make_safe_folder_name(client_name)
             
             print(f"📁 Nome da pasta: '{safe_client_name}'")
-            print(f"👤 Nome completo: '{full_client_name or client_name}'")
-            
-            # 2. EXTRAIR UCS DO DROPDOWN
-            print("\n🔍 Extraindo UCs do dropdown...")
-            
-            uc_dropdown = None
-            dropdown_selectors = [
-                "select[name*='comboBoxUC']",
-                "select[id*='comboBoxUC']",
-                "#CONTENT_comboBoxUC",
-                "select.DropDown",
-                "select[name*='UC']"
-            ]
-            
-            for selector in dropdown_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed():
-                            uc_dropdown = element
-                            print(f"✅ Dropdown de UCs encontrado: {selector}")
-                            break
-                    if uc_dropdown:
-                        break
-                except:
-                    continue
+            print(f"👤 Nome completo: '{full_client_name}'")
             
-            if not uc_dropdown:
+            # 2. UCS DO DROPDOWN
+            ucs_list = page["ucs"]
+            if ucs_list is None:
                 print("❌ Dropdown de UCs não encontrado!")
                 self.debug_page_elements()
                 return False
             
-            # Extrai todas as opções do dropdown
-            try:
-                from selenium.webdriver.support.ui import Select
-                select = Select(uc_dropdown)
-                options = select.options
-                
-                ucs_list = []
-                for option in options:
-                    uc_number = option.get_attribute('value').strip()
-                    if uc_number:  # Ignora opções vazias
-                        ucs_list.append(uc_number)
-                
-                print(f"✅ {len(ucs_list)} UCs encontradas:")
-                for i, uc in enumerate(ucs_list, 1):
-                    print(f"   UC {i}: {uc}")
-                    
-            except Exception as e:
-                print(f"❌ Erro ao extrair UCs do dropdown: {e}")
-                return False
-            
             if not ucs_list:
                 print("❌ Nenhuma UC encontrada no dropdown!")
                 return False
             
-            # 3. CRIAR ESTRUTURA DE PASTAS E ARQUIVO JSON
-            print(f"\n📁 Criando estrutura de pastas para '{safe_client_name}'...")
-            
-            import os
-            import json
-            from datetime import datetime
-            
-            # Cria pasta principal do cliente
-            base_folder = "clientes_faturas"
-            client_folder = os.path.join(base_folder, safe_client_name)
-            
-            try:
-                os.makedirs(client_folder, exist_ok=True)
-                print(f"✅ Pasta criada: {client_folder}")
-            except Exception as e:
-                print(f"❌ Erro ao criar pasta: {e}")
-                return False
-            
-            # 4. CRIAR ARQUIVO RELATORIO.JSON
-            print("\n📄 Criando arquivo relatorio.json...")
-            
-            current_datetime = datetime.now()
-            report_data = {
-                "cliente": full_client_name or client_name,  # Usa o nome completo no JSON
-                "data_busca": current_datetime.strftime("%d/%m/%Y %H:%M:%S"),
-                "total_ucs": len(ucs_list),
-                "ucs": []
-            }
-            
-            # Adiciona cada UC com estrutura inicial (simplificada)
+            print(f"✅ {len(ucs_list)} UCs encontradas:")
             for i, uc in enumerate(ucs_list, 1):
-                uc_data = {
-                    "uc": uc,                   # Apenas o número da UC
-                    "faturas_em_aberto": None,  # Será preenchido posteriormente
-                    "meses_referencia": [],     # Será preenchido posteriormente
-                    "valor_total_devido": None, # Será preenchido posteriormente
-                    "status_processamento": "pendente"
-                }
-                report_data["ucs"].append(uc_data)
+                print(f"   UC {i}: {uc}")
             
-            # Salva o arquivo JSON
-            json_file_path = os.path.join(client_folder, "relatorio.json")
-            try:
-                with open(json_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(report_data, f, indent=4, ensure_ascii=False)
-                print(f"✅ Arquivo relatorio.json criado: {json_file_path}")
-            except Exception as e:
-                print(f"❌ Erro ao criar arquivo JSON: {e}")
-                return False
-            
-            # 5. SALVAR INFORMAÇÕES NA CLASSE PARA USAR DEPOIS
-            self.client_name = full_client_name or client_name
-            self.safe_client_name = safe_client_name
-            self.client_folder = client_folder
-            self.json_file_path = json_file_path
-            self.ucs_list = ucs_list
-            self.current_report_data = report_data
-            
-            print(f"\n✅ ETAPA 5 CONCLUÍDA COM SUCESSO!")
-            print(f"📊 Resumo:")
-            print(f"   👤 Cliente: {full_client_name or client_name}")
-            print(f"   📁 Pasta: {client_folder}")
-            print(f"   🔢 Total de UCs: {len(ucs_list)}")
-            print(f"   📄 Arquivo JSON: relatorio.json")
-            print(f"   📅 Data/Hora: {current_datetime.strftime('%d/%m/%Y %H:%M:%S')}")
-            
-            # Mostra preview do JSON criado
-            print(f"\n📋 Preview do relatório JSON:")
-            print(json.dumps(report_data, indent=2, ensure_ascii=False)[:500] + "...")
-            
-            return True
+            # 3. CRIAR ESTRUTURA DE PASTAS E ARQUIVO JSON
+            return self.create_client_structure(full_client_name or client_name, safe_client_name, ucs_list)
             
         except Exception as e:
             logger.error(f"Erro na etapa 5: {e}")
             print(f"❌ Erro inesperado na etapa 5: {e}")
             return False
 
+    def create_client_structure(self, client_name, safe_client_name, ucs_list):
+        """Cria a pasta do cliente e o relatorio.json inicial (comum aos dois motores)"""
+        print(f"\n📁 Criando estrutura de pastas para '{safe_client_name}'...")
+        
+        # Cria pasta principal do cliente
+        client_folder = os.path.join(self.output_root, safe_client_name)
+        
+        try:
+            os.makedirs(client_folder, exist_ok=True)
+            print(f"✅ Pasta criada: {client_folder}")
+        except Exception as e:
+            print(f"❌ Erro ao criar pasta: {e}")
+            return False
+        
+        # 4. CRIAR ARQUIVO RELATORIO.JSON
+        print("\n📄 Criando arquivo relatorio.json...")
+        
+        current_datetime = datetime.now()
+        json_file_path = os.path.join(client_folder, "relatorio.json")
+        report = None
+        if self.resume and os.path.exists(json_file_path):
+            try:
+                report = ClientReport.resume(json_file_path, client_name, ucs_list)
+                print("♻️ Retomando relatório existente (UCs concluídas serão puladas)")
+            except Exception as e:
+                print(f"⚠️ Relatório existente ilegível, recriando: {e}")
+        if report is None:
+            report = ClientReport.create(json_file_path, client_name, ucs_list)
+        report_data = report.data
+        
+        # Salva o arquivo JSON
+        if not report.flush():
+            print(f"❌ Erro ao criar arquivo JSON: {json_file_path}")
+            return False
+        print(f"✅ Arquivo relatorio.json criado: {json_file_path}")
+        
+        # 5. SALVAR INFORMAÇÕES NA CLASSE PARA USAR DEPOIS
+        self.client_name = client_name
+        self.safe_client_name = safe_client_name
+        self.client_folder = client_folder
+        self.json_file_path = json_file_path
+        self.ucs_list = ucs_list
+        self.report = report
+        self.current_report_data = report_data
+        
+        print(f"\n✅ ETAPA 5 CONCLUÍDA COM SUCESSO!")
+        print(f"📊 Resumo:")
+        print(f"   👤 Cliente: {client_name}")
+        print(f"   📁 Pasta: {client_folder}")
+        print(f"   🔢 Total de UCs: {len(ucs_list)}")
+        print(f"   📄 Arquivo JSON: relatorio.json")
+        print(f"   📅 Data/Hora: {current_datetime.strftime('%d/%m/%Y %H:%M:%S')}")
+        
+        # Mostra preview do JSON criado
+        print(f"\n📋 Preview do relatório JSON:")
+        print(json.dumps(report_data, indent=2, ensure_ascii=False)[:500] + "...")
+        
+        return True
+
     def update_report_json(self, uc_number, updates):
-        """Função auxiliar para atualizar dados de uma UC específica no JSON"""
+        """Função auxiliar para atualizar dados de uma UC específica no relatório (em memória)"""
         try:
-            # Carrega o JSON atual
-            with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Encontra a UC e atualiza
-            for uc_data in data["ucs"]:
-                if uc_data["uc"] == uc_number:  # Mudança aqui: agora usa "uc" em vez de "numero_uc"
-                    uc_data.update(updates)
-                    break
-            
-            # Salva o arquivo atualizado
-            with open(self.json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            # A gravação em disco é feita em lote pelo ClientReport
+            if not self.report.update_uc(uc_number, updates):
+                print(f"⚠️ UC {uc_number} não encontrada no relatório")
+                return False
             
             print(f"✅ JSON atualizado para UC {uc_number}")
             return True
@@ -1140,6 +2096,7 @@ class EquatorialDownloaderFixed:
 
 
 #-------------- Passo 6 Corrigido ----------#
+    @timed_step()
     def step6_process_each_uc(self):
             """Etapa 6: Processa cada UC individualmente, configurando formulário e navegando para faturas"""
             try:
@@ -1151,75 +2108,251 @@ class EquatorialDownloaderFixed:
                 
                 print(f"🔢 Total de UCs para processar: {len(self.ucs_list)}")
                 
+                # Modo paralelo: vários navegadores, cada um com a sua sessão, dividem as UCs
+                if self.uc_workers > 1 and len(self.ucs_list) > 1:
+                    return self.process_ucs_parallel()
+                
                 # Para cada UC, executa o processo
                 for i, uc_number in enumerate(self.ucs_list, 1):
                     print(f"\n{'='*60}")
                     print(f"🔄 PROCESSANDO UC {i}/{len(self.ucs_list)}: {uc_number}")
                     print(f"{'='*60}")
                     
+                    # Modo retomada: UC concluída e com todos os PDFs íntegros não é refeita
+                    if self.resume and self.uc_already_complete(uc_number):
+                        print(f"⏭️ UC {uc_number} já concluída em execução anterior, pulando")
+                        continue
+                    
+                    self.current_uc = uc_number
+                    
                     # Processa a UC atual
-                    if self.process_single_uc(uc_number, i):
-                        print(f"✅ UC {uc_number} processada com sucesso!")
-                        
-                        # Atualiza o JSON com status de sucesso
-                        self.update_report_json(uc_number, {
-                            "status_processamento": "processada_com_sucesso",
-                            "data_processamento": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-                        })
-                    else:
-                        print(f"❌ Erro ao processar UC {uc_number}")
-                        
-                        # Atualiza o JSON com status de erro
-                        self.update_report_json(uc_number, {
-                            "status_processamento": "erro_no_processamento",
-                            "data_processamento": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-                            "erro": "Falha no processamento individual da UC"
-                        })
+                    self.record_uc_result(uc_number, self.process_single_uc(uc_number, i))
                     
                     # NOVO: Volta para página de Segunda Via antes da próxima UC (exceto no último)
                     if i < len(self.ucs_list):
-                        if self.navigate_back_to_second_copy():
-                            time.sleep(2)
-                        else:
+                        if not self.navigate_back_to_second_copy():
                             print("⚠️ Aviso: Navegação de volta pode ter falhado, tentando continuar...")
-                            time.sleep(2)
+                    
+                    # Fronteira de UC: relatório gravado em disco
+                    self.current_uc = None
+                    self.report.flush()
                 
                 print(f"\n✅ ETAPA 6 CONCLUÍDA! Todas as {len(self.ucs_list)} UCs foram processadas.")
                 return True
                 
             except Exception as e:
-                logger.error(f"Erro na etapa 6: {e}")
-                print(f"❌ Erro inesperado na etapa 6: {e}")
-                return False  
+                self.current_uc = None
+                logger.error(f"Erro na etapa 6: {e}")
+                print(f"❌ Erro inesperado na etapa 6: {e}")
+                return False  
+
+    def record_uc_result(self, uc_number, success):
+        """Grava no relatório o status final do processamento da UC"""
+        if success:
+            print(f"✅ UC {uc_number} processada com sucesso!")
+            
+            # Atualiza o JSON com status de sucesso
+            self.update_report_json(uc_number, {
+                "status_processamento": "processada_com_sucesso",
+                "data_processamento": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+            })
+        else:
+            print(f"❌ Erro ao processar UC {uc_number}")
+            
+            # Atualiza o JSON com status de erro
+            self.update_report_json(uc_number, {
+                "status_processamento": "erro_no_processamento",
+                "data_processamento": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+                "erro": "Falha no processamento individual da UC"
+            })
+
+#-------------- Passo 6 em paralelo ----------#
+    def parallel_download_dir(self, index):
+        """Pasta de download do navegador extra 'index' (removida ao fim do Step 6 em paralelo)"""
+        return os.path.join(self.client_folder, ".downloads", f"navegador_{index}")
+
+    def clone_for_parallel_ucs(self, index):
+        """Outro navegador com login próprio (sessão ASP.NET separada) e pasta de download própria
+
+        A UC e a fatura escolhidas ficam na sessão do portal: dois navegadores com os mesmos
+        cookies trocariam a fatura um do outro, por isso cada um faz o login completo.
+        """
+        if not self.login_credentials:
+            return None
+        kwargs = dict(self.init_kwargs, download_dir=self.parallel_download_dir(index),
+                      session_dir=None, uc_workers=1)
+        clone = create_downloader(self.ENGINE_NAME, **kwargs)
+        if not clone.setup_driver():
+            return None
+        try:
+            if not clone.perform_full_login(*self.login_credentials):
+                print(f"⚠️ Navegador {index}: login próprio falhou")
+                clone.close()
+                return None
+        except Exception as e:
+            logger.warning(f"Navegador {index}: falha no login: {e}")
+            clone.close()
+            return None
+        
+        # Mesmo cliente e mesmo relatório (ClientReport é thread-safe)
+        clone.report = self.report
+        clone.current_report_data = self.current_report_data
+        clone.client_name = self.client_name
+        clone.safe_client_name = self.safe_client_name
+        clone.client_folder = self.client_folder
+        clone.json_file_path = self.json_file_path
+        clone.ucs_list = self.ucs_list
+        clone.run_id = self.run_id
+        clone.logged_in = True
+        return clone
+
+    def _parallel_uc_worker(self, downloader, uc_queue, total):
+        """Consome a fila de UCs com um navegador; volta à Segunda Via entre uma UC e outra"""
+        on_segunda_via = True
+        while True:
+            try:
+                position, uc_number = uc_queue.get_nowait()
+            except queue.Empty:
+                return
+            print(f"\n🔄 [{threading.current_thread().name}] UC {position}/{total}: {uc_number}")
+            if not on_segunda_via and not downloader.navigate_back_to_second_copy():
+                print("⚠️ Aviso: Navegação de volta pode ter falhado, tentando continuar...")
+            downloader.current_uc = uc_number
+            try:
+                success = downloader.process_single_uc(uc_number, position)
+            except Exception as e:
+                logger.error(f"Erro ao processar UC {uc_number}: {e}")
+                success = False
+            downloader.record_uc_result(uc_number, success)
+            downloader.current_uc = None
+            self.report.flush()
+            on_segunda_via = False
+
+    def _parallel_clone_worker(self, index, uc_queue, total, active):
+        """Abre e autentica o navegador extra na própria thread e consome a fila com ele"""
+        clone = None
+        try:
+            clone = self.clone_for_parallel_ucs(index)
+            if clone:
+                active.append(clone)
+                self._parallel_uc_worker(clone, uc_queue, total)
+        finally:
+            if clone:
+                clone.close()
+            shutil.rmtree(self.parallel_download_dir(index), ignore_errors=True)
+
+    def process_ucs_parallel(self):
+        """Etapa 6 com K navegadores, cada um com a sua sessão, consumindo a mesma fila de UCs"""
+        uc_queue = queue.Queue()
+        for position, uc_number in enumerate(self.ucs_list, 1):
+            if self.resume and self.uc_already_complete(uc_number):
+                print(f"⏭️ UC {uc_number} já concluída em execução anterior, pulando")
+                continue
+            uc_queue.put((position, uc_number))
+        
+        workers = min(self.uc_workers, MAX_UC_WORKERS, uc_queue.qsize())
+        print(f"🚀 Processando {uc_queue.qsize()} UCs com {workers} navegador(es) em paralelo")
+        
+        # Este navegador (já na Segunda Via) começa logo; cada clone abre e faz login na própria
+        # thread, sem atrasar os demais, e entra na fila quando estiver pronto
+        downloaders = [self]
+        threads = [threading.Thread(target=self._parallel_uc_worker, args=(self, uc_queue, len(self.ucs_list)),
+                                    name="navegador-0")]
+        threads += [
+            threading.Thread(target=self._parallel_clone_worker, args=(index, uc_queue, len(self.ucs_list), downloaders),
+                             name=f"navegador-{index}")
+            for index in range(1, workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        downloads_root = os.path.join(self.client_folder, ".downloads")
+        if os.path.isdir(downloads_root) and not os.listdir(downloads_root):
+            os.rmdir(downloads_root)
+        
+        self.report.flush()
+        print(f"\n✅ ETAPA 6 CONCLUÍDA! {len(self.ucs_list)} UCs com {len(downloaders)} navegador(es).")
+        return True
+
+    def uc_already_complete(self, uc_number):
+        """UC processada com sucesso, com todas as faturas baixadas e os arquivos íntegros"""
+        uc_data = self.report.uc(uc_number) or {}
+        if uc_data.get("status_processamento") != "processada_com_sucesso":
+            return False
+        faturas_baixadas = uc_data.get("faturas_baixadas") or []
+        if len(faturas_baixadas) < (uc_data.get("faturas_em_aberto") or 0):
+            return False
+        return all(is_valid_pdf(fatura.get("caminho")) for fatura in faturas_baixadas)
+
+    def manifest_for(self, uc_folder):
+        """Manifesto de downloads da pasta da UC (um por pasta, carregado uma vez)"""
+        if uc_folder not in self._manifests:
+            self._manifests[uc_folder] = InvoiceManifest(uc_folder)
+        return self._manifests[uc_folder]
+
+    def existing_invoice(self, uc_number, mes, filename, filepath):
+        """Sincronização incremental: reaproveita a fatura se o PDF em disco confere com o manifesto
+
+        PDF ainda fora do manifesto (ex: execução interrompida) só é incorporado a ele se estiver
+        íntegro e passar na mesma conferência de UC/mês dos downloads; senão é baixado de novo.
+        """
+        if not (self.incremental or self.resume):
+            return None
+        manifest = self.manifest_for(os.path.dirname(filepath))
+        if manifest.is_current(filename):
+            print(f"⏭️ Fatura {mes} já baixada ({filename}), pulando")
+        elif filename not in manifest.entries and is_valid_pdf(filepath):
+            if not pdf_file_passes(filepath, self.invoice_pdf_check(uc_number, mes)):
+                print(f"🔄 {filename} em disco não confere com a fatura, baixando de novo")
+                return None
+            manifest.record(filename, mes)
+            print(f"⏭️ Fatura {mes} já em disco ({filename}), incluída no manifesto")
+        else:
+            return None
+        return {'mes': mes, 'arquivo': filename, 'caminho': filepath}
 
+    def register_invoice(self, mes, filename, filepath):
+        """Registra o PDF recém-baixado no manifesto da UC e retorna o registro da fatura"""
+        self.manifest_for(os.path.dirname(filepath)).record(filename, mes)
+        return {'mes': mes, 'arquivo': filename, 'caminho': filepath}
+
+    @timed_step(per_uc=True)
     def process_single_uc(self, uc_number, uc_index):
         """Processa uma UC individual - VERSÃO ATUALIZADA COM STEP 7"""
         try:
             print(f"\n🎯 Processando UC: {uc_number}")
             
-            # PASSO 1: Selecionar a UC no dropdown
-            if not self.select_uc_in_dropdown(uc_number):
-                return False
-            
-            # PASSO 2: Aguardar página recarregar
-            print("⏳ Aguardando página recarregar após seleção da UC...")
-            time.sleep(3)
-            
-            # PASSO 3: Configurar tipo de emissão para "Emitir Fatura Completa"
-            if not self.set_emission_type("completa"):
-                return False
-            
-            # PASSO 4: Configurar motivo da emissão para "Outros"
-            if not self.set_emission_reason("ESV05"):  # ESV05 = Outros
-                return False
-            
-            # PASSO 5: Clicar no botão "Emitir"
-            if not self.click_emit_button():
-                return False
+            # PASSOS 1-5 (caminho rápido): UC, tipo, motivo e Emitir por script, esperando só os postbacks reais
+            if self.fast_form and self.fast_emit(uc_number, "completa", "ESV05"):
+                print("⚡ Formulário de emissão enviado pelo caminho rápido")
+            else:
+                if self.fast_form:
+                    print("↩️ Caminho rápido indisponível, preenchendo o formulário passo a passo...")
+                
+                # PASSO 1: Selecionar a UC no dropdown
+                if not self.select_uc_in_dropdown(uc_number):
+                    return False
+                
+                # PASSO 2: Aguardar página recarregar
+                print("⏳ Aguardando página recarregar após seleção da UC...")
+                self.waiter.element_present([(By.CSS_SELECTOR, "select[id*='cbTipoEmissao']")])
+                
+                # PASSO 3: Configurar tipo de emissão para "Emitir Fatura Completa"
+                if not self.set_emission_type("completa"):
+                    return False
+                
+                # PASSO 4: Configurar motivo da emissão para "Outros"
+                if not self.set_emission_reason("ESV05"):  # ESV05 = Outros
+                    return False
+                
+                # PASSO 5: Clicar no botão "Emitir"
+                if not self.click_emit_button():
+                    return False
             
             # PASSO 6: Aguardar navegação para página de faturas
             print("⏳ Aguardando navegação para página de faturas...")
-            time.sleep(4)
+            self.waiter.postback_done()
             
             # PASSO 7: Verificar se chegou na página de faturas
             if self.verify_invoices_page():
@@ -1241,20 +2374,22 @@ class EquatorialDownloaderFixed:
             logger.error(f"Erro ao processar UC {uc_number}: {e}")
             return False
 
+    @timed_step()
     def navigate_back_to_second_copy(self):
         """Navega de volta para a página de Segunda Via para processar próxima UC"""
         try:
             print("🔄 Navegando de volta para página de Segunda Via...")
             
             # URL da página de Segunda Via
-            segunda_via_url = "https://goias.equatorialenergia.com.br/AgenciaGO/Servi%C3%A7os/aberto/SegundaVia.aspx"
+            segunda_via_url = self.segunda_via_url
             
             # Navega diretamente para a URL
             print(f"🌐 Acessando: {segunda_via_url}")
+            self.apply_resource_blocking("segunda_via")
             self.driver.get(segunda_via_url)
             
-            # Aguarda a página carregar
-            time.sleep(3)
+            # Aguarda o dropdown de UCs estar disponível
+            self.waiter.element_present([(By.CSS_SELECTOR, "#CONTENT_comboBoxUC")])
             
             # Verifica se chegou na página correta
             current_url = self.driver.current_url
@@ -1292,7 +2427,7 @@ class EquatorialDownloaderFixed:
             try:
                 print("🔄 Tentando voltar usando navegação do browser...")
                 self.driver.back()
-                time.sleep(2)
+                self.waiter.page_ready()
                 
                 current_url = self.driver.current_url
                 print(f"🌐 URL após voltar: {current_url}")
@@ -1308,35 +2443,46 @@ class EquatorialDownloaderFixed:
                 print(f"❌ Erro também na abordagem alternativa: {e2}")
                 return False
 
+    @timed_step(per_uc=True)
+    def fast_emit(self, uc_number, emission_type="completa", reason_code="ESV05"):
+        """Preenche UC, tipo e motivo e clica em Emitir por script; False se algum campo não existir"""
+        fields = [["comboBoxUC", uc_number], ["cbTipoEmissao", emission_type], ["cbMotivo", reason_code]]
+        try:
+            # Mesmas regras de bloqueio em segunda_via e faturas: aplica antes do primeiro postback
+            self.apply_resource_blocking("faturas")
+            
+            # Cada campo com AutoPostBack gera no máximo um postback; o último envio é o Emitir
+            for _ in range(len(fields) * 2):
+                result = self.waiter.run_armed(FAST_EMIT_JS, fields, "btEnviar") or {}
+                if result.get("status") == "enviado":
+                    return True
+                if result.get("status") != "postback":
+                    logger.info(f"Caminho rápido: campo '{result.get('campo')}' não encontrado")
+                    return False
+                logger.debug(f"Caminho rápido: aguardando postback de {result['campo']}")
+                self.waiter.postback_done()
+            
+            logger.warning("Caminho rápido: o formulário continuou disparando postbacks")
+            return False
+        except Exception as e:
+            logger.warning(f"Caminho rápido falhou para UC {uc_number}: {e}")
+            return False
+
+    @timed_step(per_uc=True)
     def select_uc_in_dropdown(self, uc_number):
         """Seleciona uma UC específica no dropdown"""
         try:
             print(f"🔍 Selecionando UC {uc_number} no dropdown...")
             
-            # Aguarda um pouco para garantir que a página está carregada
-            time.sleep(1)
-            
             # Encontra o dropdown de UCs
             dropdown_selectors = [
-                "#CONTENT_comboBoxUC",
-                "select[name*='comboBoxUC']",
-                "select[id*='comboBoxUC']",
-                "select.DropDown"
+                (By.CSS_SELECTOR, "#CONTENT_comboBoxUC"),
+                (By.CSS_SELECTOR, "select[name*='comboBoxUC']"),
+                (By.CSS_SELECTOR, "select[id*='comboBoxUC']"),
+                (By.CSS_SELECTOR, "select.DropDown")
             ]
             
-            dropdown = None
-            for selector in dropdown_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed():
-                            dropdown = element
-                            print(f"✅ Dropdown encontrado: {selector}")
-                            break
-                    if dropdown:
-                        break
-                except:
-                    continue
+            dropdown = self.find_element_cached("segunda_via:uc_dropdown", dropdown_selectors)
             
             if not dropdown:
                 print("❌ Dropdown de UCs não encontrado!")
@@ -1348,11 +2494,12 @@ class EquatorialDownloaderFixed:
             
             # Tenta selecionar por valor
             try:
+                self.waiter.arm_postback()
                 select.select_by_value(uc_number)
                 print(f"✅ UC {uc_number} selecionada por valor")
                 
-                # Aguarda um pouco para o JavaScript processar
-                time.sleep(1)
+                # Aguarda o postback disparado pela seleção
+                self.waiter.postback_done()
                 return True
                 
             except Exception as e:
@@ -1360,9 +2507,10 @@ class EquatorialDownloaderFixed:
                 
                 # Tenta selecionar por texto visível
                 try:
+                    self.waiter.arm_postback()
                     select.select_by_visible_text(uc_number)
                     print(f"✅ UC {uc_number} selecionada por texto")
-                    time.sleep(1)
+                    self.waiter.postback_done()
                     return True
                 except Exception as e2:
                     print(f"❌ Erro ao selecionar UC por texto: {e2}")
@@ -1372,6 +2520,7 @@ class EquatorialDownloaderFixed:
             print(f"❌ Erro geral ao selecionar UC: {e}")
             return False
 
+    @timed_step()
     def set_emission_type(self, emission_type="completa"):
         """Configura o tipo de emissão para 'Emitir fatura completa'"""
         try:
@@ -1379,24 +2528,12 @@ class EquatorialDownloaderFixed:
             
             # Encontra o dropdown de tipo de emissão
             emission_selectors = [
-                "#CONTENT_cbTipoEmissao",
-                "select[name*='cbTipoEmissao']",
-                "select[id*='cbTipoEmissao']"
+                (By.CSS_SELECTOR, "#CONTENT_cbTipoEmissao"),
+                (By.CSS_SELECTOR, "select[name*='cbTipoEmissao']"),
+                (By.CSS_SELECTOR, "select[id*='cbTipoEmissao']")
             ]
             
-            dropdown = None
-            for selector in emission_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed():
-                            dropdown = element
-                            print(f"✅ Dropdown tipo emissão encontrado: {selector}")
-                            break
-                    if dropdown:
-                        break
-                except:
-                    continue
+            dropdown = self.find_element_cached("segunda_via:tipo_emissao", emission_selectors)
             
             if not dropdown:
                 print("❌ Dropdown de tipo de emissão não encontrado!")
@@ -1407,9 +2544,10 @@ class EquatorialDownloaderFixed:
             select = Select(dropdown)
             
             try:
+                self.waiter.arm_postback()
                 select.select_by_value(emission_type)
                 print(f"✅ Tipo de emissão '{emission_type}' selecionado")
-                time.sleep(1)
+                self.waiter.postback_done()
                 return True
             except Exception as e:
                 print(f"❌ Erro ao selecionar tipo de emissão: {e}")
@@ -1419,6 +2557,7 @@ class EquatorialDownloaderFixed:
             print(f"❌ Erro geral ao configurar tipo de emissão: {e}")
             return False
 
+    @timed_step()
     def set_emission_reason(self, reason_code="ESV05"):
         """Configura o motivo da emissão para 'Outros' (ESV05)"""
         try:
@@ -1426,24 +2565,12 @@ class EquatorialDownloaderFixed:
             
             # Encontra o dropdown de motivo
             reason_selectors = [
-                "#CONTENT_cbMotivo",
-                "select[name*='cbMotivo']",
-                "select[id*='cbMotivo']"
+                (By.CSS_SELECTOR, "#CONTENT_cbMotivo"),
+                (By.CSS_SELECTOR, "select[name*='cbMotivo']"),
+                (By.CSS_SELECTOR, "select[id*='cbMotivo']")
             ]
             
-            dropdown = None
-            for selector in reason_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed():
-                            dropdown = element
-                            print(f"✅ Dropdown motivo encontrado: {selector}")
-                            break
-                    if dropdown:
-                        break
-                except:
-                    continue
+            dropdown = self.find_element_cached("segunda_via:motivo", reason_selectors)
             
             if not dropdown:
                 print("❌ Dropdown de motivo não encontrado!")
@@ -1454,9 +2581,10 @@ class EquatorialDownloaderFixed:
             select = Select(dropdown)
             
             try:
+                self.waiter.arm_postback()
                 select.select_by_value(reason_code)
                 print(f"✅ Motivo '{reason_code}' (Outros) selecionado")
-                time.sleep(1)
+                self.waiter.postback_done()
                 return True
             except Exception as e:
                 print(f"❌ Erro ao selecionar motivo: {e}")
@@ -1466,6 +2594,7 @@ class EquatorialDownloaderFixed:
             print(f"❌ Erro geral ao configurar motivo: {e}")
             return False
 
+    @timed_step()
     def click_emit_button(self):
         """Clica no botão 'Emitir' para processar a segunda via"""
         try:
@@ -1473,38 +2602,29 @@ class EquatorialDownloaderFixed:
             
             # Encontra o botão Emitir
             button_selectors = [
-                "#CONTENT_btEnviar",
-                "input[name*='btEnviar']",
-                "input[id*='btEnviar']",
-                "input[value='Emitir']",
-                ".btEmitir"
+                (By.CSS_SELECTOR, "#CONTENT_btEnviar"),
+                (By.CSS_SELECTOR, "input[name*='btEnviar']"),
+                (By.CSS_SELECTOR, "input[id*='btEnviar']"),
+                (By.CSS_SELECTOR, "input[value='Emitir']"),
+                (By.CSS_SELECTOR, ".btEmitir")
             ]
             
-            button = None
-            for selector in button_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed() and element.is_enabled():
-                            button = element
-                            print(f"✅ Botão Emitir encontrado: {selector}")
-                            break
-                    if button:
-                        break
-                except:
-                    continue
+            button = self.find_element_cached("segunda_via:emitir", button_selectors, require_enabled=True)
             
             if not button:
                 print("❌ Botão 'Emitir' não encontrado!")
                 return False
             
+            # O postback do Emitir carrega a página de faturas
+            self.apply_resource_blocking("faturas")
+            
             # Clica no botão
             try:
                 # Scroll para o botão para garantir que está visível
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", button)
-                time.sleep(0.5)
                 
                 # Clica no botão
+                self.waiter.arm_postback()
                 button.click()
                 print("✅ Botão 'Emitir' clicado com sucesso")
                 return True
@@ -1525,13 +2645,14 @@ class EquatorialDownloaderFixed:
             print(f"❌ Erro geral ao clicar no botão Emitir: {e}")
             return False
 
+    @timed_step()
     def verify_invoices_page(self):
         """Verifica se chegou na página de faturas em aberto"""
         try:
             print("🔍 Verificando se chegou na página de faturas...")
             
-            # Aguarda um pouco para a página carregar
-            time.sleep(2)
+            # Aguarda a página terminar de carregar
+            self.waiter.page_ready()
             
             current_url = self.driver.current_url
             page_title = self.driver.title
@@ -1588,9 +2709,7 @@ class EquatorialDownloaderFixed:
         try:
             print("\n📊 Atualizando relatório final após Step 6...")
             
-            # Carrega o JSON atual
-            with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self.report.data
             
             # Conta estatísticas
             total_processadas = 0
@@ -1603,18 +2722,20 @@ class EquatorialDownloaderFixed:
                     total_com_erro += 1
             
             # Atualiza dados gerais
-            data["step6_concluido"] = True
-            data["data_step6"] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            data["estatisticas_step6"] = {
-                "total_ucs": len(self.ucs_list),
-                "processadas_com_sucesso": total_processadas,
-                "com_erro": total_com_erro,
-                "pendentes": len(self.ucs_list) - total_processadas - total_com_erro
-            }
+            self.report.update({
+                "step6_concluido": True,
+                "data_step6": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+                "estatisticas_step6": {
+                    "total_ucs": len(self.ucs_list),
+                    "processadas_com_sucesso": total_processadas,
+                    "com_erro": total_com_erro,
+                    "pendentes": len(self.ucs_list) - total_processadas - total_com_erro
+                }
+            })
             
             # Salva o arquivo atualizado
-            with open(self.json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            if not self.report.flush():
+                return False
             
             print(f"✅ Relatório atualizado!")
             print(f"   📊 UCs processadas: {total_processadas}")
@@ -1629,28 +2750,27 @@ class EquatorialDownloaderFixed:
 
 
 #--------- Passo 7 ------#
+    @timed_step(per_uc=True)
     def step7_extract_and_download_invoices(self, uc_number):
         """Etapa 7: Extrai informações das faturas e faz download tratando o popup"""
         try:
             print(f"\n📄 ETAPA 7: Processando faturas da UC {uc_number}...")
             
             # Aguarda a página carregar completamente
-            time.sleep(3)
+            self.waiter.page_ready()
             
-            # 1. ENCONTRAR TABELA DE FATURAS
+            # 1. LER TABELA DE FATURAS (um único snapshot do HTML, analisado com lxml)
             print("🔍 Procurando tabela de faturas...")
             
-            invoice_rows = []
+            faturas_info = []
             try:
-                # Procura por linhas que contêm links de download
-                rows = self.driver.find_elements(By.XPATH, "//tr[.//a[contains(text(), 'Download')]]")
-                if rows:
-                    invoice_rows = rows
-                    print(f"✅ Encontradas {len(rows)} faturas disponíveis")
+                faturas_info = parse_invoice_table(self.driver.page_source)
+                if faturas_info:
+                    print(f"✅ Encontradas {len(faturas_info)} faturas disponíveis")
             except Exception as e:
                 print(f"❌ Erro ao procurar faturas: {e}")
             
-            if not invoice_rows:
+            if not faturas_info:
                 print("⚠️ Nenhuma fatura encontrada para esta UC")
                 self.update_report_json(uc_number, {
                     "faturas_em_aberto": 0,
@@ -1660,38 +2780,19 @@ class EquatorialDownloaderFixed:
                 })
                 return True
             
-            # 2. EXTRAIR INFORMAÇÕES DAS FATURAS
-            faturas_info = []
-            meses_referencia = []
-            
-            for i, row in enumerate(invoice_rows):
-                try:
-                    # Extrai o mês de referência (primeira coluna)
-                    month_elements = row.find_elements(By.XPATH, "./td[1]")
-                    if month_elements:
-                        month_text = month_elements[0].text.strip()
-                        print(f"📅 Fatura {i+1}: {month_text}")
-                        meses_referencia.append(month_text)
-                        
-                        # Encontra o link de download nesta linha
-                        download_link = row.find_element(By.XPATH, ".//a[contains(text(), 'Download')]")
-                        
-                        faturas_info.append({
-                            'mes': month_text,
-                            'link_element': download_link,
-                            'row_index': i
-                        })
-                        
-                except Exception as e:
-                    print(f"❌ Erro ao processar linha {i+1}: {e}")
-                    continue
+            # 2. INFORMAÇÕES DAS FATURAS (mês, vencimento, valor, situação e alvo do link Download)
+            for i, fatura in enumerate(faturas_info):
+                print(f"📅 Fatura {i+1}: {fatura['mes']} | venc. {fatura['vencimento']} | R$ {fatura['valor']}"
+                      f" | {fatura['situacao'] or '-'}")
             
             # 3. ATUALIZAR JSON COM INFORMAÇÕES DAS FATURAS
             print(f"\n📊 Atualizando relatório JSON...")
-            self.update_report_json(uc_number, {
-                "faturas_em_aberto": len(faturas_info),
-                "meses_referencia": meses_referencia
-            })
+            self.update_report_json(uc_number, summarize_invoices(faturas_info))
+            
+            # Modo varredura: só os metadados, nenhum download
+            if self.scan_only:
+                print(f"🔎 Modo varredura: {len(faturas_info)} faturas registradas, downloads ignorados")
+                return True
             
             # 4. CONFIGURAR PASTA DE DOWNLOADS
             uc_folder = os.path.join(self.client_folder, f"UC_{uc_number}")
@@ -1713,164 +2814,27 @@ class EquatorialDownloaderFixed:
                 try:
                     print(f"\n💾 Baixando fatura {idx+1}/{len(faturas_info)}: {fatura['mes']}")
                     
-                    # Formata o nome do arquivo
-                    mes_ano = fatura['mes'].replace('/', '_')
-                    mes_parts = mes_ano.split('_')
-                    if len(mes_parts) == 2:
-                        mes_abrev = mes_parts[0][:3].capitalize()
-                        ano_abrev = mes_parts[1][-2:]
-                        filename = f"{uc_number}_{mes_abrev}_{ano_abrev}.pdf"
+                    downloaded = self.download_invoice(uc_number, fatura, uc_folder)
+                    if downloaded:
+                        faturas_baixadas.append(downloaded)
                     else:
-                        filename = f"{uc_number}_{mes_ano}.pdf"
-                    
-                    filepath = os.path.join(uc_folder, filename)
-                    
-                    # Registra o tempo antes do download
-                    start_time = time.time()
-                    
-                    # CLICA NO LINK DE DOWNLOAD
-                    try:
-                        # Scroll até o elemento
-                        self.driver.execute_script("arguments[0].scrollIntoView(true);", fatura['link_element'])
-                        time.sleep(0.5)
-                        
-                        print("🖱️ Clicando no link de download...")
-                        fatura['link_element'].click()
-                        
-                    except Exception as click_error:
-                        print(f"⚠️ Erro no clique, tentando JavaScript: {click_error}")
-                        self.driver.execute_script("arguments[0].click();", fatura['link_element'])
-                    
-                    # AGUARDA E TRATA O POPUP
-                    print("⏳ Aguardando popup aparecer...")
-                    popup_handled = False
-                    max_wait = 10  # segundos
-                    wait_time = 0
-                    
-                    while wait_time < max_wait and not popup_handled:
-                        try:
-                            # Procura pelo botão OK do popup
-                            ok_button = self.driver.find_element(By.CSS_SELECTOR, 
-                                "input#CONTENT_btnModal.btn.btn-info.btnModal.ModalButton")
-                            
-                            if ok_button.is_displayed():
-                                print("✅ Popup detectado! Clicando em OK...")
-                                
-                                # Destaca o botão para debug
-                                self.driver.execute_script(
-                                    "arguments[0].style.border='3px solid red';",
-                                    ok_button
-                                )
-                                
-                                time.sleep(0.5)
-                                
-                                # Clica no botão OK
-                                try:
-                                    ok_button.click()
-                                except:
-                                    self.driver.execute_script("arguments[0].click();", ok_button)
-                                
-                                popup_handled = True
-                                print("✅ Popup tratado com sucesso!")
-                                
-                                # Aguarda o download começar
-                                time.sleep(3)
-                                
-                        except NoSuchElementException:
-                            # Popup ainda não apareceu
-                            time.sleep(0.5)
-                            wait_time += 0.5
-                        except Exception as e:
-                            print(f"⚠️ Erro ao procurar popup: {e}")
-                            time.sleep(0.5)
-                            wait_time += 0.5
-                    
-                    if not popup_handled:
-                        print("⚠️ Popup não apareceu no tempo esperado")
-                    
-                    # VERIFICA SE O DOWNLOAD FOI INICIADO
-                    # Aguarda um tempo adicional para o download completar
-                    print("⏳ Aguardando conclusão do download...")
-                    time.sleep(5)
-                    
-                    # Verifica se o arquivo foi baixado
-                    download_success = False
-                    
-                    # Lista arquivos na pasta de downloads
-                    try:
-                        # Procura por arquivos PDF recentes
-                        for file in os.listdir(uc_folder):
-                            if file.endswith('.pdf'):
-                                file_path = os.path.join(uc_folder, file)
-                                # Verifica se o arquivo foi criado após iniciar o download
-                                if os.path.getctime(file_path) > start_time:
-                                    # Renomeia o arquivo se necessário
-                                    if file != filename:
-                                        new_path = os.path.join(uc_folder, filename)
-                                        os.rename(file_path, new_path)
-                                        print(f"✅ Arquivo renomeado para: {filename}")
-                                    else:
-                                        print(f"✅ Download concluído: {filename}")
-                                    
-                                    download_success = True
-                                    faturas_baixadas.append({
-                                        'mes': fatura['mes'],
-                                        'arquivo': filename,
-                                        'caminho': os.path.join(uc_folder, filename)
-                                    })
-                                    break
-                        
-                        if not download_success:
-                            # Verifica na pasta de downloads padrão também
-                            default_download = os.path.join(os.path.expanduser("~"), "Downloads")
-                            for file in os.listdir(default_download):
-                                if file.endswith('.pdf'):
-                                    file_path = os.path.join(default_download, file)
-                                    if os.path.getctime(file_path) > start_time:
-                                        # Move o arquivo para a pasta correta
-                                        new_path = os.path.join(uc_folder, filename)
-                                        import shutil
-                                        shutil.move(file_path, new_path)
-                                        print(f"✅ Arquivo movido e renomeado: {filename}")
-                                        
-                                        download_success = True
-                                        faturas_baixadas.append({
-                                            'mes': fatura['mes'],
-                                            'arquivo': filename,
-                                            'caminho': new_path
-                                        })
-                                        break
-                        
-                    except Exception as e:
-                        print(f"❌ Erro ao verificar download: {e}")
-                    
-                    if not download_success:
                         print(f"⚠️ Download da fatura {fatura['mes']} pode não ter sido concluído")
                     
                     # Volta para a página de faturas se necessário
-                    # O popup pode ter mudado a página, então verificamos
+                    # O popup pode ter mudado a página; as próximas faturas são disparadas
+                    # pelo alvo do postback, sem re-localizar elementos
                     current_url = self.driver.current_url
                     if "mostrarFaturaCompleta" in current_url:
                         print("🔙 Voltando para lista de faturas...")
                         self.driver.back()
-                        time.sleep(3)
-                        
-                        # Se houver mais faturas, precisa re-encontrar os elementos
-                        if idx < len(faturas_info) - 1:
-                            print("🔄 Re-localizando elementos da página...")
-                            rows = self.driver.find_elements(By.XPATH, "//tr[.//a[contains(text(), 'Download')]]")
-                            # Atualiza os links para as próximas faturas
-                            for j in range(idx + 1, len(faturas_info)):
-                                if j - idx - 1 < len(rows):
-                                    next_row = rows[faturas_info[j]['row_index']]
-                                    next_link = next_row.find_element(By.XPATH, ".//a[contains(text(), 'Download')]")
-                                    faturas_info[j]['link_element'] = next_link
+                        self.waiter.element_present([(By.XPATH, "//tr[.//a[contains(text(), 'Download')]]")])
                     
                 except Exception as e:
                     print(f"❌ Erro ao baixar fatura {fatura['mes']}: {e}")
                     continue
             
             # 6. ATUALIZAR JSON COM FATURAS BAIXADAS
+            self.manifest_for(uc_folder).save()
             print(f"\n📊 Atualizando relatório com {len(faturas_baixadas)} faturas baixadas...")
             self.update_report_json(uc_number, {
                 "faturas_baixadas": faturas_baixadas,
@@ -1897,169 +2861,150 @@ class EquatorialDownloaderFixed:
             
             return False
 
-    def wait_for_download_complete(self, download_folder, timeout=30):
-        """Aguarda o download ser concluído verificando arquivos .crdownload"""
+    def trigger_invoice_download(self, fatura):
+        """Aciona o link Download pelo alvo do postback (fallback: clique pelo id/posição), sem reler a tabela
+
+        Na mesma chamada arma a detecção de postback e marca os popups já visíveis como antigos.
+        """
+        target, argument = fatura['alvo_postback'] or (None, None)
+        method = self.waiter.run_armed(MARK_STALE_POPUP_JS + TRIGGER_INVOICE_DOWNLOAD_JS, target, argument,
+                                       fatura['link_id'], fatura['row_index'], POPUP_OK_SELECTORS)
+        if not method:
+            raise NoSuchElementException(f"Link Download da fatura {fatura['mes']} não encontrado")
+        logger.info(f"Download da fatura {fatura['mes']} acionado por {method}")
+
+    @timed_step(per_uc=True)
+    def download_invoice(self, uc_number, fatura, uc_folder):
+        """Baixa uma fatura (link Download -> popup OK -> PDF); retorna o registro da fatura ou None"""
+        filename = build_invoice_filename(uc_number, fatura['mes'])
+        filepath = os.path.join(uc_folder, filename)
+        
+        existing = self.existing_invoice(uc_number, fatura['mes'], filename, filepath)
+        if existing:
+            return existing
+        
+        # Registra o ponto de partida do download (eventos CDP e, no fallback, horário)
+        download_mark = self.download_tracker.mark() if self.download_tracker else None
+        start_time = time.time()
+        
+        # DISPARA O LINK DE DOWNLOAD
+        print("🖱️ Acionando o link de download...")
+        self.trigger_invoice_download(fatura)
+        
+        # AGUARDA E TRATA O POPUP (OK clicado no navegador assim que aparecer)
+        print("⏳ Aguardando popup aparecer...")
+        if self.confirm_popup():
+            print("✅ Popup tratado com sucesso!")
+        else:
+            print("⚠️ Popup não apareceu no tempo esperado")
+        
+        # VERIFICA SE O DOWNLOAD FOI CONCLUÍDO (e se o PDF é desta UC/fatura)
+        print("⏳ Aguardando conclusão do download...")
+        check = self.invoice_pdf_check(uc_number, fatura['mes'])
         try:
-            print("⏳ Monitorando pasta de downloads...")
-            
-            end_time = time.time() + timeout
-            while time.time() < end_time:
-                # Verifica se há arquivos temporários do Chrome
-                temp_files = [f for f in os.listdir(download_folder) if f.endswith('.crdownload')]
-                
-                if not temp_files:
-                    # Não há downloads em andamento
-                    time.sleep(1)  # Aguarda mais um pouco para garantir
-                    
-                    # Procura por PDFs recentes
-                    pdf_files = [f for f in os.listdir(download_folder) if f.endswith('.pdf')]
-                    if pdf_files:
-                        # Ordena por data de criação (mais recente primeiro)
-                        pdf_files.sort(key=lambda x: os.path.getctime(os.path.join(download_folder, x)), reverse=True)
-                        most_recent = pdf_files[0]
-                        
-                        # Verifica se foi criado nos últimos 30 segundos
-                        file_path = os.path.join(download_folder, most_recent)
-                        if time.time() - os.path.getctime(file_path) < 30:
-                            print(f"✅ Download concluído: {most_recent}")
-                            return file_path
-                        
-                    return None
-                else:
-                    print(f"⏳ Download em andamento: {temp_files[0]}")
-                    time.sleep(1)
-            
-            print("⚠️ Timeout ao aguardar download")
-            return None
-            
+            if self.download_tracker:
+                saved_path = self.collect_tracked_download(download_mark, uc_folder, filename, check)
+            else:
+                saved_path = self.collect_download_by_scan(start_time, uc_folder, filename, check)
         except Exception as e:
-            print(f"❌ Erro ao monitorar download: {e}")
+            print(f"❌ Erro ao verificar download: {e}")
+            saved_path = None
+        
+        if not saved_path:
             return None
+        return self.register_invoice(fatura['mes'], filename, saved_path)
 
-    def handle_popup_and_download(self, uc_number, fatura_info, uc_folder):
-        """Função específica para lidar com o popup e gerenciar o download"""
-        try:
-            mes_ano = fatura_info['mes'].replace('/', '_')
-            mes_parts = mes_ano.split('_')
-            if len(mes_parts) == 2:
-                mes_abrev = mes_parts[0][:3].capitalize()
-                ano_abrev = mes_parts[1][-2:]
-                filename = f"{uc_number}_{mes_abrev}_{ano_abrev}.pdf"
-            else:
-                filename = f"{uc_number}_{mes_ano}.pdf"
-            
-            # Lista arquivos antes do download
-            files_before = set(os.listdir(uc_folder)) if os.path.exists(uc_folder) else set()
-            
-            # Clica no link
-            print("🖱️ Clicando no link de download...")
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", fatura_info['link_element'])
-            time.sleep(0.5)
-            fatura_info['link_element'].click()
-            
-            # Aguarda e trata o popup
-            popup_found = False
-            for i in range(20):  # Tenta por 10 segundos
-                try:
-                    # Múltiplos seletores para o botão OK
-                    ok_selectors = [
-                        "input#CONTENT_btnModal",
-                        "input.btnModal",
-                        "button.ModalButton",
-                        "input[value='OK']",
-                        "button:contains('OK')"
-                    ]
-                    
-                    for selector in ok_selectors:
-                        try:
-                            if ":contains(" in selector:
-                                ok_buttons = self.driver.find_elements(By.XPATH, "//button[text()='OK']")
-                            else:
-                                ok_buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                            
-                            for button in ok_buttons:
-                                if button.is_displayed():
-                                    print(f"✅ Botão OK encontrado com seletor: {selector}")
-                                    button.click()
-                                    popup_found = True
-                                    break
-                        except:
-                            continue
-                        
-                        if popup_found:
-                            break
-                    
-                    if popup_found:
-                        break
-                        
-                except:
-                    pass
-                
-                time.sleep(0.5)
-            
-            if not popup_found:
-                print("⚠️ Popup não encontrado, mas continuando...")
-            
-            # Aguarda o download
-            time.sleep(3)
-            
-            # Verifica novos arquivos
-            files_after = set(os.listdir(uc_folder)) if os.path.exists(uc_folder) else set()
-            new_files = files_after - files_before
-            
-            # Procura por PDFs novos
-            for new_file in new_files:
-                if new_file.endswith('.pdf'):
-                    old_path = os.path.join(uc_folder, new_file)
+    def confirm_popup(self, selectors=None, timeout=None):
+        """Espera o OK do popup dentro da página (MutationObserver) e clica nele na mesma chamada
+
+        Retorna o seletor do botão clicado, ou None se o popup não apareceu no prazo. Se o
+        postback do Download trocar o documento durante a espera, observa o documento novo.
+        Popups que já estavam abertos antes do disparo (data-eq-stale) são ignorados.
+        """
+        timeout = self.waiter.timeouts["popup_visible"] if timeout is None else timeout
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            try:
+                result = self.driver.execute_async_script(
+                    POPUP_CONFIRM_JS, selectors or POPUP_OK_SELECTORS, int(remaining * 1000))
+            except WebDriverException as e:
+                # Documento descarregado no meio da espera (navegação do postback)
+                logger.debug(f"Espera do popup reiniciada: {e.msg}")
+                time.sleep(self.waiter.poll_frequency)
+                continue
+            if result and result.get("status") == "clicado":
+                logger.info(f"Popup confirmado ({result['seletor']})")
+                return result["seletor"]
+            return None
+
+    def invoice_pdf_check(self, uc_number, mes):
+        """Conferência do PDF recebido: recusa o arquivo de outra UC ou de outro mês"""
+        def check(data):
+            if pdf_matches_invoice(data, uc_number, mes, self.ucs_list or ()):
+                return True
+            print(f"❌ PDF recebido não é da UC {uc_number} / {mes}, descartado")
+            logger.error(f"PDF de outra UC/fatura recebido para UC {uc_number} / {mes}")
+            return False
+        return check
+
+    def collect_tracked_download(self, download_mark, uc_folder, filename, check=None):
+        """Aguarda o download (eventos CDP) iniciado após o marco e o grava como uc_folder/filename"""
+        download = self.download_tracker.wait(download_mark, self.waiter.timeouts["download_appeared"])
+        if not download:
+            return None
+        
+        source_path = self.download_tracker.file_path(download, uc_folder)
+        if not source_path:
+            print(f"⚠️ Download {download['guid']} concluído, mas o arquivo não foi localizado")
+            return None
+        if not pdf_file_passes(source_path, check):
+            os.remove(source_path)
+            return None
+        
+        new_path = os.path.join(uc_folder, filename)
+        os.replace(source_path, new_path)
+        print(f"✅ Download concluído: {filename} ({download['recebidos']} bytes)")
+        return new_path
+
+    def collect_download_by_scan(self, start_time, uc_folder, filename, check=None):
+        """Fallback sem eventos CDP: procura PDF novo na pasta da UC e depois em ~/Downloads"""
+        self.waiter.download_appeared(uc_folder, start_time)
+        
+        # Procura por arquivos PDF recentes
+        for file in os.listdir(uc_folder):
+            if file.endswith('.pdf'):
+                file_path = os.path.join(uc_folder, file)
+                # Verifica se o arquivo foi criado após iniciar o download
+                if os.path.getctime(file_path) > start_time:
+                    if not pdf_file_passes(file_path, check):
+                        os.remove(file_path)
+                        return None
+                    # Renomeia o arquivo se necessário
                     new_path = os.path.join(uc_folder, filename)
-                    
-                    if old_path != new_path:
-                        os.rename(old_path, new_path)
-                        print(f"✅ Arquivo renomeado: {new_file} → {filename}")
+                    if file != filename:
+                        os.rename(file_path, new_path)
+                        print(f"✅ Arquivo renomeado para: {filename}")
                     else:
                         print(f"✅ Download concluído: {filename}")
-                    
-                    return {
-                        'mes': fatura_info['mes'],
-                        'arquivo': filename,
-                        'caminho': new_path,
-                        'sucesso': True
-                    }
-            
-            # Se não encontrou na pasta da UC, verifica Downloads padrão
-            downloads_folder = os.path.join(os.path.expanduser("~"), "Downloads")
-            download_path = self.wait_for_download_complete(downloads_folder, timeout=15)
-            
-            if download_path:
-                # Move para a pasta correta
-                import shutil
-                new_path = os.path.join(uc_folder, filename)
-                shutil.move(download_path, new_path)
-                print(f"✅ Arquivo movido: {os.path.basename(download_path)} → {filename}")
-                
-                return {
-                    'mes': fatura_info['mes'],
-                    'arquivo': filename,
-                    'caminho': new_path,
-                    'sucesso': True
-                }
-            
-            return {
-                'mes': fatura_info['mes'],
-                'arquivo': filename,
-                'caminho': None,
-                'sucesso': False
-            }
-            
-        except Exception as e:
-            print(f"❌ Erro no download: {e}")
-            return {
-                'mes': fatura_info.get('mes', 'Desconhecido'),
-                'arquivo': None,
-                'caminho': None,
-                'sucesso': False,
-                'erro': str(e)
-            }   
+                    return new_path
+        
+        # Verifica na pasta de downloads padrão também
+        default_download = os.path.join(os.path.expanduser("~"), "Downloads")
+        if os.path.isdir(default_download):
+            for file in os.listdir(default_download):
+                if file.endswith('.pdf'):
+                    file_path = os.path.join(default_download, file)
+                    if os.path.getctime(file_path) > start_time and pdf_file_passes(file_path, check):
+                        # Move o arquivo para a pasta correta
+                        new_path = os.path.join(uc_folder, filename)
+                        shutil.move(file_path, new_path)
+                        print(f"✅ Arquivo movido e renomeado: {filename}")
+                        return new_path
+        
+        return None
 
 
 #------------------------#
@@ -2090,9 +3035,65 @@ class EquatorialDownloaderFixed:
         except Exception as e:
             logger.error(f"Erro no debug: {e}")
 
+#-------------- Intervenção manual ----------#
+    def manual_intervention(self, step, instructions, prompt, retry=None):
+        """Trata um seletor que falhou conforme a política (interativo, falhar ou repetir)
+
+        Retorna o que a etapa deve retornar: True para seguir, False para desistir do cliente.
+        """
+        if self.manual_policy == "interativo":
+            print("\n💡 SOLUÇÃO MANUAL:")
+            for number, instruction in enumerate(instructions, 1):
+                print(f"{number}. {instruction}")
+            print(f"{len(instructions) + 1}. Pressione Enter aqui para continuar")
+            input(prompt)
+            return True
+        
+        if self.manual_policy == "repetir" and retry is not None:
+            attempt = self._manual_attempts.get(step, 0)
+            if attempt < self.manual_retries:
+                delay = self.manual_backoff * (2 ** attempt)
+                print(f"🔁 {step}: nova tentativa {attempt + 1}/{self.manual_retries} em {delay:.1f}s...")
+                self._manual_attempts[step] = attempt + 1
+                time.sleep(delay)
+                try:
+                    return retry()
+                finally:
+                    if attempt == 0:
+                        self._manual_attempts.pop(step, None)
+            print(f"❌ {step}: tentativas esgotadas")
+        
+        snapshot = self.capture_failure_snapshot(step)
+        self.manual_failure = {"etapa": step, "snapshot": snapshot}
+        logger.error(f"Intervenção manual necessária em {step} - cliente abandonado (política '{self.manual_policy}')")
+        return False
+
+    def capture_failure_snapshot(self, step):
+        """Salva print, HTML e URL da página em <saída>/falhas/ e retorna o caminho base (sem extensão)"""
+        try:
+            folder = os.path.join(self.output_root, "falhas")
+            os.makedirs(folder, exist_ok=True)
+            base_path = os.path.join(folder, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.run_id}_{step}")
+            with open(f"{base_path}.html", 'w', encoding='utf-8') as f:
+                f.write(f"<!-- {self.driver.current_url} -->\n")
+                f.write(self.driver.page_source)
+            self.driver.save_screenshot(f"{base_path}.png")
+            print(f"📸 Snapshot da falha salvo em: {base_path}.png/.html")
+            return base_path
+        except Exception as e:
+            logger.error(f"Erro ao salvar snapshot da falha em {step}: {e}")
+            return None
+
+    @timed_step()
     def perform_full_login(self, uc, cpf_cnpj, data_nascimento):
         """Executa o processo completo de login em etapas - VERSÃO SIMPLIFICADA"""
         try:
+            self.login_credentials = (uc, cpf_cnpj, data_nascimento)
+            
+            # Sessão salva de uma execução anterior: vai direto para a Segunda Via
+            if self.restore_session(uc, cpf_cnpj):
+                return True
+            
             print("\n🚀 INICIANDO PROCESSO DE LOGIN COMPLETO...")
             
             # Abre página de login
@@ -2121,6 +3122,8 @@ class EquatorialDownloaderFixed:
             if not self.step4_navigate_to_invoices():
                 return False
             
+            self.save_session(uc, cpf_cnpj)
+            
             print("\n🎉 LOGIN COMPLETO REALIZADO COM SUCESSO!")
             print("📄 Você está na página de Segunda Via")
             self.logged_in = True
@@ -2130,8 +3133,185 @@ class EquatorialDownloaderFixed:
             logger.error(f"Erro no processo completo de login: {e}")
             return False
 
+    def record_span(self, span):
+        """Guarda o span na execução, no relatório do cliente e no arquivo de métricas"""
+        self.spans.append(span)
+        if self.report:
+            self.report.add_spans(self._pending_spans + [span])
+            self._pending_spans = []
+        else:
+            self._pending_spans.append(span)
+        append_run_metrics(self.metrics_path, [dict(span, execucao=self.run_id, motor=self.ENGINE_NAME)])
+
+#-------------- Navegador aquecido ----------#
+    def reset_client_state(self):
+        """Esquece os dados do cliente anterior (relatório, pastas, UCs, métricas)"""
+        self.flush_report()
+        self.report = None
+        self.current_report_data = None
+        self.client_name = None
+        self.safe_client_name = None
+        self.client_folder = None
+        self.json_file_path = None
+        self.ucs_list = []
+        self.logged_in = False
+        self.step = 1
+        self.current_uc = None
+        self.spans = []
+        self._pending_spans = []
+        self._manifests = {}
+        self._manual_attempts = {}
+        self.manual_failure = None
+        self.login_credentials = None
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    def reset_for_next_client(self):
+        """Deixa o mesmo Chrome pronto para outro cliente: limpa cookies/armazenamento e a pasta de download
+
+        Não faz logout no portal: a sessão do cliente anterior continua válida para ser
+        reaproveitada pelo arquivo em sessoes/ na próxima execução.
+        """
+        try:
+            if self.driver.current_url.startswith(self.base_url):
+                self.driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                "origin": self.base_url,
+                "storageTypes": "cookies,local_storage,indexeddb,websql,cache_storage,service_workers"
+            })
+            self.driver.get("about:blank")
+            self.set_download_behavior(self.download_base_dir)
+            if self.download_tracker:
+                self.download_tracker.pump()  # Descarta eventos do cliente anterior
+            self.reset_client_state()
+            logger.info("Navegador reiniciado para o próximo cliente (mesmo processo do Chrome)")
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao reiniciar o navegador para o próximo cliente: {e}")
+            return False
+
+    def browser_memory_mb(self):
+        """Memória do Chrome em MB: RSS de todos os processos (psutil) ou heap JS via CDP"""
+        try:
+            if psutil is not None:
+                driver_process = psutil.Process(self.driver.service.process.pid)
+                processes = [driver_process] + driver_process.children(recursive=True)
+                return sum(process.memory_info().rss for process in processes) / (1024 * 1024)
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+            metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            values = {metric["name"]: metric["value"] for metric in metrics}
+            return values.get("JSHeapTotalSize", 0) / (1024 * 1024)
+        except Exception as e:
+            logger.warning(f"Não foi possível medir a memória do navegador: {e}")
+            return None
+
+#-------------- Sessão salva ----------#
+    def session_file(self, uc, cpf_cnpj):
+        """Arquivo da sessão do cliente: hash de UC/CPF (sem dados pessoais no nome)"""
+        key = hashlib.sha256(f"{self.base_url}|{uc}|{cpf_cnpj}".encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.session_dir, f"{key}.json")
+
+    def export_session_cookies(self):
+        """Cookies da sessão autenticada (todos os domínios, via CDP)"""
+        try:
+            cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except WebDriverException:
+            cookies = [dict(cookie, expires=cookie.get("expiry", -1)) for cookie in self.driver.get_cookies()]
+        exported = []
+        for cookie in cookies:
+            item = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly") if key in cookie}
+            if cookie.get("expires", -1) > 0:  # -1 = cookie de sessão
+                item["expires"] = cookie["expires"]
+            exported.append(item)
+        return exported
+
+    def import_session_cookies(self, cookies):
+        """Restaura os cookies sem precisar abrir uma página do domínio antes (CDP Network.setCookies)
+
+        'expires' ausente (ou nulo, em arquivos antigos do motor HTTP) = cookie de sessão.
+        """
+        cookies = [{key: value for key, value in cookie.items() if not (key == "expires" and value is None)}
+                   for cookie in cookies]
+        self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+    def clear_session_cookies(self):
+        self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+
+    def open_saved_session(self):
+        """Abre a Segunda Via com os cookies restaurados; True se a sessão ainda vale"""
+        self.apply_resource_blocking("segunda_via")
+        self.driver.get(self.segunda_via_url)
+        if "SegundaVia.aspx" not in self.driver.current_url:
+            return False  # Redirecionado para o login: sessão expirada
+        return self.waiter.element_present([(By.CSS_SELECTOR, "#CONTENT_comboBoxUC")]) is not None
+
+    def save_session(self, uc, cpf_cnpj):
+        """Grava os cookies da sessão autenticada do cliente (após o Step 4)"""
+        if not self.session_dir:
+            return False
+        try:
+            os.makedirs(self.session_dir, exist_ok=True)
+            path = self.session_file(uc, cpf_cnpj)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "salvo_em": time.time(),
+                    "base_url": self.base_url,
+                    "cookies": self.export_session_cookies()
+                }, f, ensure_ascii=False)
+            os.chmod(temp_path, 0o600)  # Cookies de sessão dão acesso à conta
+            os.replace(temp_path, path)
+            logger.info(f"Sessão salva em {path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar a sessão: {e}")
+            return False
+
+    @timed_step()
+    def restore_session(self, uc, cpf_cnpj):
+        """Tenta reaproveitar a sessão salva do cliente; remove a sessão se tiver expirado
+
+        Sem sessão salva (ou salva há mais de session_max_age) retorna STEP_SKIPPED: o passo
+        fica como "ignorado" nas métricas; "falha" só quando a restauração foi tentada e não valeu.
+        """
+        if not self.session_dir:
+            return STEP_SKIPPED
+        path = self.session_file(uc, cpf_cnpj)
+        if not os.path.exists(path):
+            return STEP_SKIPPED
+        result = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if time.time() - saved.get("salvo_em", 0) > self.session_max_age:
+                print("⌛ Sessão salva muito antiga, fazendo login completo")
+                result = STEP_SKIPPED
+            else:
+                print("\n🍪 Restaurando sessão salva do cliente...")
+                self.import_session_cookies(saved["cookies"])
+                if self.open_saved_session():
+                    print("✅ Sessão restaurada - login dispensado, já na Segunda Via")
+                    self.logged_in = True
+                    return True
+                print("⌛ Sessão expirada no portal, fazendo login completo")
+                self.clear_session_cookies()
+        except Exception as e:
+            logger.warning(f"Falha ao restaurar sessão ({path}): {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return result
+
+    def flush_report(self):
+        """Grava pendências do relatório (chamado no encerramento)"""
+        if self.report:
+            self.report.flush()
+
     def close(self):
         """Fecha o navegador"""
+        self.selector_cache.save()
+        self.flush_report()
         if self.driver:
             print("\n🔒 Fechando navegador...")
             self.driver.quit()
@@ -2139,6 +3319,132 @@ class EquatorialDownloaderFixed:
 #------------------------#
 
 
+def create_downloader(engine="selenium", **kwargs):
+    """Cria o downloader do motor escolhido: 'selenium' (Chrome) ou 'http' (sem navegador)"""
+    if engine == "http":
+        # Import tardio: o módulo HTTP importa este arquivo
+        from equatorial_http import EquatorialHttpDownloader
+        return EquatorialHttpDownloader(**kwargs)
+    return EquatorialDownloaderFixed(**kwargs)
+
+
+class WarmDownloader:
+    """Mantém um downloader (e o seu Chrome) aberto entre clientes
+
+    Entre um cliente e outro o navegador é apenas limpo (reset_for_next_client). Ele é
+    fechado e aberto de novo após 'recycle_after' clientes ou quando a memória passa
+    de 'memory_limit_mb'.
+    """
+
+    def __init__(self, engine="selenium", recycle_after=20, memory_limit_mb=1500, **downloader_kwargs):
+        self.engine = engine
+        self.recycle_after = recycle_after
+        self.memory_limit_mb = memory_limit_mb
+        self.downloader_kwargs = downloader_kwargs
+        self.downloader = None
+        self.clients_served = 0
+        self.launches = 0
+
+    def _needs_recycle(self):
+        if self.recycle_after and self.clients_served >= self.recycle_after:
+            logger.info(f"Reciclando navegador após {self.clients_served} clientes")
+            return True
+        if self.memory_limit_mb and self.engine == "selenium":
+            memory = self.downloader.browser_memory_mb()
+            if memory and memory > self.memory_limit_mb:
+                logger.info(f"Reciclando navegador: {memory:.0f} MB > {self.memory_limit_mb} MB")
+                return True
+        return False
+
+    def acquire(self):
+        """Downloader pronto para o próximo cliente (None se o navegador não abrir)"""
+        if self.downloader is not None:
+            if not self._needs_recycle() and self.downloader.reset_for_next_client():
+                return self.downloader
+            self.close()
+
+        self.downloader = create_downloader(self.engine, **self.downloader_kwargs)
+        if not self.downloader.setup_driver():
+            self.downloader = None
+            return None
+        self.clients_served = 0
+        self.launches += 1
+        return self.downloader
+
+    def release(self):
+        """Fim de um cliente: grava o relatório e o cache, mas mantém o navegador aberto"""
+        if self.downloader is None:
+            return
+        self.clients_served += 1
+        self.downloader.flush_report()
+        self.downloader.selector_cache.save()
+
+    def close(self):
+        if self.downloader is not None:
+            self.downloader.close()
+            self.downloader = None
+
+
+def run_client(credentials, engine="selenium", instrument=None, warm=None, **downloader_kwargs):
+    """Executa o fluxo completo de um cliente (login, Step 5 e Step 6) e retorna um resumo
+
+    'instrument' (opcional) recebe o downloader logo após setup_driver, antes do login
+    (usado pelo benchmark para medir etapas e contar comandos). Com 'warm' (WarmDownloader)
+    o navegador aquecido é reaproveitado em vez de abrir e fechar um Chrome por cliente.
+    """
+    started = time.time()
+    result = {
+        "uc": credentials.get("uc"),
+        "status": "erro",
+        "cliente": None,
+        "pasta": None,
+        "relatorio": None,
+        "total_ucs": 0,
+        "inicio": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    }
+    
+    downloader = None if warm else create_downloader(engine, **downloader_kwargs)
+    try:
+        if warm:
+            downloader = warm.acquire()
+            setup_ok = downloader is not None
+        else:
+            setup_ok = downloader.setup_driver()
+        if setup_ok and instrument:
+            instrument(downloader)
+        
+        if not setup_ok:
+            result["status"] = "falha_driver"
+        elif not downloader.perform_full_login(credentials["uc"], credentials["cpf_cnpj"],
+                                               credentials["data_nascimento"]):
+            result["status"] = "falha_login"
+        elif not downloader.step5_extract_ucs_and_create_structure():
+            result["status"] = "falha_step5"
+        else:
+            result.update({
+                "cliente": downloader.client_name,
+                "pasta": downloader.client_folder,
+                "relatorio": downloader.json_file_path,
+                "total_ucs": len(downloader.ucs_list)
+            })
+            step6_ok = downloader.step6_process_each_uc()
+            downloader.update_final_report_after_step6()
+            result["status"] = "sucesso" if step6_ok else "falha_step6"
+    except Exception as e:
+        logger.error(f"Erro ao processar cliente UC {credentials.get('uc')}: {e}")
+        result["erro"] = str(e)
+    finally:
+        if downloader is not None and getattr(downloader, "manual_failure", None):
+            result["intervencao"] = downloader.manual_failure
+        if warm:
+            warm.release()
+        else:
+            downloader.close()
+        result["duracao_s"] = round(time.time() - started, 2)
+    
+    return result
+
+
 #-------------- Main ----------#
 
 def main():
@@ -2152,6 +3458,35 @@ def main():
     visual_mode = input("Deseja ver o processo no navegador? (s/N): ").strip().lower()
     headless = visual_mode not in ['s', 'sim', 'y', 'yes']
     
+    # Pergunta sobre o motor (navegador ou HTTP direto)
+    motor = input("Usar o motor HTTP sem navegador? (s/N): ").strip().lower()
+    engine = "http" if motor in ['s', 'sim', 'y', 'yes'] else "selenium"
+    
+    # Retomada: reaproveita relatorio.json e PDFs de uma execução interrompida
+    retomar = input("Retomar execução anterior (pula UCs já concluídas)? (s/N): ").strip().lower()
+    resume = retomar in ['s', 'sim', 'y', 'yes']
+    
+    # Varredura: só preenche o relatório (faturas em aberto, meses, valores), sem baixar PDFs
+    varredura = input("Somente varredura, sem baixar PDFs? (s/N): ").strip().lower()
+    scan_only = varredura in ['s', 'sim', 'y', 'yes']
+    
+    # UCs do mesmo cliente em paralelo (vários navegadores, cada um com o seu login)
+    navegadores = input(f"Navegadores por cliente para processar UCs em paralelo (1-{MAX_UC_WORKERS}) [1]: ").strip()
+    uc_workers = min(int(navegadores), MAX_UC_WORKERS) if navegadores.isdigit() and int(navegadores) > 0 else 1
+    
+    # Vários clientes em dados.json: oferece o modo pool (N navegadores em paralelo)
+    clients = load_clients_from_json()
+    if len(clients) > 1:
+        usar_pool = input(f"\n👥 {len(clients)} clientes em dados.json. Processar todos em paralelo? (S/n): ").strip().lower()
+        if usar_pool in ['', 's', 'sim', 'y', 'yes']:
+            workers = input("Quantos navegadores em paralelo? [2]: ").strip()
+            from equatorial_pool import process_clients_pool
+            # Sem input() nos workers: um cliente travado é abandonado com snapshot
+            process_clients_pool(clients, workers=int(workers) if workers.isdigit() else 2,
+                                 engine=engine, headless=headless, resume=resume, uc_workers=uc_workers,
+                                 scan_only=scan_only, manual_policy="falhar")
+            return
+    
     if not headless:
         print("\n🌐 O navegador será aberto para você acompanhar o processo")
         print("👀 Deixe o navegador aberto durante toda a execução")
@@ -2182,7 +3517,8 @@ def main():
         data_nascimento = input("Data de nascimento (DD/MM/AAAA): ").strip()
     
     # Inicializa downloader
-    downloader = EquatorialDownloaderFixed(headless=headless)
+    downloader = create_downloader(engine, headless=headless, resume=resume, uc_workers=uc_workers,
+                                   scan_only=scan_only)
     
     try:
         # Configura driver
@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+"""Motor HTTP (sem navegador) do fluxo de Segunda Via da Equatorial Goiás.
+
+Reproduz o login em duas etapas do LoginGO.aspx, a seleção de UC / cbTipoEmissao /
+cbMotivo / btEnviar do SegundaVia.aspx e o download das faturas com requests + lxml,
+carregando __VIEWSTATE/__EVENTVALIDATION entre as requisições. Gera a mesma pasta do
+cliente e o mesmo relatorio.json do EquatorialDownloaderFixed.
+"""
+
+import os
+import re
+import logging
+from datetime import datetime
+from urllib.parse import urljoin
+
+import requests
+from lxml import html as lxml_html
+
+from equatorial_faturas_teste_Claude import (
+    EquatorialDownloaderFixed,
+    build_invoice_filename,
+    extract_postback_target,
+    make_safe_folder_name,
+    parse_invoice_table,
+    parse_segunda_via_page,
+    summarize_invoices,
+    timed_step,
+    unnamed_client_id,
+    write_pdf_atomically
+)
+
+
+logger = logging.getLogger(__name__)
+
+# URL da fatura aberta depois do OK do popup
+FATURA_URL_RE = re.compile(r"['\"]([^'\"]*mostrarFaturaCompleta[^'\"]*)['\"]", re.IGNORECASE)
+
+
+def is_pdf_response(response):
+    """Indica se a resposta HTTP é um PDF (pelo Content-Type ou Content-Disposition)"""
+    content_type = response.headers.get("Content-Type", "").lower()
+    disposition = response.headers.get("Content-Disposition", "").lower()
+    return "pdf" in content_type or ".pdf" in disposition
+
+
+class EquatorialHttpDownloader(EquatorialDownloaderFixed):
+    """Mesmo fluxo do EquatorialDownloaderFixed, feito com requisições HTTP diretas"""
+
+    ENGINE_NAME = "http"
+
+    USER_AGENT = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    )
+
+    def __init__(self, timeout=30, **kwargs):
+        super().__init__(**kwargs)
+        self.init_kwargs["timeout"] = timeout
+        self.timeout = timeout
+        self.session = None
+        self.current_url = None
+        self.page_html = ""
+        self.page_tree = None
+        self.pending_fields = {}  # Valores a enviar no próximo postback
+
+    def setup_driver(self):
+        """Cria a sessão HTTP (equivalente a abrir o navegador)"""
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": self.USER_AGENT,
+            "Accept-Language": "pt-BR,pt;q=0.9"
+        })
+        logger.info("Sessão HTTP inicializada (motor sem navegador)")
+        return True
+
+    def close(self):
+        """Fecha a sessão HTTP"""
+        self.flush_report()
+        if self.session:
+            print("\n🔒 Fechando sessão HTTP...")
+            self.session.close()
+            self.session = None
+
+#-------------- Sessão salva ----------#
+    def export_session_cookies(self):
+        """Cookies no mesmo formato do motor Selenium: cookie de sessão vai sem 'expires'"""
+        exported = []
+        for cookie in self.session.cookies:
+            item = {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path,
+                    "secure": cookie.secure, "httpOnly": cookie.has_nonstandard_attr("HttpOnly")}
+            if cookie.expires is not None:
+                item["expires"] = cookie.expires
+            exported.append(item)
+        return exported
+
+    def import_session_cookies(self, cookies):
+        for cookie in cookies:
+            expires = cookie.get("expires")
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                                     path=cookie.get("path", "/"), secure=cookie.get("secure", False),
+                                     expires=int(expires) if expires is not None and expires > 0 else None)
+
+    def clear_session_cookies(self):
+        self.session.cookies.clear()
+
+    def reset_for_next_client(self):
+        """Mesma sessão HTTP (conexões abertas) para outro cliente: só limpa cookies e página atual"""
+        self.session.cookies.clear()
+        self.current_url, self.page_html, self.page_tree = None, "", None
+        self.pending_fields = {}
+        self.reset_client_state()
+        return True
+
+    def open_saved_session(self):
+        """Abre a Segunda Via com os cookies restaurados; True se a sessão ainda vale"""
+        self._get(self.segunda_via_url)
+        return "SegundaVia.aspx" in self.current_url and self._find_field(["comboBoxUC"], tags=("select",)) is not None
+
+#-------------- Requisições ----------#
+    def _load_page(self, response):
+        """Guarda a resposta HTML como página atual"""
+        self.current_url = response.url
+        self.page_html = response.text
+        self.page_tree = lxml_html.fromstring(response.content or b"<html></html>")
+
+    def _get(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        self._load_page(response)
+        return response
+
+    def _main_form(self):
+        """Formulário ASP.NET da página atual (o de método POST, se houver)"""
+        forms = self.page_tree.xpath("//form[translate(@method, 'POST', 'post')='post']")
+        forms = forms or self.page_tree.xpath("//form")
+        return forms[0] if forms else None
+
+    def _collect_form_fields(self, form):
+        """Campos que o navegador enviaria no submit (hidden, texto, selects e marcados)"""
+        fields = {}
+        for element in form.xpath(".//input | .//select | .//textarea"):
+            name = element.get("name")
+            if not name or element.get("disabled") is not None:
+                continue
+            tag = element.tag.lower()
+            if tag == "input":
+                input_type = (element.get("type") or "text").lower()
+                if input_type in ("submit", "button", "image", "reset", "file"):
+                    continue
+                if input_type in ("checkbox", "radio"):
+                    if element.get("checked") is None:
+                        continue
+                    fields[name] = element.get("value", "on")
+                else:
+                    fields[name] = element.get("value", "")
+            elif tag == "select":
+                options = element.xpath(".//option[@selected]") or element.xpath(".//option")
+                if options:
+                    fields[name] = options[0].get("value", options[0].text_content().strip())
+            else:
+                fields[name] = element.text_content()
+        return fields
+
+    def _postback(self, event_target="", event_argument="", submit=None, stream=False):
+        """Envia o formulário atual como postback ASP.NET (VIEWSTATE/EVENTVALIDATION incluídos)"""
+        form = self._main_form()
+        if form is None:
+            raise RuntimeError(f"Nenhum formulário na página atual: {self.current_url}")
+
+        fields = self._collect_form_fields(form)
+        fields.update(self.pending_fields)
+        fields["__EVENTTARGET"] = event_target
+        fields["__EVENTARGUMENT"] = event_argument
+        if submit:
+            fields[submit[0]] = submit[1]
+        self.pending_fields = {}
+
+        action_url = urljoin(self.current_url, form.get("action") or self.current_url)
+        response = self.session.post(
+            action_url,
+            data=fields,
+            timeout=self.timeout,
+            stream=stream,
+            headers={"Referer": self.current_url}
+        )
+        response.raise_for_status()
+        if not (stream and is_pdf_response(response)):
+            self._load_page(response)
+        return response
+
+    def _find_field(self, patterns, tags=("input",), visible_only=True):
+        """Primeiro campo cujo name/id contém algum dos padrões (sem diferenciar maiúsculas)"""
+        tag_query = " | ".join(f"//{tag}" for tag in tags)
+        candidates = self.page_tree.xpath(tag_query)
+        for pattern in patterns:
+            pattern = pattern.lower()
+            for element in candidates:
+                if visible_only and (element.get("type") or "").lower() == "hidden":
+                    continue
+                name = (element.get("name") or "").lower()
+                id_attr = (element.get("id") or "").lower()
+                if pattern in name or pattern in id_attr:
+                    return element
+        return None
+
+    def _find_button(self, name_patterns, value_patterns):
+        """Botão de submit pelo name/id ou pelo texto exibido"""
+        buttons = self.page_tree.xpath(
+            "//input[@type='submit' or @type='button' or @type='image'] | //button"
+        )
+        for pattern in name_patterns:
+            for button in buttons:
+                if (pattern.lower() in (button.get("name") or "").lower()
+                        or pattern.lower() in (button.get("id") or "").lower()):
+                    return button
+        for pattern in value_patterns:
+            for button in buttons:
+                label = button.get("value") or button.text_content() or ""
+                if pattern.lower() in label.lower():
+                    return button
+        return None
+
+    def _submit_button(self, button, stream=False):
+        """Aciona um botão: postback via onclick ou envio do name=value do botão"""
+        target = extract_postback_target(button.get("onclick") or button.get("href"))
+        name = button.get("name")
+        if name and button.tag.lower() == "input" and (button.get("type") or "").lower() == "submit":
+            return self._postback(submit=(name, button.get("value", "")), stream=stream)
+        if target:
+            return self._postback(event_target=target[0], event_argument=target[1], stream=stream)
+        if name:
+            return self._postback(submit=(name, button.get("value", "")), stream=stream)
+        return self._postback(stream=stream)
+
+    def _has_field(self, patterns):
+        return self._find_field(patterns) is not None
+
+#-------------- Login ----------#
+    @timed_step()
+    def open_login_page(self):
+        """Abre a página de login"""
+        try:
+            logger.info("Abrindo página de login (HTTP)...")
+            self._get(self.login_url)
+            if self._main_form() is None:
+                logger.error("Página de login sem formulário")
+                return False
+            print(f"\n🌐 Página aberta: {self.current_url}")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao abrir página de login: {e}")
+            return False
+
+    @timed_step()
+    def step1_fill_uc_cpf(self, uc, cpf_cnpj):
+        """Etapa 1: Preenche UC e CPF/CNPJ"""
+        print("\n📝 ETAPA 1: Preenchendo UC e CPF/CNPJ...")
+        uc_field = self._find_field(["txtUC", "UC", "unidade"])
+        cpf_field = self._find_field(["txtCPF", "CPF", "cnpj", "documento"])
+        if uc_field is None or cpf_field is None:
+            print("❌ Campos UC/CPF não encontrados na página de login")
+            self.debug_page_elements()
+            return False
+
+        self.pending_fields[uc_field.get("name")] = uc
+        self.pending_fields[cpf_field.get("name")] = cpf_cnpj
+        logger.info(f"UC preenchida: {uc}")
+        logger.info(f"CPF/CNPJ preenchido: {cpf_cnpj}")
+        print("✅ UC e CPF/CNPJ preenchidos com sucesso!")
+        return True
+
+    @timed_step()
+    def step1_submit(self):
+        """Etapa 1: Envia UC/CPF (equivalente ao botão Entrar)"""
+        try:
+            print("\n🚀 ETAPA 1: Enviando formulário 'Entrar'...")
+
+            # O botão Entrar chama ValidarCamposAreaLogada(); o postback fica no corpo da função
+            target = None
+            function_start = self.page_html.find("function ValidarCamposAreaLogada")
+            if function_start >= 0:
+                target = extract_postback_target(self.page_html[function_start:function_start + 2000])
+
+            if target:
+                self._postback(event_target=target[0], event_argument=target[1])
+            else:
+                button = self._find_button(["btnEntrar", "Entrar"], ["Entrar"])
+                if button is not None:
+                    self._submit_button(button)
+                else:
+                    self._postback()
+
+            if self._has_field(["txtData", "DataNascimento"]):
+                print("✅ Etapa 1 aceita - campo de data de nascimento disponível")
+                return True
+
+            print("❌ A resposta não trouxe o campo de data de nascimento")
+            self.debug_page_elements()
+            return False
+
+        except Exception as e:
+            logger.error(f"Erro ao enviar etapa 1: {e}")
+            return False
+
+    @timed_step()
+    def step2_fill_birth_date(self, data_nascimento):
+        """Etapa 2: Preenche data de nascimento"""
+        print(f"\n📝 ETAPA 2: Preenchendo data de nascimento ({data_nascimento})...")
+        data_field = self._find_field(["txtData", "DataNascimento"])
+        if data_field is None:
+            print("❌ Campo de data de nascimento não encontrado")
+            self.debug_page_elements()
+            return False
+
+        self.pending_fields[data_field.get("name")] = data_nascimento
+        logger.info(f"Data de nascimento preenchida: {data_nascimento}")
+        return True
+
+    @timed_step()
+    def step2_submit(self):
+        """Etapa 2: Envia o botão Validar"""
+        try:
+            print("\n🚀 ETAPA 2: Enviando 'Validar'...")
+            button = self._find_button(["btnValidar"], ["Validar", "Confirmar"])
+            if button is None:
+                print("❌ Botão 'Validar' não encontrado")
+                self.debug_page_elements()
+                return False
+
+            self._submit_button(button)
+            print("✅ Validação enviada")
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao enviar 'Validar': {e}")
+            return False
+
+    @timed_step()
+    def step4_navigate_to_invoices(self):
+        """Etapa 4: Abre a Segunda Via com a sessão autenticada"""
+        try:
+            print("\n🧭 ETAPA 4: Acessando Segunda Via...")
+            self._get(self.segunda_via_url)
+            print(f"📍 URL atual: {self.current_url}")
+
+            if "SegundaVia.aspx" in self.current_url and self._find_field(["comboBoxUC"], tags=("select",)) is not None:
+                print("✅ Página de Segunda Via carregada - dropdown de UCs encontrado")
+                self.logged_in = True
+                return True
+
+            print("❌ Não foi possível acessar a Segunda Via (sessão não autenticada?)")
+            self.debug_page_elements()
+            return False
+
+        except Exception as e:
+            logger.error(f"Erro ao navegar para Segunda Via: {e}")
+            return False
+
+#-------------- Passo 5 ----------#
+    @timed_step()
+    def step5_extract_ucs_and_create_structure(self):
+        """Etapa 5: Extrai nome do cliente e UCs e cria a estrutura de relatório"""
+        try:
+            print("\n📁 ETAPA 5: Extraindo UCs e criando estrutura de relatório...")
+
+            page = parse_segunda_via_page(self.page_tree)
+            full_client_name = page["nome_completo"]
+            client_name = page["nome_pasta"]
+            if not client_name:
+                client_name = full_client_name = unnamed_client_id(page["cpf_mascarado"])
+                print(f"⚠️ Nome do cliente não encontrado, usando identificador: '{full_client_name}'")
+            safe_client_name = make_safe_folder_name(client_name)
+
+            ucs_list = page["ucs"]
+            if ucs_list is None:
+                print("❌ Dropdown de UCs não encontrado!")
+                self.debug_page_elements()
+                return False
+
+            if not ucs_list:
+                print("❌ Nenhuma UC encontrada no dropdown!")
+                return False
+
+            print(f"✅ {len(ucs_list)} UCs encontradas")
+            return self.create_client_structure(full_client_name, safe_client_name, ucs_list)
+
+        except Exception as e:
+            logger.error(f"Erro na etapa 5: {e}")
+            print(f"❌ Erro inesperado na etapa 5: {e}")
+            return False
+
+#-------------- Passo 6 ----------#
+    @timed_step(per_uc=True)
+    def process_single_uc(self, uc_number, uc_index):
+        """Processa uma UC individual: formulário de emissão + faturas"""
+        try:
+            print(f"\n🎯 Processando UC: {uc_number}")
+
+            if not self.select_uc_in_dropdown(uc_number):
+                return False
+            if not self.set_emission_type("completa"):
+                return False
+            if not self.set_emission_reason("ESV05"):  # ESV05 = Outros
+                return False
+            if not self.click_emit_button():
+                return False
+
+            if not self.verify_invoices_page():
+                print(f"❌ Não foi possível acessar faturas da UC {uc_number}")
+                return False
+
+            if not self.step7_extract_and_download_invoices(uc_number):
+                print(f"⚠️ Problemas no download de faturas da UC {uc_number}")
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro ao processar UC {uc_number}: {e}")
+            logger.error(f"Erro ao processar UC {uc_number}: {e}")
+            return False
+
+    @timed_step()
+    def navigate_back_to_second_copy(self):
+        """Recarrega a Segunda Via para a próxima UC"""
+        try:
+            self._get(self.segunda_via_url)
+            return "SegundaVia.aspx" in self.current_url
+        except Exception as e:
+            logger.error(f"Erro ao navegar de volta para Segunda Via: {e}")
+            return False
+
+    def _set_select(self, patterns, value, label):
+        """Seleciona um valor; dispara o postback se o select tiver AutoPostBack"""
+        dropdown = self._find_field(patterns, tags=("select",))
+        if dropdown is None:
+            print(f"❌ Dropdown de {label} não encontrado!")
+            return False
+
+        values = [(option.get("value") or "").strip() for option in dropdown.xpath(".//option")]
+        if value not in values:
+            print(f"❌ Valor '{value}' não existe no dropdown de {label}")
+            return False
+
+        name = dropdown.get("name")
+        self.pending_fields[name] = value
+        onchange = dropdown.get("onchange") or ""
+        if "__doPostBack" in onchange:
+            target = extract_postback_target(onchange)
+            self._postback(event_target=target[0] if target else name,
+                           event_argument=target[1] if target else "")
+        print(f"✅ {label}: '{value}' selecionado")
+        return True
+
+    @timed_step(per_uc=True)
+    def select_uc_in_dropdown(self, uc_number):
+        """Seleciona uma UC específica no dropdown"""
+        return self._set_select(["comboBoxUC"], uc_number, "UCs")
+
+    @timed_step()
+    def set_emission_type(self, emission_type="completa"):
+        """Configura o tipo de emissão para 'Emitir fatura completa'"""
+        return self._set_select(["cbTipoEmissao"], emission_type, "tipo de emissão")
+
+    @timed_step()
+    def set_emission_reason(self, reason_code="ESV05"):
+        """Configura o motivo da emissão para 'Outros' (ESV05)"""
+        return self._set_select(["cbMotivo"], reason_code, "motivo")
+
+    @timed_step()
+    def click_emit_button(self):
+        """Envia o botão 'Emitir'"""
+        try:
+            button = self._find_button(["btEnviar"], ["Emitir"])
+            if button is None:
+                print("❌ Botão 'Emitir' não encontrado!")
+                return False
+            self._submit_button(button)
+            print("✅ Botão 'Emitir' enviado")
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao enviar 'Emitir': {e}")
+            return False
+
+    @timed_step()
+    def verify_invoices_page(self):
+        """Verifica se a resposta é a página de faturas"""
+        page_source = self.page_html.lower()
+        indicators = ["faturas em aberto", "segunda via", "débitos pendentes", "conta em aberto",
+                      "valor devido", "fatura", "debito", "pendente"]
+        found = [indicator for indicator in indicators if indicator in page_source]
+        if found:
+            print(f"✅ Página de faturas identificada! Indicadores encontrados: {found}")
+            return True
+        print("⚠️ Não foi possível confirmar se está na página de faturas")
+        self.debug_page_elements()
+        return False
+
+#--------- Passo 7 ------#
+    def _parse_invoice_rows(self):
+        """Linhas da tabela com link 'Download': mês de referência e alvo do postback"""
+        faturas_info = parse_invoice_table(self.page_tree)
+        for fatura in faturas_info:
+            fatura['url'] = None if fatura['alvo_postback'] else urljoin(self.current_url, fatura['href'] or "")
+        return faturas_info
+
+    def _save_pdf(self, response, filepath, check=None):
+        """Grava a resposta PDF em disco em blocos"""
+        try:
+            return write_pdf_atomically(filepath, response.iter_content(chunk_size=64 * 1024), check)
+        finally:
+            response.close()
+
+    def _download_invoice(self, fatura, filepath, check=None):
+        """Link Download -> popup (btnModal) -> mostrarFaturaCompleta -> PDF"""
+        if fatura['alvo_postback']:
+            response = self._postback(event_target=fatura['alvo_postback'][0],
+                                      event_argument=fatura['alvo_postback'][1], stream=True)
+        else:
+            response = self.session.get(fatura['url'], timeout=self.timeout, stream=True)
+        if is_pdf_response(response):
+            return self._save_pdf(response, filepath, check)
+
+        # Popup de aviso: confirma no botão OK (CONTENT_btnModal)
+        modal_button = self._find_button(["btnModal"], ["OK"])
+        if modal_button is not None:
+            response = self._submit_button(modal_button, stream=True)
+            if is_pdf_response(response):
+                return self._save_pdf(response, filepath, check)
+
+        # A fatura pode ser aberta por script (window.open/location) após o OK
+        match = FATURA_URL_RE.search(self.page_html)
+        if match:
+            response = self.session.get(urljoin(self.current_url, match.group(1)),
+                                        timeout=self.timeout, stream=True)
+            if is_pdf_response(response):
+                return self._save_pdf(response, filepath, check)
+
+        return False
+
+    @timed_step(per_uc=True)
+    def download_invoice(self, uc_number, fatura, uc_folder):
+        """Baixa uma fatura a partir do estado da tabela; retorna o registro da fatura ou None"""
+        filename = build_invoice_filename(uc_number, fatura['mes'])
+        filepath = os.path.join(uc_folder, filename)
+        existing = self.existing_invoice(uc_number, fatura['mes'], filename, filepath)
+        if existing:
+            return existing
+        if not self._download_invoice(fatura, filepath, self.invoice_pdf_check(uc_number, fatura['mes'])):
+            return None
+        print(f"✅ Download concluído: {filename}")
+        return self.register_invoice(fatura['mes'], filename, filepath)
+
+    @timed_step(per_uc=True)
+    def step7_extract_and_download_invoices(self, uc_number):
+        """Etapa 7: Extrai as faturas da tabela e baixa cada PDF"""
+        try:
+            print(f"\n📄 ETAPA 7: Processando faturas da UC {uc_number}...")
+
+            faturas_info = self._parse_invoice_rows()
+            if not faturas_info:
+                print("⚠️ Nenhuma fatura encontrada para esta UC")
+                self.update_report_json(uc_number, {
+                    "faturas_em_aberto": 0,
+                    "meses_referencia": [],
+                    "valor_total_devido": "0,00",
+                    "faturas_baixadas": []
+                })
+                return True
+
+            self.update_report_json(uc_number, summarize_invoices(faturas_info))
+
+            # Modo varredura: só os metadados, nenhum download
+            if self.scan_only:
+                print(f"🔎 Modo varredura: {len(faturas_info)} faturas registradas, downloads ignorados")
+                return True
+
+            uc_folder = os.path.join(self.client_folder, f"UC_{uc_number}")
+            os.makedirs(uc_folder, exist_ok=True)
+
+            # Cada postback de download parte do estado (VIEWSTATE) da tabela de faturas
+            table_state = (self.current_url, self.page_html, self.page_tree)
+
+            faturas_baixadas = []
+            for idx, fatura in enumerate(faturas_info):
+                self.current_url, self.page_html, self.page_tree = table_state
+                print(f"\n💾 Baixando fatura {idx + 1}/{len(faturas_info)}: {fatura['mes']}")
+                try:
+                    downloaded = self.download_invoice(uc_number, fatura, uc_folder)
+                    if downloaded:
+                        faturas_baixadas.append(downloaded)
+                    else:
+                        print(f"⚠️ Download da fatura {fatura['mes']} não retornou um PDF")
+                except Exception as e:
+                    print(f"❌ Erro ao baixar fatura {fatura['mes']}: {e}")
+
+            self.current_url, self.page_html, self.page_tree = table_state
+            self.manifest_for(uc_folder).save()
+            self.update_report_json(uc_number, {
+                "faturas_baixadas": faturas_baixadas,
+                "download_concluido": len(faturas_baixadas) > 0,
+                "data_download": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+            })
+
+            print(f"\n✅ ETAPA 7 CONCLUÍDA para UC {uc_number}!")
+            print(f"   🔢 Faturas encontradas: {len(faturas_info)}")
+            print(f"   💾 Faturas baixadas: {len(faturas_baixadas)}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro no Step 7 para UC {uc_number}: {e}")
+            self.update_report_json(uc_number, {
+                "erro_download": str(e),
+                "download_concluido": False
+            })
+            return False
+
+#------------------------#
+    def debug_page_elements(self):
+        """Salva o HTML da última resposta para análise"""
+        try:
+            print(f"\n🔧 DEBUG: {self.current_url}")
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f'debug_page_{timestamp}.html'
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(self.page_html)
+            print(f"💾 HTML salvo em: {filename}")
+        except Exception as e:
+            logger.error(f"Erro no debug: {e}")
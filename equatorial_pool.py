@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Modo pool: processa vários clientes em paralelo com N navegadores.
+
+Cada worker é uma thread com o seu próprio EquatorialDownloaderFixed (Chrome isolado e
+pasta de download própria), mantido aberto entre os clientes do worker (WarmDownloader).
+O coordenador distribui os clientes conforme os workers ficam livres, coleta os
+resultados e grava o resumo do lote.
+"""
+
+import os
+import json
+import threading
+import time
+import logging
+from datetime import datetime
+
+from equatorial_faturas_teste_Claude import WarmDownloader, run_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class ClientPool:
+    """Coordenador do lote: fila de clientes compartilhada entre N workers"""
+
+    def __init__(self, clients, workers=2, engine="selenium", headless=True,
+                 output_root="clientes_faturas", recycle_after=20, memory_limit_mb=1500, **downloader_kwargs):
+        self.clients = iter(clients)
+        self.workers = max(1, int(workers))
+        self.engine = engine
+        self.headless = headless
+        self.output_root = output_root
+        self.recycle_after = recycle_after      # Clientes por navegador antes de reciclar
+        self.memory_limit_mb = memory_limit_mb  # Memória do navegador que força a reciclagem
+        self.downloader_kwargs = downloader_kwargs
+        self.results = []
+        self._lock = threading.Lock()
+
+    def _next_client(self):
+        """Próximo cliente da fila (None quando acabar)"""
+        with self._lock:
+            return next(self.clients, None)
+
+    def _worker(self, worker_id):
+        # Pasta de download padrão exclusiva do worker: downloads de Chromes diferentes não se misturam
+        download_dir = os.path.join(self.output_root, ".downloads", f"worker_{worker_id}")
+        os.makedirs(download_dir, exist_ok=True)
+
+        # Navegador aquecido: um Chrome por worker, reaproveitado entre os clientes
+        warm = WarmDownloader(
+            engine=self.engine,
+            recycle_after=self.recycle_after,
+            memory_limit_mb=self.memory_limit_mb,
+            headless=self.headless,
+            output_root=self.output_root,
+            download_dir=download_dir,
+            **self.downloader_kwargs
+        )
+        try:
+            while True:
+                client = self._next_client()
+                if client is None:
+                    break
+                logger.info(f"[worker {worker_id}] Iniciando cliente UC {client.get('uc')}")
+                result = run_client(client, engine=self.engine, warm=warm)
+                result["worker"] = worker_id
+                result["navegadores_abertos"] = warm.launches
+                logger.info(f"[worker {worker_id}] Cliente UC {client.get('uc')}: {result['status']} "
+                            f"({result['duracao_s']}s)")
+                with self._lock:
+                    self.results.append(result)
+        finally:
+            warm.close()
+
+    def run(self):
+        """Executa o lote e retorna a lista de resultados por cliente"""
+        threads = [
+            threading.Thread(target=self._worker, args=(worker_id,), name=f"pool-worker-{worker_id}")
+            for worker_id in range(1, self.workers + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.results
+
+
+def write_pool_summary(results, output_root, started, workers, extra=None):
+    """Grava resumo_lote.json na pasta raiz e retorna o resumo ('extra': campos adicionais do lote)"""
+    summary = {
+        "data_execucao": datetime.fromtimestamp(started).strftime("%d/%m/%Y %H:%M:%S"),
+        "duracao_s": round(time.time() - started, 2),
+        "workers": workers,
+        "total_clientes": len(results),
+        "sucesso": sum(1 for result in results if result["status"] == "sucesso"),
+        "falhas": sum(1 for result in results if result["status"] != "sucesso"),
+        "clientes": results
+    }
+    summary.update(extra or {})
+    os.makedirs(output_root, exist_ok=True)
+    summary_path = os.path.join(output_root, "resumo_lote.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+    print(f"📄 Resumo do lote salvo em: {summary_path}")
+    return summary
+
+
+def process_clients_pool(clients, workers=2, engine="selenium", headless=True,
+                         output_root="clientes_faturas", recycle_after=20, memory_limit_mb=1500,
+                         summary_extra=None, **downloader_kwargs):
+    """Processa a lista de clientes em paralelo e retorna o resumo do lote"""
+    started = time.time()
+    print(f"\n🚀 Iniciando lote com {workers} worker(s) - motor: {engine}")
+
+    pool = ClientPool(clients, workers=workers, engine=engine, headless=headless,
+                      output_root=output_root, recycle_after=recycle_after,
+                      memory_limit_mb=memory_limit_mb, **downloader_kwargs)
+    results = pool.run()
+    summary = write_pool_summary(results, output_root, started, pool.workers, summary_extra)
+
+    print(f"\n📊 LOTE CONCLUÍDO em {summary['duracao_s']}s")
+    print(f"   ✅ Sucesso: {summary['sucesso']}")
+    print(f"   ❌ Falhas: {summary['falhas']}")
+    return summary
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""Portal Equatorial simulado para testes e benchmarks offline.
+
+Reproduz, de forma simplificada, as páginas ASP.NET usadas pelo bot:
+LoginGO.aspx (UC/CPF e depois txtData/btnValidar), SegundaVia.aspx (CONTENT_comboBoxUC,
+cbTipoEmissao, cbMotivo, btEnviar), a tabela de faturas com links 'Download', o popup
+CONTENT_btnModal e a resposta PDF de mostrarFaturaCompleta. Latência, número de UCs e de
+faturas por cliente são configuráveis.
+
+Como no portal real, a UC e a fatura escolhidas ficam no estado da sessão ASP.NET e as
+requisições de uma mesma sessão são atendidas uma de cada vez.
+
+Uso: python mock_portal.py --porta 8765 --ucs 5 --faturas 3 --latencia 0.2
+"""
+
+import argparse
+import html
+import secrets
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+LOGIN_PATH = "/LoginGO.aspx"
+SEGUNDA_VIA_PATH = "/AgenciaGO/Servi%C3%A7os/aberto/SegundaVia.aspx"
+HOME_PATH = "/AgenciaGO/Servi%C3%A7os/aberto/Home.aspx"
+FATURA_PATH = "/AgenciaGO/Servi%C3%A7os/aberto/mostrarFaturaCompleta.aspx"
+
+HEADER_PREFIX = "ctl00$WEBDOOR$headercorporativogo$"
+MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho",
+         "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+POSTBACK_SCRIPT = """
+<script type="text/javascript">
+var theForm = document.forms['aspnetForm'];
+function __doPostBack(eventTarget, eventArgument) {
+    if (!theForm.onsubmit || (theForm.onsubmit() != false)) {
+        theForm.__EVENTTARGET.value = eventTarget;
+        theForm.__EVENTARGUMENT.value = eventArgument;
+        theForm.submit();
+    }
+}
+function WebForm_PostBackOptions(eventTarget, eventArgument, validation, validationGroup, actionUrl, trackFocus, clientSubmit) {
+    this.eventTarget = eventTarget; this.eventArgument = eventArgument; this.clientSubmit = clientSubmit;
+}
+function WebForm_DoPostBackWithOptions(options) {
+    if (options.clientSubmit) { __doPostBack(options.eventTarget, options.eventArgument); }
+}
+</script>
+"""
+
+
+def build_pdf(text):
+    """PDF mínimo e válido com uma linha de texto"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_start = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_start}\n%%EOF\n".encode()
+    return output
+
+
+class MockPortal:
+    """Estado do portal simulado: clientes, sessões e servidor HTTP"""
+
+    def __init__(self, clients=1, ucs_per_client=3, invoices_per_uc=2, latency=0.0,
+                 host="127.0.0.1", port=0):
+        self.latency = latency
+        self.invoices_per_uc = invoices_per_uc
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self.downloads = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.server = None
+        self.thread = None
+
+        self.clients = []
+        for k in range(clients):
+            uc_base = 10000000 + k * 1000
+            self.clients.append({
+                "uc": str(uc_base),
+                "cpf_cnpj": str(12345678900 + k),
+                "data_nascimento": "01/01/1980",
+                "nome": f"MARIA DA SILVA CLIENTE {chr(65 + k % 26)}{'' if k < 26 else k}",
+                "ucs": [str(uc_base + i) for i in range(ucs_per_client)]
+            })
+
+    def credentials(self):
+        """Credenciais (uc, cpf_cnpj, data_nascimento) de todos os clientes simulados"""
+        return [{key: client[key] for key in ("uc", "cpf_cnpj", "data_nascimento")}
+                for client in self.clients]
+
+    def invoices_for(self, uc):
+        """Faturas em aberto de uma UC: mês de referência, vencimento e valor"""
+        today = date.today()
+        invoices = []
+        for i in range(self.invoices_per_uc):
+            month_index = (today.month - 2 - i) % 12
+            year = today.year + (today.month - 2 - i) // 12
+            due_month = month_index + 2 if month_index < 11 else 1
+            due_year = year if month_index < 11 else year + 1
+            invoices.append({
+                "mes": f"{MESES[month_index]}/{year}",
+                "vencimento": f"10/{due_month:02d}/{due_year}",
+                # A cada 3ª fatura um valor acima de mil, sem separador de milhar (como no portal)
+                "valor": f"R$ {100 + int(uc[-3:]) + i * 7 + (1000 if i % 3 == 2 else 0)},{(i * 13) % 100:02d}"
+            })
+        return invoices
+
+#-------------- Servidor ----------#
+    def start(self):
+        """Sobe o servidor em uma thread e retorna a URL base"""
+        portal = self
+
+        class Handler(MockPortalHandler):
+            pass
+        Handler.portal = portal
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def render_segunda_via(self, client_index=0):
+        """HTML da Segunda Via de um cliente autenticado, sem subir o servidor (fixtures/microbenchmarks)"""
+        handler = MockPortalHandler.__new__(MockPortalHandler)
+        handler.portal = self
+        handler.path = SEGUNDA_VIA_PATH
+        handler._state = {
+            "stage": "autenticado", "client": self.clients[client_index], "uc": None, "fatura": 0, "tipo": "",
+            "motivo": "", "tokens": set(), "lock": threading.Lock()
+        }
+        return handler._render_page("Segunda Via", handler._segunda_via_form())
+
+    def new_session(self):
+        session_id = secrets.token_hex(12)
+        with self.lock:
+            self.sessions[session_id] = {
+                "stage": "anonimo", "client": None, "uc": None, "fatura": 0, "tipo": "", "motivo": "",
+                "tokens": set(), "lock": threading.Lock()
+            }
+        return session_id
+
+    def issue_token(self, session):
+        token = secrets.token_urlsafe(24)
+        session["tokens"].add(token)
+        return token
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    """Handler HTTP das páginas do portal simulado"""
+
+    portal = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---------- infraestrutura ----------
+    def _session(self):
+        cookies = self.headers.get("Cookie", "")
+        for part in cookies.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "ASP.NET_SessionId" and value in self.portal.sessions:
+                return value, self.portal.sessions[value], False
+        session_id = self.portal.new_session()
+        return session_id, self.portal.sessions[session_id], True
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        if self._new_session:
+            self.send_header("Set-Cookie", f"ASP.NET_SessionId={self._session_id}; path=/; HttpOnly")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, location):
+        self._send(302, headers={"Location": location})
+
+    def _page(self, title, content, extra_head=""):
+        self._send(200, self._render_page(title, content, extra_head).encode("utf-8"))
+
+    def _render_page(self, title, content, extra_head=""):
+        token = self.portal.issue_token(self._state)
+        action = self.path.split("?")[0]
+        body = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<link rel="stylesheet" href="/static/site.css">{extra_head}</head>
+<body>
+<img src="/static/banner.png" alt="banner">
+<form name="aspnetForm" method="post" action=".{action[action.rfind('/'):]}" id="aspnetForm">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="">
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{token}">
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="CA0B0334">
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{token[::-1]}">
+{POSTBACK_SCRIPT}
+{content}
+</form>
+</body></html>"""
+        return body
+
+    def _read_form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+        return {key: values[-1] for key, values in data.items()}
+
+    def _dispatch(self, method):
+        if self.portal.latency:
+            time.sleep(self.portal.latency)
+        with self.portal.lock:
+            self.portal.request_count += 1
+        self._session_id, self._state, self._new_session = self._session()
+        path = urlsplit(self.path).path
+        # Estado de sessão ASP.NET: requisições da mesma sessão são serializadas
+        with self._state["lock"]:
+            self._handle(method, path)
+
+    def _handle(self, method, path):
+        try:
+            if path.startswith("/static/"):
+                return self._static(path)
+            if path == LOGIN_PATH:
+                return self._login_get() if method == "GET" else self._login_post()
+            if path == HOME_PATH:
+                return self._home()
+            if path == SEGUNDA_VIA_PATH:
+                return self._segunda_via_get() if method == "GET" else self._segunda_via_post()
+            if path == FATURA_PATH:
+                return self._fatura()
+            self._send(404, b"Not found", "text/plain")
+        except BrokenPipeError:
+            pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _valid_postback(self, form):
+        token = form.get("__VIEWSTATE", "")
+        return token in self._state["tokens"] and form.get("__EVENTVALIDATION") == token[::-1]
+
+    def _static(self, path):
+        if path.endswith(".css"):
+            return self._send(200, b".modal{position:fixed;top:30%;left:30%}", "text/css")
+        if path.endswith(".png"):
+            return self._send(200, b"\x89PNG\r\n\x1a\n" + b"\x00" * 2048, "image/png")
+        self._send(404, b"", "text/plain")
+
+    # ---------- LoginGO.aspx ----------
+    def _login_get(self, error=""):
+        self._state["stage"] = "anonimo"
+        alert = f'<span class="erro">{html.escape(error)}</span>' if error else ""
+        self._page("Login - Equatorial Goiás", f"""
+<div class="login">{alert}
+  <input name="{HEADER_PREFIX}txtUC" type="text" id="WEBDOOR_headercorporativogo_txtUC" placeholder="Unidade consumidora">
+  <input name="{HEADER_PREFIX}txtCPF" type="text" id="WEBDOOR_headercorporativogo_txtCPF" placeholder="CPF/CNPJ">
+  <button type="button" class="button" onclick="ValidarCamposAreaLogada();">Entrar</button>
+</div>
+<script type="text/javascript">
+function ValidarCamposAreaLogada() {{
+    __doPostBack('{HEADER_PREFIX}btnEntrar', '');
+}}
+</script>""")
+
+    def _login_step2(self, error=""):
+        alert = f'<span class="erro">{html.escape(error)}</span>' if error else ""
+        self._page("Login - Equatorial Goiás", f"""
+<div class="login">{alert}
+  <p>Informe sua data de nascimento</p>
+  <input name="{HEADER_PREFIX}txtData" type="text" maxlength="10" id="WEBDOOR_headercorporativogo_txtData" class="numero-cliente" placeholder="DD/MM/YYYY">
+  <input type="submit" name="{HEADER_PREFIX}btnValidar" value="Validar" onclick="javascript:WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions(&quot;{HEADER_PREFIX}btnValidar&quot;, &quot;&quot;, true, &quot;&quot;, &quot;&quot;, false, false))" id="WEBDOOR_headercorporativogo_btnValidar" class="button">
+</div>""")
+
+    def _login_post(self):
+        form = self._read_form()
+        if not self._valid_postback(form):
+            return self._login_get("Sessão expirada, tente novamente")
+
+        if form.get("__EVENTTARGET") == f"{HEADER_PREFIX}btnEntrar":
+            uc = form.get(f"{HEADER_PREFIX}txtUC", "").strip()
+            cpf = form.get(f"{HEADER_PREFIX}txtCPF", "").strip()
+            client = next((c for c in self.portal.clients
+                           if c["uc"] == uc and c["cpf_cnpj"] == cpf), None)
+            if not client:
+                return self._login_get("UC ou CPF/CNPJ inválidos")
+            self._state.update(stage="data_nascimento", client=client)
+            return self._login_step2()
+
+        if f"{HEADER_PREFIX}btnValidar" in form and self._state["stage"] == "data_nascimento":
+            if form.get(f"{HEADER_PREFIX}txtData", "").strip() != self._state["client"]["data_nascimento"]:
+                return self._login_step2("Data de nascimento inválida")
+            self._state["stage"] = "autenticado"
+            return self._redirect(HOME_PATH)
+
+        self._login_get()
+
+    def _home(self):
+        if self._state["stage"] != "autenticado":
+            return self._redirect(LOGIN_PATH)
+        self._page("Agência Virtual", "<h1>Agência Virtual</h1><p>Bem-vindo</p>")
+
+    # ---------- SegundaVia.aspx ----------
+    def _options(self, choices, selected):
+        return "".join(
+            f'<option value="{html.escape(value)}"{" selected" if value == selected else ""}>{html.escape(label)}</option>'
+            for value, label in choices
+        )
+
+    def _segunda_via_form(self, extra=""):
+        client = self._state["client"]
+        cpf = client["cpf_cnpj"]
+        ucs = self._options([(uc, uc) for uc in client["ucs"]], self._state["uc"] or client["ucs"][0])
+        tipos = self._options([("", "Selecione"), ("completa", "Emitir fatura completa"),
+                               ("simplificada", "Emitir fatura simplificada")], self._state["tipo"])
+        motivos = self._options([("", "Selecione"), ("ESV01", "Extravio"), ("ESV02", "Não recebimento"),
+                                 ("ESV05", "Outros")], self._state["motivo"])
+        return f"""
+<span id="CONTENT_lblMensagemUsuarioGrupoB" class="mensagem-usuario">Olá <strong>{html.escape(client['nome'])}</strong>, seja bem-vindo</span>
+<span id="CONTENT_lblDocumento">{cpf[:3]}.***.***-{cpf[-2:]}</span>
+<h2>Segunda via de fatura</h2>
+<select name="ctl00$CONTENT$comboBoxUC" onchange="javascript:setTimeout('__doPostBack(\\'ctl00$CONTENT$comboBoxUC\\',\\'\\')', 0)" id="CONTENT_comboBoxUC" class="DropDown">{ucs}</select>
+<select name="ctl00$CONTENT$cbTipoEmissao" id="CONTENT_cbTipoEmissao">{tipos}</select>
+<select name="ctl00$CONTENT$cbMotivo" id="CONTENT_cbMotivo">{motivos}</select>
+<input type="submit" name="ctl00$CONTENT$btEnviar" value="Emitir" id="CONTENT_btEnviar" class="btEmitir">
+{extra}"""
+
+    def _invoice_table(self, modal=False):
+        uc = self._state["uc"]
+        rows = []
+        for i, invoice in enumerate(self.portal.invoices_for(uc)):
+            rows.append(f"""
+<tr>
+  <td>{invoice['mes']}</td><td>{invoice['vencimento']}</td><td>{invoice['valor']}</td><td>Em aberto</td>
+  <td><a id="CONTENT_gvFaturas_lnkDownload_{i}" href="javascript:__doPostBack('ctl00$CONTENT$gvFaturas$ctl{i + 2:02d}$lnkDownload','')">Download</a></td>
+</tr>""")
+        style = "display:block" if modal else "display:none"
+        return f"""
+<h2>Faturas em aberto - UC {uc}</h2>
+<table id="CONTENT_gvFaturas" class="tabela-faturas">
+<tr><th>Mês de referência</th><th>Vencimento</th><th>Valor</th><th>Situação</th><th></th></tr>
+{''.join(rows)}
+</table>
+<div id="CONTENT_pnlModal" class="modal" style="{style}">
+  <p>A fatura será aberta em uma nova janela.</p>
+  <input type="submit" name="ctl00$CONTENT$btnModal" value="OK" id="CONTENT_btnModal" class="btn btn-info btnModal ModalButton">
+</div>"""
+
+    def _segunda_via_get(self):
+        if self._state["stage"] != "autenticado":
+            return self._redirect(LOGIN_PATH)
+        self._state.update(uc=None, tipo="", motivo="")
+        self._page("Segunda Via", self._segunda_via_form())
+
+    def _segunda_via_post(self):
+        if self._state["stage"] != "autenticado":
+            return self._redirect(LOGIN_PATH)
+        form = self._read_form()
+        if not self._valid_postback(form):
+            return self._segunda_via_get()
+
+        target = form.get("__EVENTTARGET", "")
+        if "lnkDownload" in target:
+            # Fatura escolhida fica na sessão: outra aba na mesma sessão troca a fatura desta
+            self._state["fatura"] = int(target.split("$ctl")[-1].split("$")[0]) - 2
+            return self._page("Segunda Via - Faturas", self._invoice_table(modal=True))
+
+        if "ctl00$CONTENT$btnModal" in form:
+            uc = self._state["uc"]
+            invoices = self.portal.invoices_for(uc)
+            index = self._state["fatura"]
+            if index >= len(invoices):
+                return self._page("Segunda Via - Faturas", self._invoice_table())
+            download_token = secrets.token_urlsafe(16)
+            with self.portal.lock:
+                self.portal.downloads[download_token] = (self._session_id, uc, invoices[index]["mes"])
+            return self._redirect(f"{FATURA_PATH}?t={download_token}")
+
+        self._state["uc"] = form.get("ctl00$CONTENT$comboBoxUC", self._state["uc"])
+        self._state["tipo"] = form.get("ctl00$CONTENT$cbTipoEmissao", "")
+        self._state["motivo"] = form.get("ctl00$CONTENT$cbMotivo", "")
+
+        if "ctl00$CONTENT$btEnviar" in form:
+            if self._state["uc"] not in self._state["client"]["ucs"]:
+                return self._page("Segunda Via", self._segunda_via_form('<span class="erro">UC inválida</span>'))
+            if self._state["tipo"] != "completa" or not self._state["motivo"]:
+                return self._page("Segunda Via", self._segunda_via_form(
+                    '<span class="erro">Selecione o tipo e o motivo da emissão</span>'))
+            return self._page("Segunda Via - Faturas", self._invoice_table())
+
+        # Postback do AutoPostBack do comboBoxUC: apenas re-renderiza o formulário
+        self._page("Segunda Via", self._segunda_via_form())
+
+    def _fatura(self):
+        token = parse_qs(urlsplit(self.path).query).get("t", [""])[0]
+        with self.portal.lock:
+            download = self.portal.downloads.get(token)
+        if not download or download[0] != self._session_id:
+            return self._send(403, b"Acesso negado", "text/plain")
+        _, uc, mes = download
+        pdf = build_pdf(f"Fatura UC {uc} - {mes}")
+        self._send(200, pdf, "application/pdf", headers={
+            "Content-Disposition": f'attachment; filename="fatura_{uc}.pdf"'
+        })
+
+
+#-------------- Main ----------#
+
+def main():
+    parser = argparse.ArgumentParser(description="Portal Equatorial simulado (offline)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--clientes", type=int, default=1, help="Número de clientes simulados")
+    parser.add_argument("--ucs", type=int, default=3, help="UCs por cliente")
+    parser.add_argument("--faturas", type=int, default=2, help="Faturas em aberto por UC")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência por requisição (s)")
+    args = parser.parse_args()
+
+    portal = MockPortal(clients=args.clientes, ucs_per_client=args.ucs, invoices_per_uc=args.faturas,
+                        latency=args.latencia, host=args.host, port=args.porta)
+    base_url = portal.start()
+    print(f"🌐 Portal simulado em {base_url}{LOGIN_PATH}")
+    for credentials in portal.credentials():
+        print(f"   UC {credentials['uc']} | CPF {credentials['cpf_cnpj']} | Nascimento {credentials['data_nascimento']}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == "__main__":
+    main()
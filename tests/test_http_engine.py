@@ -0,0 +1,132 @@
+"""Teste ponta a ponta do motor HTTP contra o portal simulado (mock_portal.py)"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from equatorial_faturas_teste_Claude import build_invoice_filename, run_client
+from mock_portal import MockPortal
+
+
+class HttpEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="equatorial_teste_")
+        self.portal = MockPortal(clients=1, ucs_per_client=2, invoices_per_uc=3)
+        self.base_url = self.portal.start()
+        self.client = self.portal.clients[0]
+
+    def tearDown(self):
+        self.portal.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run_client(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_client(
+                self.portal.credentials()[0],
+                engine="http",
+                base_url=self.base_url,
+                output_root=os.path.join(self.workdir, "saida"),
+                session_dir=os.path.join(self.workdir, "sessoes"),
+                selector_cache_path=os.path.join(self.workdir, "selector_cache.json"),
+                **kwargs
+            )
+        self.assertEqual(result["status"], "sucesso")
+        with open(result["relatorio"], 'r', encoding='utf-8') as f:
+            return result, json.load(f)
+
+    def uc_folder(self, result, uc):
+        return os.path.join(result["pasta"], f"UC_{uc}")
+
+    def test_baixa_faturas_de_todas_as_ucs(self):
+        result, report = self.run_client()
+
+        self.assertEqual(result["total_ucs"], 2)
+        self.assertEqual(report["cliente"], self.client["nome"])
+        self.assertEqual([uc["uc"] for uc in report["ucs"]], self.client["ucs"])
+        for uc_data in report["ucs"]:
+            uc = uc_data["uc"]
+            meses = [invoice["mes"] for invoice in self.portal.invoices_for(uc)]
+            self.assertEqual(uc_data["status_processamento"], "processada_com_sucesso")
+            self.assertEqual(uc_data["meses_referencia"], meses)
+            self.assertEqual([fatura["mes"] for fatura in uc_data["faturas_baixadas"]], meses)
+
+            with open(os.path.join(self.uc_folder(result, uc), "manifesto.json"), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)["arquivos"]
+            for mes in meses:
+                filename = build_invoice_filename(uc, mes)
+                with open(os.path.join(self.uc_folder(result, uc), filename), 'rb') as f:
+                    pdf = f.read()
+                self.assertTrue(pdf.startswith(b"%PDF"))
+                self.assertIn(f"Fatura UC {uc} - {mes}".encode("latin-1"), pdf)
+                self.assertEqual(manifest[filename]["mes"], mes)
+                self.assertEqual(manifest[filename]["tamanho"], len(pdf))
+
+    def test_pdf_fora_do_manifesto_so_e_aproveitado_se_conferir(self):
+        result, _ = self.run_client()
+        uc, other_uc = self.client["ucs"]
+        meses = [invoice["mes"] for invoice in self.portal.invoices_for(uc)]
+        folder = self.uc_folder(result, uc)
+        wrong_uc = os.path.join(folder, build_invoice_filename(uc, meses[0]))
+        wrong_month = os.path.join(folder, build_invoice_filename(uc, meses[1]))
+        kept = os.path.join(folder, build_invoice_filename(uc, meses[2]))
+        shutil.copyfile(os.path.join(self.uc_folder(result, other_uc), build_invoice_filename(other_uc, meses[0])),
+                        wrong_uc)
+        shutil.copyfile(kept, wrong_month)
+        kept_modified = os.path.getmtime(kept)
+        os.remove(os.path.join(folder, "manifesto.json"))
+
+        self.run_client()
+
+        for path, mes in ((wrong_uc, meses[0]), (wrong_month, meses[1]), (kept, meses[2])):
+            with open(path, 'rb') as f:
+                self.assertIn(f"Fatura UC {uc} - {mes}".encode("latin-1"), f.read())
+        self.assertEqual(os.path.getmtime(kept), kept_modified)
+
+    def test_varredura_nao_baixa_pdfs(self):
+        result, report = self.run_client(scan_only=True)
+
+        for uc_data in report["ucs"]:
+            self.assertEqual(uc_data["faturas_em_aberto"], 3)
+            self.assertEqual(len(uc_data["faturas"]), 3)
+            self.assertNotIn("faturas_baixadas", uc_data)
+            folder = self.uc_folder(result, uc_data["uc"])
+            pdfs = [name for name in os.listdir(folder) if name.endswith(".pdf")] if os.path.isdir(folder) else []
+            self.assertEqual(pdfs, [])
+
+    def test_retomada_pula_ucs_concluidas(self):
+        result, _ = self.run_client()
+        pdf_path = os.path.join(self.uc_folder(result, self.client["ucs"][0]),
+                                build_invoice_filename(self.client["ucs"][0],
+                                                       self.portal.invoices_for(self.client["ucs"][0])[0]["mes"]))
+        modified = os.path.getmtime(pdf_path)
+        requests_before = self.portal.request_count
+
+        # Arquivo de sessão compatível com o motor Selenium (Network.setCookies recusa expires nulo)
+        session_dir = os.path.join(self.workdir, "sessoes")
+        for name in os.listdir(session_dir):
+            with open(os.path.join(session_dir, name), 'r', encoding='utf-8') as f:
+                for cookie in json.load(f)["cookies"]:
+                    self.assertIsNotNone(cookie.get("expires", -1))
+
+        _, report = self.run_client(resume=True)
+
+        # Sessão salva reaproveitada e nenhuma UC refeita: só a Segunda Via é aberta
+        self.assertLessEqual(self.portal.request_count - requests_before, 2)
+        self.assertEqual(os.path.getmtime(pdf_path), modified)
+        for uc_data in report["ucs"]:
+            self.assertEqual(uc_data["status_processamento"], "processada_com_sucesso")
+            self.assertEqual(len(uc_data["faturas_baixadas"]), 3)
+            # Métricas só da execução atual: UC pulada não herda os spans da anterior
+            self.assertNotIn("metricas", uc_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Testes dos parsers da tabela de faturas (valores, datas e situação)"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from equatorial_faturas_teste_Claude import parse_invoice_cells, parse_invoice_table, summarize_invoices
+
+
+class ParseInvoiceCellsTest(unittest.TestCase):
+
+    def test_valores_de_mil_ou_mais(self):
+        casos = {
+            "R$ 1099,00": "1099,00",
+            "R$ 12345,67": "12345,67",
+            "R$ 1.099,00": "1.099,00",
+            "R$ 1.234.567,89": "1.234.567,89",
+            "R$ 999,99": "999,99",
+            "0,50": "0,50",
+        }
+        for texto, esperado in casos.items():
+            with self.subTest(texto=texto):
+                self.assertEqual(parse_invoice_cells(["JAN/2024", texto])["valor"], esperado)
+
+    def test_data_e_valor_na_mesma_coluna(self):
+        fatura = parse_invoice_cells(["FEV/2024", "Venc. 10/03/2024 - R$ 1500,00", "Em aberto"])
+        self.assertEqual(fatura["vencimento"], "10/03/2024")
+        self.assertEqual(fatura["valor"], "1500,00")
+        self.assertEqual(fatura["situacao"], "Em aberto")
+
+    def test_total_devido(self):
+        faturas = [parse_invoice_cells(["JAN/2024", "10/02/2024", "R$ 1099,00"]),
+                   parse_invoice_cells(["FEV/2024", "10/03/2024", "R$ 1.000,50"])]
+        self.assertEqual(summarize_invoices(faturas)["valor_total_devido"], "2.099,50")
+
+    def test_tabela_html(self):
+        html = """<table>
+<tr><th>Mês</th><th>Vencimento</th><th>Valor</th><th>Situação</th><th></th></tr>
+<tr><td>MAR/2024</td><td>10/04/2024</td><td>R$ 12345,67</td><td>Em aberto</td>
+<td><a id="lnk0" href="javascript:__doPostBack('ctl00$CONTENT$gvFaturas$ctl02$lnkDownload','')">Download</a></td></tr>
+</table>"""
+        faturas = parse_invoice_table(html)
+        self.assertEqual(len(faturas), 1)
+        self.assertEqual(faturas[0]["valor"], "12345,67")
+        self.assertEqual(faturas[0]["alvo_postback"], ("ctl00$CONTENT$gvFaturas$ctl02$lnkDownload", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
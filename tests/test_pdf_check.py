@@ -0,0 +1,42 @@
+"""Testes da conferência de UC e mês do PDF baixado"""
+
+import os
+import sys
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from equatorial_faturas_teste_Claude import pdf_matches_invoice
+from mock_portal import build_pdf
+
+
+UCS = ["10000000", "10000001"]
+
+
+class PdfMatchesInvoiceTest(unittest.TestCase):
+
+    def test_pdf_da_uc_e_mes_pedidos(self):
+        pdf = build_pdf("Fatura UC 10000001 - Março/2026")
+        self.assertTrue(pdf_matches_invoice(pdf, "10000001", "Março/2026", UCS))
+        self.assertTrue(pdf_matches_invoice(pdf, "10000001", "MAR/2026", UCS))
+
+    def test_pdf_de_outra_uc(self):
+        pdf = build_pdf("Fatura UC 10000001 - Março/2026")
+        self.assertFalse(pdf_matches_invoice(pdf, "10000000", "Março/2026", UCS))
+
+    def test_pdf_de_outro_mes(self):
+        pdf = build_pdf("Fatura UC 10000001 - Março/2026")
+        self.assertFalse(pdf_matches_invoice(pdf, "10000001", "Fevereiro/2026", UCS))
+
+    def test_stream_compactado(self):
+        pdf = b"%PDF-1.4\nstream\n" + zlib.compress(b"UC 10000000 FEV/2026") + b"\nendstream\n%%EOF"
+        self.assertTrue(pdf_matches_invoice(pdf, "10000000", "FEV/2026", UCS))
+        self.assertFalse(pdf_matches_invoice(pdf, "10000001", "FEV/2026", UCS))
+
+    def test_pdf_sem_texto_legivel(self):
+        self.assertTrue(pdf_matches_invoice(b"%PDF-1.4\n%%EOF", "10000001", "JAN/2024", UCS))
+
+
+if __name__ == "__main__":
+    unittest.main()